@@ -0,0 +1,88 @@
+"""Замер скорости экспорта во внешнюю БД на локальной SQLite
+
+Сравнивает однократный DataFrame.to_sql (прежний способ экспорта) с
+экспортом порциями через DatabaseConnection.export_data_to_external_db.
+Данные генерируются с фиксированным seed, поэтому результаты воспроизводимы.
+
+    python benchmarks/bench_export.py --rows 1000000 --chunksize 50000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import EXPORT_CHUNK_SIZE, DatabaseConnection  # noqa: E402
+
+
+def make_data(rows, seed=42):
+    """Тестовый датасет: целые, дробные, строковые и даты"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "id": np.arange(rows),
+            "amount": rng.random(rows) * 1000,
+            "region": rng.choice(["north", "south", "east", "west"], rows),
+            "created": pd.Timestamp("2024-01-01")
+            + pd.to_timedelta(rng.integers(0, 86400 * 365, rows), unit="s"),
+        }
+    )
+
+
+def bench_to_sql(data, db_path):
+    """Прежний экспорт: один вызов to_sql без порций"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    started = time.perf_counter()
+    data.to_sql("bench", engine, if_exists="replace", index=False)
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return elapsed
+
+
+def bench_chunked(data, db_path, chunksize):
+    """Экспорт порциями с многострочными INSERT и транзакцией на порцию"""
+    db = DatabaseConnection()
+    db.connect_sqlite(db_path)
+    started = time.perf_counter()
+    success, message = db.export_data_to_external_db(
+        data, "bench", "replace", chunksize=chunksize
+    )
+    elapsed = time.perf_counter() - started
+    db.disconnect_external_db()
+    if not success:
+        raise RuntimeError(message)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--chunksize", type=int, default=EXPORT_CHUNK_SIZE)
+    parser.add_argument("--repeat", type=int, default=3, help="число повторов, берется лучший")
+    args = parser.parse_args()
+
+    data = make_data(args.rows)
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "bench.db")
+        results = {
+            "to_sql": min(bench_to_sql(data, db_path) for _ in range(args.repeat)),
+            "порциями": min(
+                bench_chunked(data, db_path, args.chunksize) for _ in range(args.repeat)
+            ),
+        }
+
+    print(f"Строк: {args.rows}, порция: {args.chunksize}")
+    for name, elapsed in results.items():
+        print(f"{name:>10}: {elapsed:7.2f} с  {args.rows / elapsed:10.0f} строк/с")
+    print(f"Ускорение: {results['to_sql'] / results['порциями']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Замер времени запуска графического приложения
+
+Каждый замер выполняется в новом интерпретаторе: импорт dataset, создание
+главного окна и его показ. Если лучшее время больше бюджета, скрипт
+завершается с кодом 1, поэтому его можно запускать в CI.
+
+    python benchmarks/bench_startup.py --budget 1.0 --repeat 5
+    python benchmarks/bench_startup.py --offscreen   # без дисплея
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, которые не должны загружаться до первого использования
+LAZY_MODULES = ["matplotlib", "seaborn", "pymysql", "pyodbc"]
+
+CHILD_SCRIPT = """
+import sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+from PyQt6.QtWidgets import QApplication
+import dataset
+imported = time.perf_counter()
+app = QApplication(sys.argv)
+window = dataset.DatasetAnalyzer()
+created = time.perf_counter()
+window.show()
+app.processEvents()
+shown = time.perf_counter()
+visible_at = time.time()
+loaded = [name for name in {lazy!r} if name in sys.modules]
+print(visible_at, imported - started, created - imported, shown - created, ",".join(loaded))
+"""
+
+
+def measure_startup(offscreen):
+    """Один запуск в новом процессе
+
+    Возвращает (время до показа окна от старта процесса, импорт, создание
+    окна, показ, загруженные модули из LAZY_MODULES).
+    """
+    env = dict(os.environ)
+    if offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    script = CHILD_SCRIPT.format(root=ROOT, lazy=LAZY_MODULES)
+    started = time.time()
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    visible_at, imported, created, shown, loaded = output.splitlines()[-1].split(" ")
+    return float(visible_at) - started, float(imported), float(created), float(shown), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=1.0, help="допустимое время, с")
+    parser.add_argument("--repeat", type=int, default=5, help="число запусков, берется лучший")
+    parser.add_argument("--offscreen", action="store_true", help="Qt без дисплея")
+    args = parser.parse_args()
+
+    runs = [measure_startup(args.offscreen) for _ in range(args.repeat)]
+    visible, imported, created, shown, loaded = min(runs)
+
+    print(f"Запусков: {args.repeat}, лучший:")
+    print(f"  импорт dataset: {imported:6.3f} с")
+    print(f"  создание окна:  {created:6.3f} с")
+    print(f"  показ окна:     {shown:6.3f} с")
+    # Включает запуск интерпретатора
+    print(f"Окно показано через {visible:.3f} с после старта процесса (бюджет {args.budget:.3f} с)")
+
+    failed = False
+    if loaded:
+        print(f"При запуске загружены модули: {loaded.replace(',', ', ')}")
+        failed = True
+    if visible > args.budget:
+        print("Бюджет превышен")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
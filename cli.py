@@ -0,0 +1,285 @@
+"""Консольный режим без графического интерфейса (для cron и скриптов)
+
+Примеры:
+    python cli.py run --load sales.csv --sql "SELECT region, SUM(amount) FROM dataset GROUP BY region" --output report.csv
+    python cli.py run --load orders.csv:orders --attach ref=ref.db --sql-file nightly.sql --script --output out.parquet
+    python cli.py run --sqlite big.db --sql "SELECT * FROM orders" --output orders.csv.gz
+    python cli.py batch reports.sql --mysql db.local:3306/sales --user etl --format parquet --output-dir out/
+    python cli.py serve --load big.csv --port 8765
+
+Диагностические сообщения выводятся в stderr, результат запроса без --output
+пишется в stdout в формате CSV.
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+from database import (
+    IDENTIFIER_RE,
+    DatabaseConnection,
+    format_batch_summary,
+    format_script_report,
+    is_select_query,
+    parse_batch_queries,
+)
+from fileio import read_data_file, write_data_file
+from server import QueryServer
+
+
+def parse_load_argument(value):
+    """Разбор аргумента --load вида путь[:таблица]"""
+    path, separator, table_name = value.rpartition(":")
+    # Двоеточие в "C:\data.csv" — часть пути, а не разделитель таблицы
+    if separator and len(path) > 1 and IDENTIFIER_RE.match(table_name):
+        return path, table_name
+    return value, "dataset"
+
+
+def add_source_arguments(parser):
+    """Аргументы подготовки данных и подключения к БД"""
+    parser.add_argument(
+        "--load",
+        action="append",
+        default=[],
+        metavar="ПУТЬ[:ТАБЛИЦА]",
+        help="загрузить файл (csv, xlsx, dbf, json, parquet, feather, arrow) во внутреннюю БД, по умолчанию в таблицу dataset",
+    )
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="дописывать загружаемые файлы к существующим таблицам",
+    )
+    parser.add_argument(
+        "--attach",
+        action="append",
+        default=[],
+        metavar="СХЕМА=ПУТЬ",
+        help="присоединить SQLite файл к внутренней БД под псевдонимом схемы",
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--sqlite", metavar="ПУТЬ", help="внешняя SQLite база")
+    target.add_argument(
+        "--mysql", metavar="ХОСТ:ПОРТ/БАЗА", help="внешняя MySQL база"
+    )
+    target.add_argument(
+        "--sqlserver",
+        metavar="СЕРВЕР/БАЗА",
+        help="внешний SQL Server (Windows Authentication, если не указан --user)",
+    )
+    parser.add_argument("--user", help="пользователь внешней БД")
+    parser.add_argument(
+        "--password",
+        default=os.environ.get("DATASETS_DB_PASSWORD", ""),
+        help="пароль внешней БД (по умолчанию из переменной DATASETS_DB_PASSWORD)",
+    )
+
+
+def prepare_connection(args):
+    """Создание подключения, загрузка файлов и присоединение баз"""
+    db = DatabaseConnection()
+
+    for value in args.load:
+        file_path, table_name = parse_load_argument(value)
+        try:
+            data = read_data_file(file_path)
+        except Exception as e:
+            return False, f"Ошибка загрузки {file_path}: {str(e)}"
+        success, message = db.load_data_to_internal_db(
+            data, table_name, "append" if args.append else "replace"
+        )
+        if not success:
+            return False, message
+        print(f"{file_path}: {len(data)} строк -> {table_name}")
+
+    for value in args.attach:
+        alias, _, file_path = value.partition("=")
+        success, message = db.attach_sqlite(file_path, alias)
+        if not success:
+            return False, message
+
+    if args.sqlite:
+        success, message = db.connect_sqlite(args.sqlite)
+    elif args.mysql:
+        address, _, database = args.mysql.partition("/")
+        host, _, port = address.partition(":")
+        success, message = db.connect_mysql(
+            host, port or "3306", args.user, args.password, database
+        )
+    elif args.sqlserver:
+        server, _, database = args.sqlserver.partition("/")
+        success, message = db.connect_sqlserver(
+            server,
+            database,
+            args.user,
+            args.password,
+            trusted_connection=not args.user,
+        )
+    else:
+        return True, db
+    if not success:
+        return False, message
+    return True, db
+
+
+def write_result(data, output, stdout):
+    """Запись результата в файл (по расширению) или в stdout как CSV"""
+    if not output:
+        data.to_csv(stdout, index=False)
+    elif output.lower().endswith((".parquet", ".feather", ".arrow")):
+        write_data_file(data, output)
+    else:
+        data.to_csv(output, index=False, encoding="utf-8-sig")
+
+
+def is_streamed_output(output):
+    """Файл результата, который пишется курсором напрямую: CSV, в том числе сжатый"""
+    return bool(output) and output.lower().endswith((".csv", ".csv.gz", ".csv.zst"))
+
+
+def command_run(args, stdout):
+    """Выполнение запроса или скрипта и экспорт результата"""
+    if args.sql_file:
+        with open(args.sql_file, "r", encoding="utf-8") as f:
+            query = f.read()
+    else:
+        query = args.sql
+
+    success, db = prepare_connection(args)
+    if not success:
+        print(db, file=sys.stderr)
+        return 1
+    if not query:
+        return 0
+
+    if not args.script and is_streamed_output(args.output) and is_select_query(query):
+        # Результат пишется в файл порциями, не собираясь в памяти
+        success, message = db.export_query_to_csv(query, args.output)
+        print(message)
+        return 0 if success else 1
+
+    if args.script:
+        success, result = db.execute_script(query)
+        if not success:
+            print(result, file=sys.stderr)
+            return 1
+        print(format_script_report(result["statements"]))
+        data = result["data"]
+    else:
+        success, data = db.execute_query(query)
+        if not success:
+            print(data, file=sys.stderr)
+            return 1
+
+    if data is not None:
+        write_result(data, args.output, stdout)
+        print(f"Результат: {len(data)} строк")
+    return 0
+
+
+def command_batch(args, stdout):
+    """Пакетный запуск именованных запросов из .sql файла"""
+    with open(args.sql_file, "r", encoding="utf-8") as f:
+        queries = parse_batch_queries(f.read())
+
+    success, db = prepare_connection(args)
+    if not success:
+        print(db, file=sys.stderr)
+        return 1
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    success, summary = db.run_batch(
+        queries,
+        output_format=args.format,
+        output_dir=args.output_dir,
+        max_workers=args.workers,
+        progress_callback=print,
+    )
+    if isinstance(summary, str):
+        print(summary, file=sys.stderr)
+        return 1
+    print(format_batch_summary(summary))
+    return 0 if success else 1
+
+
+def command_serve(args, stdout):
+    """Запуск локального HTTP сервиса запросов к внутренней БД"""
+    success, db = prepare_connection(args)
+    if not success:
+        print(db, file=sys.stderr)
+        return 1
+
+    server = QueryServer(db, args.host, args.port)
+    print(f"HTTP сервис запущен: {server.url} (Ctrl+C для остановки)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def build_parser():
+    """Описание аргументов командной строки"""
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Универсальный анализатор датасетов: консольный режим",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="загрузить файлы, выполнить SQL, экспортировать")
+    add_source_arguments(run)
+    query = run.add_mutually_exclusive_group()
+    query.add_argument("--sql", help="текст SQL запроса")
+    query.add_argument("--sql-file", metavar="ПУТЬ", help="файл с SQL запросом")
+    run.add_argument(
+        "--script",
+        action="store_true",
+        help="выполнить несколько операторов в одной транзакции",
+    )
+    run.add_argument(
+        "--output",
+        metavar="ПУТЬ",
+        help="файл результата (.csv, .csv.gz, .csv.zst, .parquet, .feather или .arrow); по умолчанию CSV в stdout",
+    )
+    run.set_defaults(handler=command_run)
+
+    batch = commands.add_parser("batch", help="пакетный запуск запросов из .sql файла")
+    batch.add_argument("sql_file", metavar="ФАЙЛ.sql")
+    add_source_arguments(batch)
+    batch.add_argument(
+        "--format", choices=["csv", "parquet", "table"], default="csv"
+    )
+    batch.add_argument("--output-dir", metavar="ПАПКА")
+    batch.add_argument("--workers", type=int, default=4, help="число потоков")
+    batch.set_defaults(handler=command_batch)
+
+    serve = commands.add_parser("serve", help="HTTP сервис запросов к внутренней БД")
+    add_source_arguments(serve)
+    serve.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="loopback адрес сервиса: 127.0.0.1, ::1 или localhost",
+    )
+    serve.add_argument("--port", type=int, default=8765)
+    serve.set_defaults(handler=command_serve)
+    return parser
+
+
+def main(argv=None):
+    """Точка входа консольного режима"""
+    args = build_parser().parse_args(argv)
+    stdout = sys.stdout
+    # Служебные сообщения загрузчиков не должны смешиваться с данными в stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            return args.handler(args, stdout)
+        except Exception as e:
+            print(f"Ошибка: {str(e)}", file=sys.stderr)
+            return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
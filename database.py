@@ -0,0 +1,2424 @@
+"""Работа с базами данных без зависимостей от графического интерфейса"""
+
+import os
+import re
+import time
+import shutil
+import tempfile
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import pandas as pd
+from sqlalchemy import (
+    Column,
+    MetaData,
+    Table,
+    create_engine,
+    event,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy import types as sqltypes
+from sqlalchemy.pool import QueuePool
+from fileio import (
+    COLUMNAR_FORMATS,
+    PYARROW_AVAILABLE,
+    detect_compression,
+    detect_file_format,
+    write_columnar_chunks,
+    write_csv_batches,
+)
+from profiling import HISTOGRAM_BINS, TOP_VALUES_COUNT
+
+# Типы колонок БД, для которых считаются среднее и гистограмма
+NUMERIC_TYPE_RE = re.compile(r"INT|REAL|FLOAT|DOUBLE|DECIMAL|NUMERIC|MONEY", re.IGNORECASE)
+
+# Допустимый идентификатор (псевдоним схемы, имя представления)
+IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Операторы, изменяющие содержимое или структуру таблицы
+MODIFIED_TABLE_RE = re.compile(
+    r"\b(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?"
+    r"|DELETE\s+FROM|DROP\s+TABLE(?:\s+IF\s+EXISTS)?|ALTER\s+TABLE)"
+    r"\s+[\"`\[]?(\w+)",
+    re.IGNORECASE,
+)
+
+# Агрегаты, которые можно пересчитывать по приращению данных:
+# новое значение получается агрегатом от старого значения и значения по новым строкам
+MERGEABLE_AGGREGATES = {"SUM": "SUM", "COUNT": "SUM", "MIN": "MIN", "MAX": "MAX"}
+
+# Строка-разделитель пакетов SQL Server
+GO_SEPARATOR_RE = re.compile(r"[ \t]*GO[ \t]*(\r?\n|$)", re.IGNORECASE)
+
+# Размер порции строк при экспорте во внешнюю БД (одна транзакция на порцию)
+EXPORT_CHUNK_SIZE = 50000
+
+# Предел числа параметров в одном многострочном INSERT ... VALUES
+MAX_INSERT_PARAMETERS = {"sqlite": 32000, "mysql": 60000}
+
+# Длина строковых ключевых колонок merge: по TEXT/NVARCHAR(max) нельзя
+# построить уникальный индекс в MySQL и SQL Server
+KEY_STRING_LENGTH = 255
+
+# Типы колонок dtype object по pd.api.types.infer_dtype, как в to_sql
+OBJECT_COLUMN_TYPES = {
+    "date": sqltypes.Date,
+    "time": sqltypes.Time,
+    "decimal": sqltypes.Numeric,
+    "bytes": sqltypes.LargeBinary,
+    "datetime": sqltypes.DateTime,
+    "boolean": sqltypes.Boolean,
+    "integer": sqltypes.BigInteger,
+    "floating": sqltypes.Float,
+    "mixed-integer-float": sqltypes.Float,
+}
+
+# Сколько секунд соединение внутренней БД ждет освобождения блокировки записи
+INTERNAL_BUSY_TIMEOUT = 30
+
+
+def split_sql_statements(script):
+    """Разбиение SQL скрипта на отдельные операторы
+
+    Разделителем служит ';' вне строковых литералов, идентификаторов в кавычках
+    и комментариев, а также строка "GO" (как в SQL Server Management Studio).
+    """
+    statements = []
+    current = []
+    i = 0
+    length = len(script)
+    closing = {"'": "'", '"': '"', "`": "`", "[": "]"}
+
+    def flush():
+        statement = "".join(current).strip()
+        if statement:
+            statements.append(statement)
+        current.clear()
+
+    while i < length:
+        char = script[i]
+
+        if char in closing:
+            # Строковый литерал или идентификатор в кавычках (удвоенная кавычка — экранирование)
+            end_char = closing[char]
+            j = i + 1
+            while j < length:
+                if script[j] == end_char:
+                    if j + 1 < length and script[j + 1] == end_char:
+                        j += 2
+                        continue
+                    break
+                j += 1
+            current.append(script[i : j + 1])
+            i = j + 1
+        elif script.startswith("--", i):
+            j = script.find("\n", i)
+            j = length if j == -1 else j
+            current.append(script[i:j])
+            i = j
+        elif script.startswith("/*", i):
+            j = script.find("*/", i + 2)
+            j = length if j == -1 else j + 2
+            current.append(script[i:j])
+            i = j
+        elif char == ";":
+            flush()
+            i += 1
+        elif char == "\n":
+            current.append(char)
+            i += 1
+            # Разделитель пакетов SQL Server: строка, содержащая только GO
+            match = GO_SEPARATOR_RE.match(script, i)
+            if match:
+                flush()
+                i = match.end()
+        else:
+            current.append(char)
+            i += 1
+
+    flush()
+    # Отбрасываем фрагменты, состоящие только из комментариев
+    return [
+        statement
+        for statement in statements
+        if re.sub(r"--[^\n]*|/\*.*?\*/", "", statement, flags=re.DOTALL).strip()
+    ]
+
+
+def quote_table_name(dialect, name):
+    """Экранирование имени таблицы (в том числе схема.таблица) для диалекта"""
+    preparer = dialect.identifier_preparer
+    return ".".join(preparer.quote(part) for part in name.split("."))
+
+
+def build_histogram_query(dialect, source, column):
+    """SQL гистограммы колонки: номер интервала и число значений в нем
+
+    Параметры :low и :width — начало и ширина интервала. Номер считается
+    во вложенном запросе, чтобы SQL Server не сравнивал выражения с разными
+    параметрами в SELECT и GROUP BY; SQLite без математических функций
+    вместо FLOOR использует CAST (значения не меньше :low).
+    """
+    quoted = dialect.identifier_preparer.quote(column)
+    if dialect.name == "sqlite":
+        bin_expression = f"CAST(({quoted} - :low) / :width AS INTEGER)"
+    else:
+        bin_expression = f"FLOOR(({quoted} - :low) / :width)"
+    return (
+        f"SELECT bin, COUNT(*) AS n FROM "
+        f"(SELECT {bin_expression} AS bin FROM {source} WHERE {quoted} IS NOT NULL) b "
+        f"GROUP BY bin"
+    )
+
+
+def build_top_values_query(dialect, source, column, limit):
+    """SQL самых частых значений колонки"""
+    quoted = dialect.identifier_preparer.quote(column)
+    top = f"TOP {int(limit)} " if dialect.name == "mssql" else ""
+    query = (
+        f"SELECT {top}{quoted}, COUNT(*) AS n FROM {source} "
+        f"WHERE {quoted} IS NOT NULL GROUP BY {quoted} ORDER BY COUNT(*) DESC"
+    )
+    if dialect.name != "mssql":
+        query += f" LIMIT {int(limit)}"
+    return query
+
+
+def is_select_query(sql):
+    """Проверка, что строка является запросом SELECT/WITH, а не именем таблицы"""
+    return bool(re.match(r"^\s*(SELECT|WITH)\b", sql, re.IGNORECASE))
+
+
+def arrow_type_for_column(column_type):
+    """Тип Arrow для колонки SQLAlchemy
+
+    None для колонок без объявленного типа (выражения в CREATE TABLE AS
+    SELECT в SQLite) и типов без общего аналога: тип определяется по данным.
+    """
+    import pyarrow as pa
+
+    try:
+        generic = column_type.as_generic()
+    except NotImplementedError:
+        return None
+    if isinstance(generic, sqltypes.NullType):
+        return None
+    if isinstance(generic, sqltypes.Boolean):
+        return pa.bool_()
+    if isinstance(generic, sqltypes.Integer):
+        return pa.int64()
+    if isinstance(generic, sqltypes.Numeric):
+        # read_sql_table возвращает Decimal как float (coerce_float)
+        return pa.float64()
+    if isinstance(generic, sqltypes.DateTime):
+        return pa.timestamp("us")
+    if isinstance(generic, sqltypes.Date):
+        return pa.date32()
+    if isinstance(generic, sqltypes.Time):
+        return pa.time64("us")
+    if isinstance(generic, sqltypes._Binary):
+        return pa.binary()
+    if isinstance(generic, sqltypes.String):
+        return pa.string()
+    return None
+
+
+def to_python_scalar(value):
+    """Преобразование скаляров numpy/pandas в значения Python для параметров запроса"""
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def export_column_types(data, dialect_name, string_length=None, key_columns=()):
+    """Явные типы объектных и строковых колонок для создания таблицы при экспорте
+
+    Таблица создается из пустого DataFrame, по которому pandas не может
+    определить тип колонок object, поэтому он определяется по всем данным
+    (OBJECT_COLUMN_TYPES). Колонки с другими dtype типизирует pandas.
+    Без string_length строки создаются как TEXT/NVARCHAR(max), поэтому
+    в таблицу можно дописывать строки любой длины. С string_length (и для ключевых колонок merge, см.
+    KEY_STRING_LENGTH) создается VARCHAR/NVARCHAR, который быстрее
+    вставляется и индексируется; длина не меньше самой длинной строки данных.
+    """
+    column_types = {}
+    for column in data.columns:
+        values = data[column]
+        if values.dtype != object and not pd.api.types.is_string_dtype(values.dtype):
+            continue
+        inferred = pd.api.types.infer_dtype(values, skipna=True)
+        if inferred in OBJECT_COLUMN_TYPES:
+            column_types[column] = OBJECT_COLUMN_TYPES[inferred]()
+            continue
+        if inferred != "string":
+            continue
+        length = string_length
+        if not length and column in key_columns:
+            length = KEY_STRING_LENGTH
+        if not length:
+            column_types[column] = sqltypes.UnicodeText()
+            continue
+        lengths = values.dropna().str.len()
+        length = max(length, int(lengths.max()) if len(lengths) else 0)
+        if dialect_name == "mssql" and length <= 4000:
+            column_types[column] = sqltypes.Unicode(length)
+        elif dialect_name == "mysql" and length <= 255:
+            column_types[column] = sqltypes.String(length)
+        elif dialect_name not in ("mssql", "mysql"):
+            column_types[column] = sqltypes.String(length)
+        else:
+            column_types[column] = sqltypes.UnicodeText()
+    return column_types
+
+
+def portable_column_type(column_type, target_dialect_name):
+    """Перевод типа колонки одной СУБД в тип, понятный другой
+
+    Используется общий тип SQLAlchemy (as_generic); типы без общего аналога
+    и колонки SQLite без объявленного типа сохраняются как текст.
+    """
+    try:
+        generic = column_type.as_generic()
+    except NotImplementedError:
+        return sqltypes.UnicodeText()
+    if isinstance(generic, sqltypes.NullType):
+        return sqltypes.UnicodeText()
+    if isinstance(generic, sqltypes.String) and not generic.length:
+        # VARCHAR без длины допустим в SQLite, но не в MySQL и SQL Server
+        return sqltypes.UnicodeText()
+    if isinstance(generic, sqltypes.String) and target_dialect_name == "mysql" and generic.length > 255:
+        return sqltypes.UnicodeText()
+    return generic
+
+
+def staging_table_name(table_name):
+    """Имя промежуточной таблицы для экспорта в режиме merge"""
+    return f"{table_name}_staging"
+
+
+def build_upsert_query(dialect, table_name, staging_name, columns, key_columns):
+    """Перенос строк из промежуточной таблицы в целевую с обновлением по ключу
+
+    Используется встроенный механизм СУБД: INSERT ... ON CONFLICT в SQLite,
+    ON DUPLICATE KEY UPDATE в MySQL и MERGE в SQL Server. Строки, в которых
+    ничего не изменилось, не перезаписываются.
+    """
+    preparer = dialect.identifier_preparer
+    target = quote_table_name(dialect, table_name)
+    staging = quote_table_name(dialect, staging_name)
+    quoted = [preparer.quote(column) for column in columns]
+    keys = [preparer.quote(column) for column in key_columns]
+    values = [column for column in quoted if column not in keys]
+    column_list = ", ".join(quoted)
+
+    if dialect.name == "sqlite":
+        # WHERE true нужен SQLite, чтобы отличить ON CONFLICT от условия JOIN
+        query = (
+            f"INSERT INTO {target} ({column_list}) "
+            f"SELECT {column_list} FROM {staging} WHERE true "
+            f"ON CONFLICT ({', '.join(keys)}) DO "
+        )
+        if not values:
+            return query + "NOTHING"
+        assignments = ", ".join(f"{column} = excluded.{column}" for column in values)
+        changed = " OR ".join(
+            f"{target}.{column} IS NOT excluded.{column}" for column in values
+        )
+        return query + f"UPDATE SET {assignments} WHERE {changed}"
+
+    if dialect.name == "mysql":
+        # MySQL сам не перезаписывает строки с неизменившимися значениями
+        updates = values or keys[:1]
+        assignments = ", ".join(f"{column} = VALUES({column})" for column in updates)
+        return (
+            f"INSERT INTO {target} ({column_list}) "
+            f"SELECT {column_list} FROM {staging} "
+            f"ON DUPLICATE KEY UPDATE {assignments}"
+        )
+
+    if dialect.name == "mssql":
+        condition = " AND ".join(f"target.{key} = source.{key}" for key in keys)
+        query = f"MERGE INTO {target} AS target USING {staging} AS source ON {condition} "
+        if values:
+            # EXCEPT сравнивает значения с учетом NULL
+            source_values = ", ".join(f"source.{column}" for column in values)
+            target_values = ", ".join(f"target.{column}" for column in values)
+            assignments = ", ".join(f"{column} = source.{column}" for column in values)
+            query += (
+                f"WHEN MATCHED AND EXISTS (SELECT {source_values} "
+                f"EXCEPT SELECT {target_values}) "
+                f"THEN UPDATE SET {assignments} "
+            )
+        insert_values = ", ".join(f"source.{column}" for column in quoted)
+        return query + (
+            f"WHEN NOT MATCHED BY TARGET THEN INSERT ({column_list}) "
+            f"VALUES ({insert_values});"
+        )
+
+    raise ValueError(f"Режим merge не поддерживается для {dialect.name}")
+
+
+def insert_multirow(table, conn, keys, data_iter):
+    """Вставка порции строк одним INSERT ... VALUES (...), (...) через драйвер
+
+    Метод вставки для DataFrame.to_sql: в отличие от method="multi" текст
+    запроса не компилируется SQLAlchemy, что в несколько раз быстрее.
+    """
+    rows = list(data_iter)
+    if not rows:
+        return 0
+    preparer = conn.dialect.identifier_preparer
+    marker = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+    row_placeholder = "(" + ", ".join([marker] * len(keys)) + ")"
+    query = (
+        f"INSERT INTO {preparer.quote(table.name)} "
+        f"({', '.join(preparer.quote(key) for key in keys)}) "
+        f"VALUES {', '.join([row_placeholder] * len(rows))}"
+    )
+    conn.exec_driver_sql(query, tuple(value for row in rows for value in row))
+    return len(rows)
+
+
+def split_top_level(text_value, separator=","):
+    """Разбиение строки по разделителю вне скобок и кавычек"""
+    parts = []
+    depth = 0
+    quote = None
+    current = []
+    for char in text_value:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ("'", '"', "`"):
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    parts.append("".join(current).strip())
+    return parts
+
+
+def parse_aggregate_query(sql):
+    """Разбор агрегирующего запроса для инкрементального обновления представления
+
+    Поддерживается вид: SELECT <колонки группировки и SUM/COUNT/MIN/MAX>
+    FROM <таблица> [WHERE <условие>] [GROUP BY <колонки>].
+    Возвращает словарь с частями запроса или None, если запрос сложнее.
+    """
+    sql = sql.strip().rstrip(";")
+    match = re.match(
+        r"^SELECT\s+(?P<items>.+?)\s+FROM\s+(?P<table>\w+)"
+        r"(?:\s+WHERE\s+(?P<where>.+?))?(?:\s+GROUP\s+BY\s+(?P<group>.+?))?$",
+        sql,
+        re.IGNORECASE | re.DOTALL,
+    )
+    if not match:
+        return None
+    if re.search(
+        r"\b(JOIN|HAVING|ORDER|LIMIT|UNION|DISTINCT|OVER)\b", sql, re.IGNORECASE
+    ) or len(re.findall(r"\bSELECT\b", sql, re.IGNORECASE)) > 1:
+        return None
+
+    group_by = []
+    if match.group("group"):
+        group_by = [column.strip('"`[] ') for column in split_top_level(match.group("group"))]
+
+    kinds = []
+    for item in split_top_level(match.group("items")):
+        aggregate = re.match(
+            r"^(SUM|COUNT|MIN|MAX)\s*\(\s*(\*|[^()]+?)\s*\)(?:\s+(?:AS\s+)?\S+)?$",
+            item,
+            re.IGNORECASE,
+        )
+        if aggregate:
+            kinds.append(aggregate.group(1).upper())
+            continue
+        column = re.match(
+            r"^([\w\"`\[\]]+)(?:\s+(?:AS\s+)?\S+)?$", item, re.IGNORECASE
+        )
+        if column and column.group(1).strip('"`[]') in group_by:
+            kinds.append("GROUP")
+            continue
+        return None
+
+    if "GROUP" not in kinds and group_by:
+        return None
+    return {
+        "table": match.group("table"),
+        "items": match.group("items"),
+        "where": match.group("where"),
+        "group": match.group("group"),
+        "kinds": kinds,
+    }
+
+
+def parse_batch_queries(script):
+    """Разбор .sql файла пакетного запуска на именованные запросы
+
+    Имя и зависимости задаются комментариями перед запросом:
+        -- name: sales_by_region
+        -- depends: staging_sales
+    Запросы без зависимостей считаются независимыми и выполняются параллельно.
+    """
+    queries = []
+    for index, statement in enumerate(split_sql_statements(script), start=1):
+        name_match = re.search(r"--\s*name\s*:\s*(\w+)", statement, re.IGNORECASE)
+        depends_match = re.search(r"--\s*depends\s*:\s*([\w \t,]+)", statement, re.IGNORECASE)
+        depends = []
+        if depends_match:
+            depends = [
+                name.strip()
+                for name in depends_match.group(1).split(",")
+                if name.strip()
+            ]
+        queries.append(
+            {
+                "name": name_match.group(1) if name_match else f"query_{index}",
+                "sql": statement,
+                "depends": depends,
+            }
+        )
+    return queries
+
+
+def format_batch_summary(summary):
+    """Форматирование итогов пакетного запуска"""
+    lines = []
+    for item in summary["queries"]:
+        if item["status"] == "ok":
+            lines.append(
+                f"{item['name']}: {item['rows']} строк за {item['duration']:.3f} с -> {item['output']}"
+            )
+        else:
+            lines.append(f"{item['name']}: [{item['status']}] {item.get('error', '')}")
+    lines.append(
+        f"Общее время: {summary['wall_time']:.3f} с; последовательно: "
+        f"{summary['sequential_time']:.3f} с; ускорение: x{summary['speedup']:.2f} "
+        f"({summary['workers']} потоков)"
+    )
+    return "\n".join(lines)
+
+
+def format_script_report(report):
+    """Форматирование отчета о выполнении SQL скрипта"""
+    lines = []
+    for item in report:
+        statement = " ".join(item["statement"].split())
+        if len(statement) > 60:
+            statement = statement[:57] + "..."
+        if item["status"] == "ok":
+            rows = item["rowcount"] if item["rowcount"] >= 0 else "—"
+            lines.append(
+                f"{item['index']}. [{item['duration'] * 1000:.1f} мс, строк: {rows}] {statement}"
+            )
+        else:
+            lines.append(
+                f"{item['index']}. [{item['status']}] {statement}: {item.get('error', '')}"
+            )
+    return "\n".join(lines)
+
+
+class DatabaseConnection:
+    """Класс для управления подключениями к различным базам данных"""
+
+    def __init__(self):
+        self.external_engine = None  # Внешняя БД
+        self.internal_engine = None  # Внутренняя БД для файлов
+        self.connection_type = None
+        self.current_table_name = None
+        self.attached_databases = {}  # Псевдоним схемы -> путь к файлу SQLite
+        self.remote_imports = {}  # Внутренняя таблица -> параметры импорта из внешней БД
+        self.table_versions = {}  # Внутренняя таблица -> счетчики загрузок
+        self.materialized_views = {}  # Имя представления -> определение и состояние
+        self.internal_dir = None  # Временная папка с файлом внутренней БД
+        self.internal_cleanup = None  # Удаление временной папки
+        # Запись во внутреннюю БД из нескольких потоков выполняется по очереди
+        self.internal_write_lock = threading.RLock()
+        # Счетчики table_versions меняются и из потоков пакетного запуска
+        self.table_versions_lock = threading.Lock()
+        # Прерванные экспорты: имя таблицы -> число уже записанных строк
+        self.export_checkpoints = {}
+        # Кэш каталога схемы по ключу "internal"/"external"
+        self.schema_catalog = {}
+        self.catalog_generation = {"internal": 0, "external": 0}
+        self.catalog_lock = threading.Lock()
+        self.setup_internal_db()
+
+    def setup_internal_db(self):
+        """Создание внутренней SQLite базы данных во временном файле
+
+        Файл работает в режиме WAL: чтение из фоновых потоков (HTTP сервис,
+        профиль, пакетный запуск) не блокирует запись, а соединения пула
+        видят одни и те же таблицы. Одновременные записи ждут друг друга до
+        INTERNAL_BUSY_TIMEOUT секунд. Папка с файлом удаляется в
+        close_internal_db или при завершении программы.
+        """
+        try:
+            self.internal_dir = tempfile.mkdtemp(prefix="datasets_")
+            self.internal_cleanup = weakref.finalize(
+                self, shutil.rmtree, self.internal_dir, True
+            )
+            db_path = os.path.join(self.internal_dir, "internal.db")
+            self.internal_engine = create_engine(
+                f"sqlite:///{db_path}",
+                poolclass=QueuePool,
+                pool_size=5,
+                max_overflow=10,
+                connect_args={
+                    "check_same_thread": False,
+                    "timeout": INTERNAL_BUSY_TIMEOUT,
+                },
+            )
+            event.listen(
+                self.internal_engine, "connect", self._configure_internal_connection
+            )
+            self.connection_type = "internal"
+        except Exception as e:
+            print(f"Ошибка создания внутренней БД: {e}")
+
+    def close_internal_db(self):
+        """Закрытие соединений внутренней БД и удаление ее файла"""
+        if self.internal_engine is not None:
+            self.internal_engine.dispose()
+            self.internal_engine = None
+        if self.internal_cleanup is not None:
+            self.internal_cleanup()
+            self.internal_cleanup = None
+            self.internal_dir = None
+
+    def _configure_internal_connection(self, dbapi_connection, connection_record):
+        """Настройка нового соединения внутренней БД
+
+        Включает WAL и присоединяет внешние SQLite файлы из attached_databases.
+        """
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            # Временная БД: при сбое данные не нужны, fsync на каждую транзакцию лишний
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            for alias, db_path in self.attached_databases.items():
+                cursor.execute(f'ATTACH DATABASE ? AS "{alias}"', (db_path,))
+        finally:
+            cursor.close()
+
+    def attach_sqlite(self, db_path, alias):
+        """Присоединение внешнего SQLite файла к внутренней БД под псевдонимом схемы
+
+        После присоединения таблицы файла доступны во внутренних запросах как
+        alias.table, например: SELECT * FROM dataset JOIN ext.customers ...
+        """
+        try:
+            if not IDENTIFIER_RE.match(alias or ""):
+                return False, f"Недопустимый псевдоним схемы: '{alias}'"
+            if alias.lower() in ("main", "temp"):
+                return False, f"Псевдоним '{alias}' зарезервирован SQLite"
+            if alias in self.attached_databases:
+                return False, f"Псевдоним '{alias}' уже используется"
+            if not os.path.isfile(db_path):
+                return False, f"Файл не найден: {db_path}"
+            if self.internal_engine is None:
+                self.setup_internal_db()
+
+            self.attached_databases[alias] = db_path
+            self.reset_internal_pool()
+            try:
+                # Проверка: новое соединение присоединяет файл в connect
+                with self.internal_engine.connect() as conn:
+                    conn.exec_driver_sql(f'SELECT COUNT(*) FROM "{alias}".sqlite_master')
+            except Exception:
+                del self.attached_databases[alias]
+                self.reset_internal_pool()
+                raise
+            self.invalidate_schema_catalog("internal")
+            return True, f"База данных '{os.path.basename(db_path)}' присоединена как '{alias}'"
+        except Exception as e:
+            return False, f"Ошибка присоединения SQLite: {str(e)}"
+
+    def detach_sqlite(self, alias):
+        """Отсоединение ранее присоединенного SQLite файла"""
+        if alias not in self.attached_databases:
+            return False, f"База с псевдонимом '{alias}' не присоединена"
+        del self.attached_databases[alias]
+        self.reset_internal_pool()
+        self.invalidate_schema_catalog("internal")
+        return True, f"База данных '{alias}' отсоединена"
+
+    def reset_internal_pool(self):
+        """Закрытие соединений пула внутренней БД после смены attached_databases
+
+        Новые соединения присоединяют файлы по текущему списку; соединения,
+        занятые фоновыми задачами, закрываются при возврате в пул.
+        """
+        self.internal_engine.dispose()
+
+    def connect_sqlite(self, db_path):
+        """Подключение к внешней SQLite"""
+        try:
+            self.external_engine = create_engine(f"sqlite:///{db_path}")
+            self.connection_type = "external_sqlite"
+            self.invalidate_schema_catalog("external")
+            return True, "Успешно подключено к внешней SQLite"
+        except Exception as e:
+            return False, f"Ошибка подключения к SQLite: {str(e)}"
+
+    def connect_mysql(self, host, port, user, password, database):
+        """Подключение к внешней MySQL"""
+        try:
+            connection_string = (
+                f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}"
+            )
+            self.external_engine = create_engine(connection_string)
+            self.connection_type = "external_mysql"
+            self.invalidate_schema_catalog("external")
+            return True, "Успешно подключено к внешней MySQL"
+        except Exception as e:
+            return False, f"Ошибка подключения к MySQL: {str(e)}"
+
+    def connect_sqlserver(
+        self, server, database, user=None, password=None, trusted_connection=True
+    ):
+        """Подключение к SQL Server"""
+        try:
+            if trusted_connection:
+                # Windows Authentication
+                connection_string = f"mssql+pyodbc://@{server}/{database}?driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes"
+            else:
+                # SQL Server Authentication
+                connection_string = f"mssql+pyodbc://{user}:{password}@{server}/{database}?driver=ODBC+Driver+17+for+SQL+Server"
+
+            # fast_executemany передает порцию строк одним массивом параметров
+            self.external_engine = create_engine(
+                connection_string, fast_executemany=True
+            )
+            self.connection_type = "external_sqlserver"
+            self.invalidate_schema_catalog("external")
+            return True, "Успешно подключено к SQL Server"
+        except Exception as e:
+            return False, f"Ошибка подключения к SQL Server: {str(e)}"
+
+    def disconnect_external_db(self):
+        """Отключение от внешней базы данных"""
+        if self.external_engine:
+            self.external_engine.dispose()
+            self.external_engine = None
+            self.connection_type = "internal"
+            self.invalidate_schema_catalog("external")
+            return True, "Отключено от внешней базы данных"
+        return False, "Нет активного подключения к внешней БД"
+
+    def load_data_to_internal_db(self, data, table_name="dataset", if_exists="replace"):
+        """Загрузка данных во внутреннюю базу данных
+
+        if_exists="append" дописывает строки в существующую таблицу, что
+        позволяет инкрементально обновить зависящие от нее представления.
+        """
+        try:
+            if self.internal_engine is None:
+                self.setup_internal_db()
+
+            # Создаем копию данных для обработки
+            processed_data = data.copy()
+
+            # Обрабатываем колонки со сложными типами данных
+            import json
+
+            print(
+                f"Обрабатываем данные: {len(processed_data)} строк, {len(processed_data.columns)} колонок"
+            )
+
+            for column in processed_data.columns:
+                print(f"Обрабатываем колонку: {column}")
+
+                # Сложные объекты (списки, словари, массивы из Parquet/Arrow)
+                # бывают только в колонках типа object, остальные не проверяем
+                if processed_data[column].dtype != object:
+                    continue
+                is_complex = processed_data[column].map(
+                    lambda value: isinstance(value, (list, dict, np.ndarray))
+                )
+
+                # Если нужна конвертация, обрабатываем всю колонку
+                if is_complex.any():
+                    print(f"Конвертируем колонку {column}")
+
+                    def convert_to_json_string(x):
+                        if isinstance(x, np.ndarray):
+                            x = x.tolist()
+                        if isinstance(x, (list, dict)):
+                            try:
+                                return json.dumps(
+                                    x, ensure_ascii=False, separators=(",", ":")
+                                )
+                            except Exception as e:
+                                print(f"Ошибка конвертации значения {x}: {e}")
+                                return str(x)
+                        elif pd.isna(x):
+                            return None
+                        else:
+                            return str(x)
+
+                    try:
+                        processed_data[column] = processed_data[column].apply(
+                            convert_to_json_string
+                        )
+                        print(f"Колонка {column} успешно конвертирована")
+                    except Exception as e:
+                        print(f"Ошибка при конвертации колонки {column}: {e}")
+                        # В крайнем случае, конвертируем все в строки
+                        processed_data[column] = processed_data[column].astype(str)
+
+            print("Начинаем сохранение в БД...")
+
+            # Сохраняем обработанные данные в таблицу многострочными INSERT
+            with self.internal_write_lock:
+                processed_data.to_sql(
+                    table_name,
+                    self.internal_engine,
+                    if_exists=if_exists,
+                    index=False,
+                    method=insert_multirow,
+                    chunksize=max(
+                        MAX_INSERT_PARAMETERS["sqlite"] // max(len(processed_data.columns), 1), 1
+                    ),
+                )
+            self.current_table_name = table_name
+            self.mark_table_loaded(table_name, replaced=if_exists != "append")
+            print("Данные успешно сохранены в БД")
+            return True, f"Данные загружены в таблицу '{table_name}'"
+        except Exception as e:
+            print(f"Полная ошибка: {str(e)}")
+            return False, f"Ошибка загрузки данных в БД: {str(e)}"
+
+    def clear_internal_data(self):
+        """Очистка внутренней базы данных"""
+        try:
+            if self.internal_engine:
+                # Пересоздаем внутреннюю БД
+                self.close_internal_db()
+                self.setup_internal_db()
+                self.current_table_name = None
+                self.remote_imports.clear()
+                with self.table_versions_lock:
+                    self.table_versions.clear()
+                self.materialized_views.clear()
+                self.invalidate_schema_catalog("internal")
+                return True, "Внутренняя база данных очищена"
+            return False, "Внутренняя база данных не инициализирована"
+        except Exception as e:
+            return False, f"Ошибка очистки БД: {str(e)}"
+
+    def get_table_names(self, scope=None):
+        """Получение списка таблиц активной БД или scope (из кэша каталога)"""
+        catalog = self.get_schema_catalog(scope=scope)
+        return list(catalog["tables"]) if catalog else []
+
+    def get_catalog_scope(self):
+        """Ключ каталога активной базы данных: внешняя или внутренняя"""
+        if self.connection_type.startswith("external") and self.external_engine:
+            return "external"
+        return "internal"
+
+    def get_cached_schema_catalog(self, scope=None):
+        """Каталог активной БД (или scope) из кэша или None, если он не загружен"""
+        return self.schema_catalog.get(scope or self.get_catalog_scope())
+
+    def get_schema_catalog(self, refresh=False, scope=None):
+        """Каталог схемы активной БД: таблицы, колонки, типы, число строк, размеры
+
+        Каталог загружается один раз и хранится до инвалидации (загрузка,
+        экспорт, подключение/отключение), поэтому повторные обращения из
+        интерфейса не выполняют запросов к БД.
+        """
+        if not refresh:
+            catalog = self.get_cached_schema_catalog(scope)
+            if catalog is not None:
+                return catalog
+        success, catalog = self.refresh_schema_catalog(scope=scope)
+        return catalog if success else None
+
+    def refresh_schema_catalog(self, progress_callback=None, scope=None):
+        """Загрузка каталога схемы активной БД (или scope) через инспектор SQLAlchemy
+
+        Может выполняться в фоновом потоке. Если каталог был инвалидирован
+        во время загрузки, результат не кэшируется.
+        """
+        scope = scope or self.get_catalog_scope()
+        engine = self.external_engine if scope == "external" else self.internal_engine
+        if engine is None:
+            return False, "Нет доступной базы данных"
+
+        with self.catalog_lock:
+            generation = self.catalog_generation[scope]
+        try:
+            started = time.perf_counter()
+            catalog = self._inspect_schema(engine, scope, progress_callback)
+            catalog["load_time"] = time.perf_counter() - started
+        except Exception as e:
+            print(f"Ошибка получения списка таблиц: {e}")
+            return False, f"Ошибка загрузки каталога схемы: {str(e)}"
+
+        with self.catalog_lock:
+            if self.catalog_generation[scope] == generation:
+                self.schema_catalog[scope] = catalog
+        return True, catalog
+
+    def invalidate_schema_catalog(self, scope=None):
+        """Сброс кэша каталога (scope: "internal", "external" или оба)"""
+        with self.catalog_lock:
+            for name in [scope] if scope else list(self.catalog_generation):
+                self.schema_catalog.pop(name, None)
+                self.catalog_generation[name] += 1
+
+    def _inspect_schema(self, engine, scope, progress_callback=None):
+        """Чтение таблиц, колонок и статистики таблиц одной БД"""
+        inspector = inspect(engine)
+        schemas = [None]
+        if scope == "internal":
+            # Таблицы присоединенных баз показываем с псевдонимом схемы
+            schemas += list(self.attached_databases)
+
+        tables = {}
+        for schema in schemas:
+            columns = inspector.get_multi_columns(schema=schema)
+            primary_keys = inspector.get_multi_pk_constraint(schema=schema)
+            for (_, table_name), table_columns in sorted(columns.items()):
+                qualified = f"{schema}.{table_name}" if schema else table_name
+                primary_key = primary_keys.get((schema, table_name)) or {}
+                tables[qualified] = {
+                    "columns": [
+                        (column["name"], str(column["type"])) for column in table_columns
+                    ],
+                    "primary_key": primary_key.get("constrained_columns") or [],
+                    "row_count": None,
+                    "size_bytes": None,
+                }
+            if progress_callback:
+                progress_callback(f"Каталог схемы: {len(tables)} таблиц")
+
+        with engine.connect() as conn:
+            for name, row_count, size_bytes in self._read_table_stats(
+                conn, engine.dialect.name, tables
+            ):
+                if name in tables:
+                    tables[name]["row_count"] = row_count
+                    tables[name]["size_bytes"] = size_bytes
+
+        return {
+            "scope": scope,
+            "dialect": engine.dialect.name,
+            "tables": tables,
+            "loaded_at": time.time(),
+        }
+
+    def _read_table_stats(self, conn, dialect_name, tables):
+        """Приблизительное число строк и размер таблиц из статистики СУБД"""
+        if dialect_name == "mysql":
+            result = conn.execute(
+                text(
+                    "SELECT TABLE_NAME, TABLE_ROWS, DATA_LENGTH + INDEX_LENGTH "
+                    "FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()"
+                )
+            )
+            return [tuple(row) for row in result]
+
+        if dialect_name == "mssql":
+            result = conn.execute(
+                text(
+                    "SELECT t.name, SUM(p.row_count), SUM(p.used_page_count) * 8192 "
+                    "FROM sys.tables t JOIN sys.dm_db_partition_stats p "
+                    "ON p.object_id = t.object_id AND p.index_id IN (0, 1) "
+                    "GROUP BY t.name"
+                )
+            )
+            return [tuple(row) for row in result]
+
+        # SQLite не хранит число строк: MAX(rowid) читается по индексу без
+        # сканирования таблицы и совпадает с числом строк, если их не удаляли
+        stats = []
+        for name in tables:
+            schema, _, table_name = name.rpartition(".")
+            source = f'"{schema}"."{table_name}"' if schema else f'"{table_name}"'
+            try:
+                row_count = conn.exec_driver_sql(
+                    f"SELECT MAX(rowid) FROM {source}"
+                ).scalar()
+            except Exception:
+                row_count = None  # Таблица WITHOUT ROWID
+            stats.append((name, row_count or 0, None))
+        return stats
+
+    def open_table_pager(self, table_name, page_size=1000):
+        """Создание постраничного просмотра таблицы активной БД"""
+        catalog = self.get_schema_catalog()
+        if catalog is None or table_name not in catalog["tables"]:
+            return False, f"Таблица не найдена: {table_name}"
+        info = catalog["tables"][table_name]
+        return True, TablePager(
+            self.get_active_engine(),
+            table_name,
+            key_columns=info["primary_key"],
+            page_size=page_size,
+            total_rows=info["row_count"],
+        )
+
+    def profile_table(self, table_name, column_callback=None, progress_callback=None):
+        """Профиль колонок таблицы активной БД агрегатными запросами
+
+        Данные не загружаются: для каждой колонки выполняются COUNT, MIN,
+        MAX, COUNT(DISTINCT) и AVG, запрос частых значений и (для чисел)
+        гистограмма через GROUP BY. Формат профиля как в profiling.profile_data.
+        """
+        catalog = self.get_schema_catalog()
+        if catalog is None or table_name not in catalog["tables"]:
+            return False, f"Таблица не найдена: {table_name}"
+        engine = self.get_active_engine()
+        dialect = engine.dialect
+        source = quote_table_name(dialect, table_name)
+        columns = catalog["tables"][table_name]["columns"]
+
+        profiles = []
+        with engine.connect() as conn:
+            for position, (column, type_name) in enumerate(columns):
+                if progress_callback:
+                    progress_callback(
+                        (position, len(columns), f"Профиль: колонка {column}")
+                    )
+                try:
+                    profile = self._profile_column_sql(
+                        conn, dialect, source, column, type_name
+                    )
+                except Exception as e:
+                    print(f"Ошибка профиля колонки {column}: {str(e)}")
+                    conn.rollback()
+                    profile = {
+                        "name": column,
+                        "dtype": f"{type_name} (ошибка)",
+                        "count": None,
+                        "nulls": None,
+                        "min": None,
+                        "max": None,
+                        "mean": None,
+                        "distinct": None,
+                        "distinct_exact": True,
+                        "top": [],
+                        "histogram": [],
+                    }
+                profiles.append(profile)
+                if column_callback:
+                    column_callback(profile)
+        if progress_callback:
+            progress_callback((len(columns), len(columns), f"Профиль готов: {len(columns)} колонок"))
+        return True, profiles
+
+    def _profile_column_sql(self, conn, dialect, source, column, type_name):
+        """Профиль одной колонки таблицы по агрегатным запросам"""
+        quoted = dialect.identifier_preparer.quote(column)
+        numeric = bool(NUMERIC_TYPE_RE.search(type_name))
+        aggregates = (
+            f"COUNT(*), COUNT({quoted}), MIN({quoted}), MAX({quoted}), "
+            f"COUNT(DISTINCT {quoted})"
+        )
+        if numeric:
+            aggregates += f", AVG({quoted} * 1.0)"
+        row = conn.execute(text(f"SELECT {aggregates} FROM {source}")).fetchone()
+        count, non_null, low, high, distinct = row[:5]
+        profile = {
+            "name": column,
+            "dtype": type_name,
+            "count": count,
+            "nulls": count - non_null,
+            "min": low,
+            "max": high,
+            "mean": row[5] if numeric else None,
+            "distinct": distinct,
+            "distinct_exact": True,
+            "top": [],
+            "histogram": [],
+        }
+
+        if non_null and distinct < non_null:
+            result = conn.execute(
+                text(build_top_values_query(dialect, source, column, TOP_VALUES_COUNT))
+            )
+            profile["top"] = [(value, n) for value, n in result]
+
+        if numeric and non_null and low is not None and high > low:
+            profile["histogram"] = self._read_histogram(
+                conn, dialect, source, column, float(low), float(high), HISTOGRAM_BINS
+            )
+        return profile
+
+    def _read_histogram(self, conn, dialect, source, column, low, high, bins):
+        """Число значений колонки в bins равных интервалах от low до high"""
+        counts = [0] * bins
+        result = conn.execute(
+            text(build_histogram_query(dialect, source, column)),
+            {"low": low, "width": (high - low) / bins},
+        )
+        for bin_index, n in result:
+            # Максимальное значение попадает в последний интервал
+            counts[min(int(bin_index), bins - 1)] += n
+        return counts
+
+    def get_table_column_type(self, table_name, column):
+        """Тип колонки таблицы активной БД из каталога схемы (None, если нет)"""
+        catalog = self.get_schema_catalog()
+        if catalog is None or table_name not in catalog["tables"]:
+            return None
+        return dict(catalog["tables"][table_name]["columns"]).get(column)
+
+    def table_histogram(self, table_name, column, bins=30, progress_callback=None):
+        """Гистограмма числовой колонки таблицы, посчитанная на стороне БД
+
+        Передаются только границы и число значений в интервалах, поэтому
+        объем таблицы не влияет на объем данных. Возвращает
+        (успех, (число значений, границы интервалов)).
+        """
+        type_name = self.get_table_column_type(table_name, column)
+        if type_name is None:
+            return False, f"Колонка не найдена: {table_name}.{column}"
+        if not NUMERIC_TYPE_RE.search(type_name):
+            return False, f"Гистограмма в БД строится только по числовым колонкам ({column}: {type_name})"
+        engine = self.get_active_engine()
+        dialect = engine.dialect
+        source = quote_table_name(dialect, table_name)
+        quoted = dialect.identifier_preparer.quote(column)
+        try:
+            with engine.connect() as conn:
+                if progress_callback:
+                    progress_callback(f"Гистограмма {column}: диапазон значений")
+                low, high = conn.execute(
+                    text(f"SELECT MIN({quoted}), MAX({quoted}) FROM {source}")
+                ).fetchone()
+                if low is None:
+                    return True, ([], [])
+                low, high = float(low), float(high)
+                if high == low:
+                    # Все значения одинаковы: один интервал единичной ширины
+                    low, high = low - 0.5, high + 0.5
+                if progress_callback:
+                    progress_callback(f"Гистограмма {column}: подсчет по интервалам")
+                counts = self._read_histogram(conn, dialect, source, column, low, high, bins)
+        except Exception as e:
+            return False, f"Ошибка расчета гистограммы: {str(e)}"
+        return True, (counts, np.linspace(low, high, bins + 1))
+
+    def table_grouped_means(self, table_name, x_column, y_column, progress_callback=None):
+        """Средние y по значениям x (GROUP BY на стороне БД)
+
+        Возвращает (успех, DataFrame с колонками x_column и y_column).
+        """
+        type_name = self.get_table_column_type(table_name, y_column)
+        if type_name is None or self.get_table_column_type(table_name, x_column) is None:
+            return False, f"Колонка не найдена в таблице {table_name}"
+        if not NUMERIC_TYPE_RE.search(type_name):
+            return False, f"Среднее в БД считается только по числовым колонкам ({y_column}: {type_name})"
+        engine = self.get_active_engine()
+        dialect = engine.dialect
+        source = quote_table_name(dialect, table_name)
+        x_quoted = dialect.identifier_preparer.quote(x_column)
+        y_quoted = dialect.identifier_preparer.quote(y_column)
+        # Умножение на 1.0 — чтобы AVG целых не округлялся (SQL Server, SQLite)
+        query = (
+            f"SELECT {x_quoted}, AVG({y_quoted} * 1.0) FROM {source} "
+            f"WHERE {x_quoted} IS NOT NULL GROUP BY {x_quoted} ORDER BY {x_quoted}"
+        )
+        if progress_callback:
+            progress_callback(f"Средние {y_column} по {x_column}: запрос к БД")
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(text(query)).fetchall()
+        except Exception as e:
+            return False, f"Ошибка расчета средних: {str(e)}"
+        data = pd.DataFrame(rows, columns=[x_column, y_column])
+        data[y_column] = pd.to_numeric(data[y_column])
+        return True, data
+
+    def get_active_engine(self):
+        """Получение движка активной базы данных (внешней или внутренней)"""
+        if self.connection_type.startswith("external") and self.external_engine:
+            return self.external_engine
+        return self.internal_engine
+
+    def stream_query(
+        self, query, params=None, batch_size=10000, engine=None, read_only=False
+    ):
+        """Потоковое выполнение запроса без материализации всего результата
+
+        Генератор возвращает кортежи (колонки, порция строк). Строки читаются
+        курсором на стороне сервера (где драйвер это поддерживает) порциями
+        по batch_size. При read_only=True запрос к SQLite выполняется в режиме
+        PRAGMA query_only, исключающем любые изменения.
+        """
+        engine = engine or self.get_active_engine()
+        if engine is None:
+            raise RuntimeError("Нет доступной базы данных")
+
+        with engine.connect() as conn:
+            read_only_sqlite = read_only and engine.dialect.name == "sqlite"
+            if read_only_sqlite:
+                conn.exec_driver_sql("PRAGMA query_only = ON")
+            try:
+                result = conn.execution_options(
+                    stream_results=True, yield_per=batch_size
+                ).execute(text(query), params or {})
+                columns = list(result.keys())
+                empty = True
+                for rows in result.partitions(batch_size):
+                    empty = False
+                    yield columns, rows
+                if empty:
+                    # Колонки нужны потребителю и для пустого результата
+                    yield columns, []
+            finally:
+                if read_only_sqlite:
+                    conn.exec_driver_sql("PRAGMA query_only = OFF")
+
+    def export_query_to_csv(
+        self, query, file_path, compression=None, batch_size=10000, progress_callback=None
+    ):
+        """Выполнение запроса с записью результата сразу в CSV файл
+
+        Строки читаются курсором порциями по batch_size и дописываются в файл,
+        результат целиком в памяти не собирается. Сжатие (gzip, zstd)
+        по умолчанию определяется по расширению: .csv.gz, .csv.zst.
+        """
+        if not is_select_query(query):
+            return False, "В файл выгружается только результат запроса SELECT"
+        engine = self.get_active_engine()
+        if engine is None:
+            return False, "Нет доступной базы данных"
+        if compression is None:
+            compression = detect_compression(file_path)
+
+        started = time.perf_counter()
+        try:
+            rows = write_csv_batches(
+                self.stream_query(
+                    query, batch_size=batch_size, engine=engine, read_only=True
+                ),
+                file_path,
+                compression,
+                progress_callback,
+            )
+        except Exception as e:
+            # Недописанный файл не оставляем
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            return False, f"Ошибка выгрузки результата в файл: {str(e)}"
+
+        elapsed = time.perf_counter() - started
+        rate = rows / elapsed if elapsed else 0
+        return True, (
+            f"Результат запроса записан в {file_path}: {rows} строк "
+            f"за {elapsed:.1f} с ({rate:.0f} строк/с)"
+        )
+
+    def export_table_to_file(
+        self, table_name, file_path, file_format=None, compression=None,
+        chunksize=100000, progress_callback=None,
+    ):
+        """Выгрузка целой таблицы внутренней БД в файл порциями
+
+        Для Parquet каждая порция дописывается через ParquetWriter, для
+        Feather/Arrow — в один IPC файл, поэтому таблица не собирается в
+        памяти целиком. CSV выгружается курсором, как export_query_to_csv.
+        """
+        try:
+            file_format = file_format or detect_file_format(file_path)
+        except ValueError as e:
+            return False, str(e)
+        dialect = self.internal_engine.dialect
+        if file_format == "csv":
+            query = f"SELECT * FROM {quote_table_name(dialect, table_name)}"
+            return self.export_query_to_csv(
+                query, file_path, progress_callback=progress_callback
+            )
+        if file_format not in COLUMNAR_FORMATS:
+            return False, f"Выгрузка в формат {file_format} не поддерживается"
+
+        schema, _, name = table_name.rpartition(".")
+        started = time.perf_counter()
+        try:
+            with self.internal_engine.connect() as conn:
+                # read_sql_table восстанавливает типы колонок (даты, логические)
+                chunks = pd.read_sql_table(
+                    name, conn, schema=schema or None, chunksize=chunksize
+                )
+                rows = write_columnar_chunks(
+                    chunks,
+                    file_path,
+                    file_format,
+                    compression,
+                    progress_callback=progress_callback,
+                    column_types=self.table_arrow_types(conn, table_name),
+                )
+        except Exception as e:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            return False, f"Ошибка выгрузки таблицы в файл: {str(e)}"
+
+        elapsed = time.perf_counter() - started
+        return True, (
+            f"Таблица '{table_name}' записана в {file_path}: {rows} строк "
+            f"за {elapsed:.1f} с"
+        )
+
+    def table_arrow_types(self, conn, table_name):
+        """Типы Arrow колонок таблицы по их объявленным типам
+
+        Словарь колонка -> тип Arrow (None, если тип не объявлен) в порядке
+        колонок таблицы. Колонка, пустая в начале таблицы, получает свой тип,
+        а для пустой таблицы известны все колонки.
+        """
+        schema, _, name = table_name.rpartition(".")
+        columns = inspect(conn).get_columns(name, schema=schema or None)
+        return {column["name"]: arrow_type_for_column(column["type"]) for column in columns}
+
+    def execute_query(self, query):
+        """Выполнение SQL запроса"""
+        try:
+            # Определяем, какую базу использовать
+            engine = self.get_active_engine()
+            if engine is None:
+                return False, "Нет доступной базы данных"
+
+            with engine.connect() as conn:
+                result = pd.read_sql(text(query), conn)
+            if engine is self.internal_engine:
+                self.mark_tables_modified(query)
+            elif not is_select_query(query):
+                self.invalidate_schema_catalog("external")
+            return True, result
+        except Exception as e:
+            return False, f"Ошибка выполнения запроса: {str(e)}"
+
+    def begin_transaction(self, conn):
+        """Начало явной транзакции на соединении"""
+        transaction = conn.begin()
+        if conn.dialect.name == "sqlite":
+            # pysqlite не открывает транзакцию сам до первого DML,
+            # без явного BEGIN DDL и RELEASE SAVEPOINT фиксировались бы сразу
+            conn.exec_driver_sql("BEGIN")
+        return transaction
+
+    def execute_script(self, script, stop_on_error=True):
+        """Выполнение SQL скрипта из нескольких операторов в одной транзакции
+
+        Все операторы выполняются на одном соединении, каждый — внутри своей
+        точки сохранения (SAVEPOINT). При stop_on_error=True ошибка откатывает
+        всю транзакцию, иначе откатывается только ошибочный оператор.
+        В DataFrame материализуется только результат последнего оператора,
+        если он возвращает строки. DDL в MySQL выполняет неявный COMMIT,
+        поэтому откат таких скриптов в MySQL возможен лишь частично.
+
+        Возвращает (успех, {"data": DataFrame или None, "statements": отчет,
+        "total_time": секунды}) или (False, сообщение об ошибке).
+        """
+        statements = split_sql_statements(script)
+        if not statements:
+            return False, "Скрипт не содержит SQL операторов"
+
+        engine = self.get_active_engine()
+        if engine is None:
+            return False, "Нет доступной базы данных"
+
+        report = []
+        data = None
+        started = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                transaction = self.begin_transaction(conn)
+
+                for index, statement in enumerate(statements, start=1):
+                    item = {"index": index, "statement": statement, "duration": 0.0}
+                    savepoint = conn.begin_nested()
+                    statement_started = time.perf_counter()
+                    try:
+                        result = conn.execute(text(statement))
+                        if result.returns_rows and index == len(statements):
+                            data = pd.DataFrame(
+                                result.fetchall(), columns=list(result.keys())
+                            )
+                            item["rowcount"] = len(data)
+                        else:
+                            item["rowcount"] = (
+                                -1 if result.returns_rows else result.rowcount
+                            )
+                            result.close()
+                        savepoint.commit()
+                        item["status"] = "ok"
+                    except Exception as e:
+                        savepoint.rollback()
+                        item["status"] = "ошибка"
+                        item["error"] = str(e).splitlines()[0]
+                    item["duration"] = time.perf_counter() - statement_started
+                    report.append(item)
+
+                    if item["status"] != "ok" and stop_on_error:
+                        transaction.rollback()
+                        for skipped in statements[index:]:
+                            report.append(
+                                {
+                                    "index": len(report) + 1,
+                                    "statement": skipped,
+                                    "duration": 0.0,
+                                    "status": "пропущен",
+                                }
+                            )
+                        return False, (
+                            f"Ошибка в операторе {index}, транзакция отменена:\n"
+                            + format_script_report(report)
+                        )
+
+                transaction.commit()
+        except Exception as e:
+            return False, f"Ошибка выполнения скрипта: {str(e)}"
+        finally:
+            if engine is self.internal_engine:
+                self.mark_tables_modified(script)
+            else:
+                self.invalidate_schema_catalog("external")
+
+        return True, {
+            "data": data,
+            "statements": report,
+            "total_time": time.perf_counter() - started,
+        }
+
+    def mark_table_loaded(self, table_name, replaced=True):
+        """Учет загрузки во внутреннюю таблицу и обновление зависимых представлений"""
+        with self.table_versions_lock:
+            state = self.table_versions.setdefault(
+                table_name, {"version": 0, "replaced_at": 0}
+            )
+            state["version"] += 1
+            if replaced:
+                state["replaced_at"] = state["version"]
+        self.invalidate_schema_catalog("internal")
+
+        for message in self.refresh_materialized_views(source_table=table_name):
+            print(message)
+
+    def mark_tables_modified(self, sql):
+        """Учет изменений таблиц произвольным SQL: зависимые представления
+        будут пересчитаны полностью при следующем обновлении"""
+        with self.table_versions_lock:
+            for table_name in set(MODIFIED_TABLE_RE.findall(sql)):
+                if table_name in self.table_versions:
+                    state = self.table_versions[table_name]
+                    state["version"] += 1
+                    state["replaced_at"] = state["version"]
+        if not is_select_query(sql):
+            self.invalidate_schema_catalog("internal")
+
+    def _capture_source_state(self, conn, sources):
+        """Снимок версий исходных таблиц на момент обновления представления"""
+        state = {}
+        for source in sources:
+            with self.table_versions_lock:
+                versions = dict(
+                    self.table_versions.setdefault(source, {"version": 0, "replaced_at": 0})
+                )
+            max_rowid = conn.execute(
+                text(f'SELECT MAX(rowid) FROM "{source}"')
+            ).scalar()
+            state[source] = {
+                "version": versions["version"],
+                "max_rowid": max_rowid or 0,
+            }
+        return state
+
+    def create_materialized_view(self, name, query):
+        """Создание материализованного представления во внутренней БД
+
+        Результат запроса сохраняется как таблица name. Для запросов вида
+        SELECT <группировка>, SUM/COUNT/MIN/MAX(...) FROM t [WHERE] [GROUP BY]
+        последующие обновления после дозагрузки (append) в t считают агрегаты
+        только по новым строкам и сливают их с сохраненным результатом.
+        """
+        if not IDENTIFIER_RE.match(name or ""):
+            return False, f"Недопустимое имя представления: '{name}'"
+        query = query.strip().rstrip(";")
+        if not is_select_query(query):
+            return False, "Материализованное представление строится по запросу SELECT"
+        if name in self.materialized_views:
+            return False, f"Представление '{name}' уже существует"
+
+        # Представление хранится во внутренней БД, даже если подключена внешняя
+        existing = set(self.get_table_names(scope="internal"))
+        if name in existing:
+            return False, f"Таблица '{name}' уже существует"
+        aggregate = parse_aggregate_query(query)
+        if aggregate:
+            sources = [aggregate["table"]] if aggregate["table"] in existing else []
+        else:
+            referenced = re.findall(r"\b(?:FROM|JOIN)\s+[\"`\[]?(\w+)", query, re.IGNORECASE)
+            sources = sorted(set(referenced) & existing)
+        if not sources:
+            return False, "Запрос не ссылается на таблицы внутренней БД"
+
+        self.materialized_views[name] = {
+            "query": query,
+            "sources": sources,
+            "aggregate": aggregate,
+            "source_state": {},
+        }
+        success, message = self.refresh_materialized_view(name, full=True)
+        if not success:
+            del self.materialized_views[name]
+        return success, message
+
+    def refresh_materialized_view(self, name, full=False):
+        """Обновление материализованного представления
+
+        Пересчет пропускается, если исходные таблицы не менялись. После
+        дозагрузок в единственную исходную таблицу агрегирующее представление
+        обновляется инкрементально, в остальных случаях — пересчитывается целиком.
+        """
+        view = self.materialized_views.get(name)
+        if view is None:
+            return False, f"Представление '{name}' не найдено"
+
+        # Проверка и пересчет под одной блокировкой: иначе два потока могут
+        # дважды слить в представление одни и те же новые строки
+        with self.internal_write_lock:
+            return self._refresh_materialized_view(name, view, full)
+
+    def _refresh_materialized_view(self, name, view, full):
+        """Пересчет представления; вызывается под internal_write_lock"""
+        previous = view["source_state"]
+        if not full:
+            with self.table_versions_lock:
+                versions = {
+                    source: dict(self.table_versions.get(source, {}))
+                    for source in view["sources"]
+                }
+            changed = [
+                source
+                for source in view["sources"]
+                if versions[source].get("version")
+                != previous.get(source, {}).get("version")
+            ]
+            if not changed:
+                return True, f"Представление '{name}' актуально"
+            # Инкрементально только если таблица с тех пор лишь дополнялась
+            source = view["sources"][0]
+            full = view["aggregate"] is None or versions[source][
+                "replaced_at"
+            ] > previous[source]["version"]
+
+        started = time.perf_counter()
+        try:
+            with self.internal_engine.connect() as conn:
+                transaction = self.begin_transaction(conn)
+                if full:
+                    conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{name}"')
+                    conn.exec_driver_sql(f'CREATE TABLE "{name}" AS {view["query"]}')
+                else:
+                    self._merge_aggregate_delta(
+                        conn, name, view, previous[view["sources"][0]]["max_rowid"]
+                    )
+                view["source_state"] = self._capture_source_state(conn, view["sources"])
+                transaction.commit()
+        except Exception as e:
+            return False, f"Ошибка обновления представления '{name}': {str(e)}"
+
+        mode = "полностью" if full else "инкрементально"
+        elapsed = time.perf_counter() - started
+        # Таблица представления пересоздана: зависящие от нее представления
+        # пересчитываются целиком
+        self.mark_table_loaded(name, replaced=True)
+        return True, f"Представление '{name}' обновлено {mode} за {elapsed:.3f} с"
+
+    def _merge_aggregate_delta(self, conn, name, view, last_rowid):
+        """Слияние агрегатов по новым строкам с сохраненным результатом"""
+        aggregate = view["aggregate"]
+        conditions = [f"rowid > {int(last_rowid)}"]
+        if aggregate["where"]:
+            conditions.insert(0, f"({aggregate['where']})")
+        delta_query = (
+            f"SELECT {aggregate['items']} FROM \"{aggregate['table']}\" "
+            f"WHERE {' AND '.join(conditions)}"
+        )
+        if aggregate["group"]:
+            delta_query += f" GROUP BY {aggregate['group']}"
+
+        columns = [
+            row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{name}")')
+        ]
+        select_items = []
+        group_columns = []
+        for column, kind in zip(columns, aggregate["kinds"]):
+            quoted = '"' + column.replace('"', '""') + '"'
+            if kind == "GROUP":
+                select_items.append(quoted)
+                group_columns.append(quoted)
+            else:
+                select_items.append(f"{MERGEABLE_AGGREGATES[kind]}({quoted}) AS {quoted}")
+
+        merge_query = (
+            f"SELECT {', '.join(select_items)} FROM "
+            f'(SELECT * FROM "{name}" UNION ALL {delta_query}) AS merged'
+        )
+        if group_columns:
+            merge_query += f" GROUP BY {', '.join(group_columns)}"
+
+        conn.exec_driver_sql(f'DROP TABLE IF EXISTS "_mv_{name}_new"')
+        conn.exec_driver_sql(f'CREATE TABLE "_mv_{name}_new" AS {merge_query}')
+        conn.exec_driver_sql(f'DROP TABLE "{name}"')
+        conn.exec_driver_sql(f'ALTER TABLE "_mv_{name}_new" RENAME TO "{name}"')
+
+    def refresh_materialized_views(self, source_table=None):
+        """Обновление всех представлений (или зависящих от source_table)"""
+        messages = []
+        for name, view in list(self.materialized_views.items()):
+            if source_table is None or source_table in view["sources"]:
+                messages.append(self.refresh_materialized_view(name)[1])
+        return messages
+
+    def drop_materialized_view(self, name):
+        """Удаление материализованного представления и его таблицы"""
+        if name not in self.materialized_views:
+            return False, f"Представление '{name}' не найдено"
+        try:
+            with self.internal_engine.connect() as conn:
+                conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{name}"')
+                conn.commit()
+        except Exception as e:
+            return False, f"Ошибка удаления представления: {str(e)}"
+        del self.materialized_views[name]
+        self.invalidate_schema_catalog("internal")
+        return True, f"Представление '{name}' удалено"
+
+    def copy_table(
+        self,
+        source_table,
+        target_table=None,
+        to_internal=True,
+        if_exists="replace",
+        batch_size=10000,
+        progress_callback=None,
+    ):
+        """Потоковое копирование таблицы между внешней и внутренней БД
+
+        Строки читаются серверным курсором порциями по batch_size и
+        записываются в целевую БД пакетным executemany, каждая порция в своей
+        транзакции, поэтому объем памяти не зависит от размера таблицы.
+        Структура таблицы берется из источника, типы колонок переводятся
+        в общие типы SQLAlchemy (portable_column_type). Первичный ключ
+        сохраняется.
+        """
+        if not self.external_engine:
+            return False, "Нет подключения к внешней базе данных"
+        if if_exists not in ("replace", "append", "fail"):
+            return False, f"Недопустимый режим: {if_exists}"
+        if self.internal_engine is None:
+            self.setup_internal_db()
+
+        if to_internal:
+            source_engine, target_engine = self.external_engine, self.internal_engine
+            source_scope, target_scope = "external", "internal"
+        else:
+            source_engine, target_engine = self.internal_engine, self.external_engine
+            source_scope, target_scope = "internal", "external"
+        target_table = target_table or source_table.rpartition(".")[2]
+
+        started = time.perf_counter()
+        rows_copied = 0
+        try:
+            source_schema, _, source_name = source_table.rpartition(".")
+            source = Table(
+                source_name,
+                MetaData(),
+                schema=source_schema or None,
+                autoload_with=source_engine,
+            )
+            target_schema, _, target_name = target_table.rpartition(".")
+            target = Table(
+                target_name,
+                MetaData(),
+                *[
+                    Column(
+                        column.name,
+                        portable_column_type(column.type, target_engine.dialect.name),
+                        primary_key=column.primary_key,
+                        autoincrement=False,
+                        nullable=column.nullable,
+                    )
+                    for column in source.columns
+                ],
+                schema=target_schema or None,
+            )
+
+            # Число строк для полосы прогресса берем из каталога, если он загружен
+            catalog = self.get_cached_schema_catalog(source_scope)
+            total_rows = None
+            if catalog and source_table in catalog["tables"]:
+                total_rows = catalog["tables"][source_table]["row_count"]
+
+            with self.internal_write_lock:
+                exists = inspect(target_engine).has_table(
+                    target_name, schema=target_schema or None
+                )
+                if exists and if_exists == "fail":
+                    return False, f"Таблица '{target_table}' уже существует"
+                with target_engine.begin() as conn:
+                    if exists and if_exists == "replace":
+                        target.drop(conn)
+                    if not exists or if_exists == "replace":
+                        target.create(conn)
+
+                with source_engine.connect() as source_conn:
+                    result = source_conn.execution_options(
+                        stream_results=True, yield_per=batch_size
+                    ).execute(select(source))
+                    insert = target.insert()
+                    keys = list(result.keys())
+                    for rows in result.partitions(batch_size):
+                        with target_engine.begin() as conn:
+                            conn.execute(insert, [dict(zip(keys, row)) for row in rows])
+                        rows_copied += len(rows)
+                        if progress_callback:
+                            elapsed = time.perf_counter() - started
+                            rate = rows_copied / elapsed if elapsed else 0
+                            message = (
+                                f"Копирование '{source_table}': {rows_copied} строк "
+                                f"({rate:.0f} строк/с)"
+                            )
+                            if total_rows:
+                                progress_callback(
+                                    (min(rows_copied, total_rows), total_rows, message)
+                                )
+                            else:
+                                progress_callback(message)
+        except Exception as e:
+            return False, f"Ошибка копирования таблицы '{source_table}': {str(e)}"
+        finally:
+            self.invalidate_schema_catalog(target_scope)
+
+        if to_internal:
+            self.mark_table_loaded(target_table, replaced=if_exists != "append")
+        elapsed = time.perf_counter() - started
+        return True, (
+            f"Таблица '{source_table}' скопирована в '{target_table}' "
+            f"({'внутренняя' if to_internal else 'внешняя'} БД): "
+            f"{rows_copied} строк за {elapsed:.1f} с"
+        )
+
+    def import_remote_table(
+        self,
+        source,
+        target_table=None,
+        columns=None,
+        where=None,
+        incremental_column=None,
+        chunksize=50000,
+        progress_callback=None,
+    ):
+        """Импорт таблицы или запроса из внешней БД во внутреннюю порциями
+
+        Список колонок и условие WHERE передаются на сторону внешней БД, поэтому
+        по сети идут только нужные строки и колонки. Если указана
+        incremental_column (монотонный ключ или метка времени), последующие
+        вызовы refresh_remote_table догружают только строки с большим значением.
+        """
+        if (
+            not self.connection_type.startswith("external")
+            or not self.external_engine
+        ):
+            return False, "Нет подключения к внешней базе данных"
+
+        source = source.strip().rstrip(";")
+        if not source:
+            return False, "Укажите таблицу или запрос для импорта"
+        if not target_table:
+            target_table = "remote_data" if is_select_query(source) else source.split(".")[-1]
+
+        columns = [column.strip() for column in (columns or []) if column.strip()]
+        if incremental_column and columns and incremental_column not in columns:
+            columns.append(incremental_column)
+
+        spec = {
+            "source": source,
+            "columns": columns,
+            "where": (where or "").strip(),
+            "incremental_column": incremental_column or None,
+            "chunksize": chunksize,
+            "last_value": None,
+        }
+        success, message = self._pull_remote_rows(
+            spec, target_table, "replace", progress_callback
+        )
+        if success:
+            self.remote_imports[target_table] = spec
+        return success, message
+
+    def refresh_remote_table(self, target_table, progress_callback=None):
+        """Обновление ранее импортированной таблицы
+
+        При заданном инкрементальном ключе догружаются только новые строки,
+        иначе таблица импортируется заново целиком.
+        """
+        spec = self.remote_imports.get(target_table)
+        if spec is None:
+            return False, f"Таблица '{target_table}' не импортировалась из внешней БД"
+        if (
+            not self.connection_type.startswith("external")
+            or not self.external_engine
+        ):
+            return False, "Нет подключения к внешней базе данных"
+
+        if spec["incremental_column"] is None:
+            return self._pull_remote_rows(
+                spec, target_table, "replace", progress_callback
+            )
+        return self._pull_remote_rows(spec, target_table, "append", progress_callback)
+
+    def _build_remote_select(self, spec, incremental):
+        """Построение запроса к внешней БД с проекцией колонок и фильтрами"""
+        dialect = self.external_engine.dialect
+        preparer = dialect.identifier_preparer
+
+        if spec["columns"]:
+            select_list = ", ".join(preparer.quote(column) for column in spec["columns"])
+        else:
+            select_list = "*"
+
+        if is_select_query(spec["source"]):
+            from_clause = f"({spec['source']}) AS src"
+        else:
+            from_clause = quote_table_name(dialect, spec["source"])
+
+        conditions = []
+        if spec["where"]:
+            conditions.append(f"({spec['where']})")
+        if incremental:
+            conditions.append(
+                f"{preparer.quote(spec['incremental_column'])} > :last_value"
+            )
+
+        query = f"SELECT {select_list} FROM {from_clause}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return query
+
+    def _pull_remote_rows(self, spec, target_table, if_exists, progress_callback):
+        """Потоковое чтение строк из внешней БД и запись во внутреннюю порциями"""
+        incremental = if_exists == "append" and spec["last_value"] is not None
+        query = self._build_remote_select(spec, incremental)
+        params = {"last_value": spec["last_value"]} if incremental else {}
+        key = spec["incremental_column"]
+
+        try:
+            if self.internal_engine is None:
+                self.setup_internal_db()
+
+            total_rows = 0
+            last_value = spec["last_value"]
+            started = time.perf_counter()
+            with self.external_engine.connect() as conn:
+                conn = conn.execution_options(stream_results=True)
+                chunks = pd.read_sql(
+                    text(query), conn, params=params, chunksize=spec["chunksize"]
+                )
+                for chunk in chunks:
+                    with self.internal_write_lock:
+                        chunk.to_sql(
+                            target_table,
+                            self.internal_engine,
+                            if_exists=if_exists,
+                            index=False,
+                        )
+                    # Следующие порции всегда дописываются в таблицу
+                    if_exists = "append"
+                    total_rows += len(chunk)
+                    if key and len(chunk):
+                        chunk_max = chunk[key].max()
+                        if last_value is None or chunk_max > last_value:
+                            last_value = to_python_scalar(chunk_max)
+                    if progress_callback:
+                        progress_callback(f"Импортировано строк: {total_rows}")
+
+            spec["last_value"] = last_value
+            self.current_table_name = target_table
+            self.mark_table_loaded(target_table, replaced=not incremental)
+            elapsed = time.perf_counter() - started
+            mode = "догружено" if incremental else "загружено"
+            return True, (
+                f"Из внешней БД {mode} {total_rows} строк в таблицу "
+                f"'{target_table}' за {elapsed:.2f} с"
+            )
+        except Exception as e:
+            return False, f"Ошибка импорта из внешней БД: {str(e)}"
+
+    def run_batch(
+        self,
+        queries,
+        output_format="csv",
+        output_dir=None,
+        max_workers=4,
+        progress_callback=None,
+    ):
+        """Пакетное выполнение именованных запросов в пуле потоков
+
+        queries — список словарей {"name", "sql", "depends"} (см.
+        parse_batch_queries). Независимые запросы выполняются одновременно,
+        каждый на своем соединении из пула движка активной БД; запрос
+        запускается после успешного завершения всех его зависимостей.
+        Результат каждого запроса записывается в CSV/Parquet файл в output_dir
+        или в одноименную таблицу внутренней БД (output_format="table");
+        запросы без результата (CREATE, INSERT, UPDATE) только выполняются.
+        """
+        engine = self.get_active_engine()
+        if engine is None:
+            return False, "Нет доступной базы данных"
+        if not queries:
+            return False, "Нет запросов для выполнения"
+        if output_format not in ("csv", "parquet", "table"):
+            return False, f"Неподдерживаемый формат результата: {output_format}"
+        if output_format == "parquet" and not PYARROW_AVAILABLE:
+            return False, "Для записи Parquet установите библиотеку pyarrow"
+        if output_format != "table" and not output_dir:
+            return False, "Укажите папку для сохранения результатов"
+
+        by_name = {query["name"]: query for query in queries}
+        if len(by_name) != len(queries):
+            return False, "Имена запросов в пакете должны быть уникальными"
+        for query in queries:
+            unknown = [name for name in query["depends"] if name not in by_name]
+            if unknown:
+                return False, f"Запрос '{query['name']}' зависит от неизвестных: {', '.join(unknown)}"
+
+        # Потоков не больше, чем постоянных соединений в пуле движка
+        pool_size = engine.pool.size() if isinstance(engine.pool, QueuePool) else max_workers
+        workers = max(1, min(max_workers, pool_size, len(queries)))
+
+        results = {}
+        pending = dict(by_name)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            running = {}
+            while pending or running:
+                for name, query in list(pending.items()):
+                    states = [results.get(dep, {}).get("status") for dep in query["depends"]]
+                    if any(state not in (None, "ok") for state in states):
+                        results[name] = {
+                            "name": name,
+                            "status": "пропущен",
+                            "error": "не выполнены зависимости",
+                            "rows": 0,
+                            "duration": 0.0,
+                        }
+                        del pending[name]
+                    elif all(state == "ok" for state in states):
+                        future = executor.submit(
+                            self._run_batch_query, engine, query, output_format, output_dir
+                        )
+                        running[future] = name
+                        del pending[name]
+
+                if not running:
+                    # Оставшиеся запросы ждут друг друга — циклическая зависимость
+                    for name in pending:
+                        results[name] = {
+                            "name": name,
+                            "status": "ошибка",
+                            "error": "циклическая зависимость",
+                            "rows": 0,
+                            "duration": 0.0,
+                        }
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = future.result()
+                    results[running.pop(future)] = item
+                    if progress_callback:
+                        progress_callback(
+                            f"Пакет: выполнено {len(results)} из {len(queries)} ({item['name']})"
+                        )
+
+        wall_time = time.perf_counter() - started
+        sequential_time = sum(item["duration"] for item in results.values())
+        summary = {
+            "queries": [results[query["name"]] for query in queries],
+            "wall_time": wall_time,
+            "sequential_time": sequential_time,
+            "speedup": sequential_time / wall_time if wall_time > 0 else 1.0,
+            "workers": workers,
+        }
+        success = all(item["status"] == "ok" for item in summary["queries"])
+        return success, summary
+
+    def _run_batch_query(self, engine, query, output_format, output_dir):
+        """Выполнение одного запроса пакета и запись его результата"""
+        item = {"name": query["name"], "rows": 0}
+        started = time.perf_counter()
+        try:
+            # Каждый запрос в своей транзакции: результаты CREATE/INSERT видны
+            # зависящим от него запросам
+            with engine.begin() as conn:
+                result = conn.execute(text(query["sql"]))
+                if result.returns_rows:
+                    data = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+                else:
+                    data = None
+                    changed_rows = max(result.rowcount, 0)
+            if engine is self.internal_engine and not is_select_query(query["sql"]):
+                self.mark_tables_modified(query["sql"])
+
+            if data is None:
+                # Запрос без результата (DDL/DML): файл или таблица не создаются
+                item["output"] = "без результата"
+                item["rows"] = changed_rows
+            elif output_format == "table":
+                with self.internal_write_lock:
+                    data.to_sql(
+                        query["name"], self.internal_engine, if_exists="replace", index=False
+                    )
+                self.mark_table_loaded(query["name"])
+                item["output"] = f"таблица {query['name']}"
+            elif output_format == "parquet":
+                item["output"] = os.path.join(output_dir, f"{query['name']}.parquet")
+                data.to_parquet(item["output"], index=False)
+            else:
+                item["output"] = os.path.join(output_dir, f"{query['name']}.csv")
+                data.to_csv(item["output"], index=False, encoding="utf-8-sig")
+
+            if data is not None:
+                item["rows"] = len(data)
+            item["status"] = "ok"
+        except Exception as e:
+            item["status"] = "ошибка"
+            item["error"] = str(e).splitlines()[0]
+        item["duration"] = time.perf_counter() - started
+        return item
+
+    def merge_data_into_external_db(
+        self,
+        data,
+        table_name,
+        key_columns,
+        chunksize=EXPORT_CHUNK_SIZE,
+        resume=False,
+        progress_callback=None,
+        string_length=None,
+    ):
+        """Экспорт с обновлением существующих строк по ключевым колонкам
+
+        Данные загружаются порциями в промежуточную таблицу, затем одной
+        транзакцией переносятся в целевую (build_upsert_query): новые строки
+        вставляются, изменившиеся обновляются, остальные не затрагиваются.
+        Если целевой таблицы нет, данные выгружаются в нее обычным экспортом.
+        Для ON CONFLICT / ON DUPLICATE KEY по ключу создается уникальный
+        индекс, если его еще нет.
+        """
+        key_columns = [column for column in key_columns or [] if column]
+        if not key_columns:
+            return False, "Для режима merge укажите ключевые колонки"
+        missing = [column for column in key_columns if column not in data.columns]
+        if missing:
+            return False, f"Ключевые колонки отсутствуют в данных: {', '.join(missing)}"
+
+        engine = self.external_engine
+        schema, _, name = table_name.rpartition(".")
+        # Продолжение прерванной первой выгрузки: контрольная точка записана
+        # под именем целевой таблицы, а не промежуточной
+        resuming = table_name in self.export_checkpoints and resume
+        if resuming or not inspect(engine).has_table(name, schema=schema or None):
+            # Первая выгрузка: обычный экспорт и уникальный индекс для слияний
+            success, message = self.export_data_to_external_db(
+                data,
+                table_name,
+                "fail",
+                chunksize=chunksize,
+                resume=resume,
+                progress_callback=progress_callback,
+                key_columns=key_columns,
+                string_length=string_length,
+            )
+            if not success:
+                return False, message
+            try:
+                with engine.begin() as conn:
+                    self._create_unique_key(conn, table_name, key_columns)
+            except Exception as e:
+                return False, f"{message}, но уникальный индекс не создан: {str(e)}"
+            return True, message
+
+        staging_name = staging_table_name(table_name)
+        success, message = self.export_data_to_external_db(
+            data,
+            staging_name,
+            "replace",
+            chunksize=chunksize,
+            resume=resume,
+            progress_callback=progress_callback,
+            key_columns=key_columns,
+            string_length=string_length,
+        )
+        if not success:
+            return False, message
+
+        started = time.perf_counter()
+        try:
+            has_unique_key = self._has_unique_key(
+                inspect(engine), name, schema, key_columns
+            )
+            with engine.begin() as conn:
+                if not has_unique_key:
+                    self._create_unique_key(conn, table_name, key_columns)
+                # rowcount не используется: MySQL считает обновленную
+                # ON DUPLICATE KEY UPDATE строку дважды
+                conn.exec_driver_sql(
+                    build_upsert_query(
+                        engine.dialect,
+                        table_name,
+                        staging_name,
+                        list(data.columns),
+                        key_columns,
+                    )
+                )
+        except Exception as e:
+            return False, f"Ошибка слияния данных с таблицей '{table_name}': {str(e)}"
+        finally:
+            # Ошибка удаления не должна скрывать ошибку слияния
+            try:
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(
+                        f"DROP TABLE IF EXISTS {quote_table_name(engine.dialect, staging_name)}"
+                    )
+            except Exception as e:
+                print(f"Промежуточная таблица '{staging_name}' не удалена: {e}")
+            self.invalidate_schema_catalog("external")
+
+        elapsed = time.perf_counter() - started
+        return True, (
+            f"Данные объединены с таблицей '{table_name}' по ключу "
+            f"{', '.join(key_columns)}: обработано строк {len(data)}, новые "
+            f"добавлены, изменившиеся обновлены (слияние {elapsed:.1f} с)"
+        )
+
+    def _has_unique_key(self, inspector, table_name, schema, key_columns):
+        """Есть ли первичный ключ или уникальный индекс ровно по key_columns"""
+        expected = set(key_columns)
+        schema = schema or None
+        primary_key = inspector.get_pk_constraint(table_name, schema=schema)
+        if set(primary_key.get("constrained_columns") or []) == expected:
+            return True
+        for constraint in inspector.get_unique_constraints(table_name, schema=schema):
+            if set(constraint["column_names"]) == expected:
+                return True
+        for index in inspector.get_indexes(table_name, schema=schema):
+            if index.get("unique") and set(index["column_names"]) == expected:
+                return True
+        return False
+
+    def _create_unique_key(self, conn, table_name, key_columns):
+        """Уникальный индекс по ключевым колонкам для слияния"""
+        dialect = conn.dialect
+        preparer = dialect.identifier_preparer
+        index_name = "ux_" + "_".join([table_name.rpartition(".")[2], *key_columns])
+        conn.exec_driver_sql(
+            f"CREATE UNIQUE INDEX {preparer.quote(index_name)} "
+            f"ON {quote_table_name(dialect, table_name)} "
+            f"({', '.join(preparer.quote(column) for column in key_columns)})"
+        )
+
+    def export_data_to_external_db(
+        self,
+        data,
+        table_name,
+        if_exists="replace",
+        chunksize=EXPORT_CHUNK_SIZE,
+        resume=False,
+        progress_callback=None,
+        key_columns=None,
+        string_length=None,
+    ):
+        """Экспорт данных во внешнюю базу данных порциями
+
+        Таблица создается с явными типами строковых колонок (string_length —
+        длина VARCHAR, см. export_column_types), затем каждая порция из
+        chunksize строк записывается в своей транзакции многострочными
+        INSERT ... VALUES (в SQL Server — executemany с fast_executemany).
+        При ошибке записанные порции остаются в таблице, а число записанных
+        строк сохраняется в export_checkpoints: повторный вызов с теми же
+        данными и resume=True продолжает экспорт с первой незаписанной строки.
+        if_exists="merge" обновляет таблицу по key_columns, см.
+        merge_data_into_external_db.
+        """
+        if not self.connection_type.startswith("external") or not self.external_engine:
+            return False, "Нет подключения к внешней базе данных"
+        if if_exists == "merge":
+            return self.merge_data_into_external_db(
+                data,
+                table_name,
+                key_columns,
+                chunksize,
+                resume,
+                progress_callback,
+                string_length,
+            )
+
+        engine = self.external_engine
+        dialect_name = engine.dialect.name
+        total_rows = len(data)
+        columns = list(data.columns)
+
+        start_row = 0
+        if resume:
+            checkpoint = self.export_checkpoints.get(table_name)
+            if (
+                checkpoint is None
+                or checkpoint["total_rows"] != total_rows
+                or checkpoint["columns"] != columns
+            ):
+                return False, f"Нет прерванного экспорта этих данных в таблицу '{table_name}'"
+            start_row = checkpoint["rows_done"]
+
+        column_types = export_column_types(
+            data, dialect_name, string_length, key_columns or ()
+        )
+        if dialect_name in MAX_INSERT_PARAMETERS:
+            method = insert_multirow
+            rows_per_statement = max(
+                MAX_INSERT_PARAMETERS[dialect_name] // max(len(columns), 1), 1
+            )
+        else:
+            # Многострочный VALUES в SQL Server ограничен 2100 параметрами,
+            # executemany с fast_executemany быстрее
+            method = None
+            rows_per_statement = None
+
+        started = time.perf_counter()
+        rows_done = start_row
+        try:
+            if not resume:
+                with engine.begin() as conn:
+                    data.head(0).to_sql(
+                        table_name,
+                        conn,
+                        if_exists=if_exists,
+                        index=False,
+                        dtype=column_types,
+                    )
+                self.export_checkpoints[table_name] = {
+                    "rows_done": 0,
+                    "total_rows": total_rows,
+                    "columns": columns,
+                }
+
+            for chunk_start in range(start_row, total_rows, chunksize):
+                chunk = data.iloc[chunk_start : chunk_start + chunksize]
+                with engine.begin() as conn:
+                    chunk.to_sql(
+                        table_name,
+                        conn,
+                        if_exists="append",
+                        index=False,
+                        dtype=column_types,
+                        method=method,
+                        chunksize=rows_per_statement,
+                    )
+                rows_done = chunk_start + len(chunk)
+                self.export_checkpoints[table_name]["rows_done"] = rows_done
+                if progress_callback:
+                    elapsed = time.perf_counter() - started
+                    rate = (rows_done - start_row) / elapsed if elapsed else 0
+                    progress_callback(
+                        (
+                            rows_done,
+                            total_rows,
+                            f"Экспорт '{table_name}': {rows_done} из {total_rows} "
+                            f"строк ({rate:.0f} строк/с)",
+                        )
+                    )
+        except Exception as e:
+            message = f"Ошибка экспорта данных: {str(e)}"
+            if table_name in self.export_checkpoints:
+                message += (
+                    f"\nЗаписано строк: {rows_done} из {total_rows}, "
+                    "экспорт можно продолжить"
+                )
+            return False, message
+        finally:
+            self.invalidate_schema_catalog("external")
+
+        del self.export_checkpoints[table_name]
+        elapsed = time.perf_counter() - started
+        return True, (
+            f"Данные экспортированы в таблицу '{table_name}': "
+            f"{total_rows - start_row} строк за {elapsed:.1f} с"
+        )
+
+
+class TablePager:
+    """Постраничный просмотр таблицы с keyset-пагинацией
+
+    Страница читается условием "ключ больше последнего ключа предыдущей
+    страницы" по первичному ключу (или rowid в SQLite) вместо OFFSET,
+    поэтому страница N стоит столько же, сколько первая. Пока пользователь
+    смотрит текущую страницу, следующая читается в фоновом потоке.
+    Таблицы без ключа во внешних БД листаются через OFFSET.
+    """
+
+    ROWID_COLUMN = "__pager_rowid"
+
+    def __init__(self, engine, table_name, key_columns=None, page_size=1000, total_rows=None):
+        self.engine = engine
+        self.table_name = table_name
+        self.page_size = page_size
+        self.total_rows = total_rows
+        self.use_rowid = not key_columns and engine.dialect.name == "sqlite"
+        if self.use_rowid:
+            self.key_columns = [self.ROWID_COLUMN]
+        else:
+            self.key_columns = list(key_columns or [])
+
+        self.page_index = -1
+        self.last_page = None  # Индекс последней страницы, когда он известен
+        # Ключ последней строки перед началом каждой из известных страниц
+        self.page_keys = [None]
+        self.prefetched = {}
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    @property
+    def has_previous(self):
+        return self.page_index > 0
+
+    @property
+    def has_next(self):
+        return self.last_page is None or self.page_index < self.last_page
+
+    def first_page(self):
+        return self.go_to_page(0)
+
+    def next_page(self):
+        return self.go_to_page(self.page_index + 1)
+
+    def previous_page(self):
+        return self.go_to_page(self.page_index - 1)
+
+    def go_to_page(self, index):
+        """Чтение страницы index (из заранее прочитанных, если она готова)
+
+        Доступны страницы не дальше следующей за уже просмотренными:
+        ключ начала страницы известен только после чтения предыдущей.
+        """
+        if self.last_page is not None and index > self.last_page:
+            return False, "Это последняя страница"
+        if index < 0 or index >= len(self.page_keys):
+            return False, "Страница недоступна"
+
+        try:
+            future = self.prefetched.pop(index, None)
+            if future is not None:
+                data = future.result()
+            else:
+                data = self._read_page(index, self.page_keys[index])
+        except Exception as e:
+            return False, f"Ошибка чтения страницы: {str(e)}"
+
+        if data.empty and index > 0:
+            # Предыдущая страница оказалась заполненной ровно до конца
+            self.last_page = index - 1
+            return False, "Это последняя страница"
+
+        self.page_index = index
+        if len(data) < self.page_size:
+            self.last_page = index
+        else:
+            if len(self.page_keys) == index + 1:
+                self.page_keys.append(self._last_key(data))
+            self._prefetch(index + 1)
+
+        if self.use_rowid:
+            data = data.drop(columns=[self.ROWID_COLUMN])
+        return True, data
+
+    def _prefetch(self, index):
+        """Фоновое чтение страницы, следующей за текущей
+
+        Хранится только одна заранее прочитанная страница: после перехода
+        назад прежняя становится ненужной.
+        """
+        if index not in self.prefetched:
+            for future in self.prefetched.values():
+                future.cancel()
+            self.prefetched = {
+                index: self.executor.submit(self._read_page, index, self.page_keys[index])
+            }
+
+    def _last_key(self, data):
+        """Значения ключа последней строки страницы"""
+        if not self.key_columns:
+            return None
+        row = data.iloc[-1]
+        return [to_python_scalar(row[column]) for column in self.key_columns]
+
+    def build_page_query(self, after_key, offset):
+        """SQL запрос страницы с учетом синтаксиса диалекта
+
+        SQLite и MySQL используют LIMIT/OFFSET, SQL Server — TOP для
+        keyset-пагинации и OFFSET ... FETCH для таблиц без ключа.
+        """
+        dialect = self.engine.dialect
+        preparer = dialect.identifier_preparer
+        source = quote_table_name(dialect, self.table_name)
+        mssql = dialect.name == "mssql"
+        params = {"limit": self.page_size}
+
+        if self.use_rowid:
+            select_list = f'rowid AS "{self.ROWID_COLUMN}", *'
+            key_expressions = ["rowid"]
+        else:
+            select_list = "*"
+            key_expressions = [preparer.quote(column) for column in self.key_columns]
+
+        if not key_expressions:
+            params["offset"] = offset
+            if mssql:
+                return (
+                    f"SELECT * FROM {source} ORDER BY (SELECT NULL) "
+                    "OFFSET :offset ROWS FETCH NEXT :limit ROWS ONLY"
+                ), params
+            return f"SELECT * FROM {source} LIMIT :limit OFFSET :offset", params
+
+        where = ""
+        if after_key is not None:
+            # (a, b) > (:k0, :k1) в виде, понятном всем диалектам
+            clauses = []
+            for i, expression in enumerate(key_expressions):
+                parts = [f"{key_expressions[j]} = :k{j}" for j in range(i)]
+                parts.append(f"{expression} > :k{i}")
+                clauses.append("(" + " AND ".join(parts) + ")")
+            where = " WHERE " + " OR ".join(clauses)
+            params.update({f"k{i}": value for i, value in enumerate(after_key)})
+
+        order_by = " ORDER BY " + ", ".join(key_expressions)
+        if mssql:
+            return f"SELECT TOP (:limit) {select_list} FROM {source}{where}{order_by}", params
+        return f"SELECT {select_list} FROM {source}{where}{order_by} LIMIT :limit", params
+
+    def _read_page(self, index, after_key):
+        query, params = self.build_page_query(after_key, index * self.page_size)
+        with self.engine.connect() as conn:
+            return pd.read_sql(text(query), conn, params=params)
+
+    def close(self):
+        """Отмена фонового чтения и освобождение потока"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.prefetched.clear()
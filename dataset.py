@@ -1,13 +1,8 @@
 import sys
+import html
+import numpy as np
 import pandas as pd
-import sqlite3
-import matplotlib
-
-# matplotlib.use("Qt5Agg")  # Принудительно устанавливаем backend
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import seaborn as sns
+from collections import OrderedDict
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -16,8 +11,7 @@ from PyQt6.QtWidgets import (
     QWidget,
     QPushButton,
     QTextEdit,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QFileDialog,
     QMessageBox,
     QComboBox,
@@ -29,312 +23,83 @@ from PyQt6.QtWidgets import (
     QGridLayout,
     QCheckBox,
     QStatusBar,
+    QProgressBar,
+    QSpinBox,
+    QInputDialog,
     QMenuBar,
     QScrollArea,
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QFont, QIcon
 import os
-from sqlalchemy import create_engine, text
-import pymysql
-import pyodbc
 import warnings
+from database import (
+    EXPORT_CHUNK_SIZE,
+    DatabaseConnection,
+    format_batch_summary,
+    format_script_report,
+    parse_batch_queries,
+    staging_table_name,
+)
+from fileio import (
+    DBF_AVAILABLE,
+    PYARROW_AVAILABLE,
+    read_data_file,
+    read_json_file,
+    write_data_file,
+)
+from plot_data import SCATTER_DENSITY_THRESHOLD
+from profiling import PROFILE_HEADERS, format_profile_row, profile_data
+from server import QueryServer
+from table_models import (
+    COLUMN_WIDTH_SAMPLE_ROWS,
+    DataFrameModel,
+    SqlQueryModel,
+    estimate_column_widths,
+)
 
 warnings.filterwarnings("ignore")
 
-try:
-    from dbfread import DBF
+# Сколько профилей недавно показанных датасетов хранить
+PROFILE_CACHE_SIZE = 8
 
-    DBF_AVAILABLE = True
-except ImportError:
-    DBF_AVAILABLE = False
 
+class TaskWorker(QThread):
+    """Выполнение длительной операции в фоновом потоке
 
-class DatabaseConnection:
-    """Класс для управления подключениями к различным базам данных"""
+    Функция вызывается с аргументом progress_callback, сообщения которого
+    передаются в GUI поток сигналом progress. Результат функции (обычно
+    кортеж (успех, результат)) передается сигналом result_ready.
+    """
 
-    def __init__(self):
-        self.external_engine = None  # Внешняя БД
-        self.internal_engine = None  # Внутренняя БД для файлов
-        self.connection_type = None
-        self.current_table_name = None
-        self.setup_internal_db()
-
-    def setup_internal_db(self):
-        """Создание внутренней SQLite базы данных в памяти"""
-        try:
-            self.internal_engine = create_engine("sqlite:///:memory:")
-            self.connection_type = "internal"
-        except Exception as e:
-            print(f"Ошибка создания внутренней БД: {e}")
+    # Строка или кортеж (готово, всего, строка) для полосы прогресса
+    progress = pyqtSignal(object)
+    result_ready = pyqtSignal(object)
 
-    def connect_sqlite(self, db_path):
-        """Подключение к внешней SQLite"""
-        try:
-            self.external_engine = create_engine(f"sqlite:///{db_path}")
-            self.connection_type = "external_sqlite"
-            return True, "Успешно подключено к внешней SQLite"
-        except Exception as e:
-            return False, f"Ошибка подключения к SQLite: {str(e)}"
+    def __init__(self, func, *args, **kwargs):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
 
-    def connect_mysql(self, host, port, user, password, database):
-        """Подключение к внешней MySQL"""
+    def run(self):
         try:
-            connection_string = (
-                f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}"
+            result = self.func(
+                *self.args, progress_callback=self.progress.emit, **self.kwargs
             )
-            self.external_engine = create_engine(connection_string)
-            self.connection_type = "external_mysql"
-            return True, "Успешно подключено к внешней MySQL"
-        except Exception as e:
-            return False, f"Ошибка подключения к MySQL: {str(e)}"
-
-    def connect_sqlserver(
-        self, server, database, user=None, password=None, trusted_connection=True
-    ):
-        """Подключение к SQL Server"""
-        try:
-            if trusted_connection:
-                # Windows Authentication
-                connection_string = f"mssql+pyodbc://@{server}/{database}?driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes"
-            else:
-                # SQL Server Authentication
-                connection_string = f"mssql+pyodbc://{user}:{password}@{server}/{database}?driver=ODBC+Driver+17+for+SQL+Server"
-
-            self.external_engine = create_engine(connection_string)
-            self.connection_type = "external_sqlserver"
-            return True, "Успешно подключено к SQL Server"
         except Exception as e:
-            return False, f"Ошибка подключения к SQL Server: {str(e)}"
+            result = (False, f"Ошибка фоновой операции: {str(e)}")
+        self.result_ready.emit(result)
 
-    def disconnect_external_db(self):
-        """Отключение от внешней базы данных"""
-        if self.external_engine:
-            self.external_engine.dispose()
-            self.external_engine = None
-            self.connection_type = "internal"
-            return True, "Отключено от внешней базы данных"
-        return False, "Нет активного подключения к внешней БД"
-
-    def load_data_to_internal_db(self, data, table_name="dataset"):
-        """Загрузка данных во внутреннюю базу данных"""
-        try:
-            if self.internal_engine is None:
-                self.setup_internal_db()
 
-            # Создаем копию данных для обработки
-            processed_data = data.copy()
+class ProfileWorker(TaskWorker):
+    """Фоновый расчет профиля с передачей готовых колонок по одной"""
 
-            # Обрабатываем колонки со сложными типами данных
-            import json
+    column_ready = pyqtSignal(object)
 
-            print(
-                f"Обрабатываем данные: {len(processed_data)} строк, {len(processed_data.columns)} колонок"
-            )
-
-            for column in processed_data.columns:
-                print(f"Обрабатываем колонку: {column}")
-
-                # Проверяем ВСЕ значения в колонке на наличие сложных объектов
-                needs_conversion = False
-
-                # Проверяем каждое значение в колонке
-                for idx in processed_data.index:
-                    value = processed_data.loc[idx, column]
-                    if isinstance(value, (list, dict)):
-                        needs_conversion = True
-                        print(
-                            f"Найден сложный объект в колонке {column}, строка {idx}: {type(value)}"
-                        )
-                        break
-
-                # Если нужна конвертация, обрабатываем всю колонку
-                if needs_conversion:
-                    print(f"Конвертируем колонку {column}")
-
-                    def convert_to_json_string(x):
-                        if isinstance(x, (list, dict)):
-                            try:
-                                return json.dumps(
-                                    x, ensure_ascii=False, separators=(",", ":")
-                                )
-                            except Exception as e:
-                                print(f"Ошибка конвертации значения {x}: {e}")
-                                return str(x)
-                        elif pd.isna(x):
-                            return None
-                        else:
-                            return str(x)
-
-                    try:
-                        processed_data[column] = processed_data[column].apply(
-                            convert_to_json_string
-                        )
-                        print(f"Колонка {column} успешно конвертирована")
-                    except Exception as e:
-                        print(f"Ошибка при конвертации колонки {column}: {e}")
-                        # В крайнем случае, конвертируем все в строки
-                        processed_data[column] = processed_data[column].astype(str)
-
-            print("Начинаем сохранение в БД...")
-
-            # Дополнительная проверка перед сохранением - убеждаемся, что нет сложных объектов
-            for column in processed_data.columns:
-                for idx in processed_data.index:
-                    value = processed_data.loc[idx, column]
-                    if isinstance(value, (list, dict)):
-                        print(
-                            f"ВНИМАНИЕ: Все еще есть сложный объект в {column}, строка {idx}"
-                        )
-                        # Принудительно конвертируем
-                        processed_data.loc[idx, column] = json.dumps(
-                            value, ensure_ascii=False, separators=(",", ":")
-                        )
-
-            # Сохраняем обработанные данные в таблицу
-            processed_data.to_sql(
-                table_name, self.internal_engine, if_exists="replace", index=False
-            )
-            self.current_table_name = table_name
-            print("Данные успешно сохранены в БД")
-            return True, f"Данные загружены в таблицу '{table_name}'"
-        except Exception as e:
-            print(f"Полная ошибка: {str(e)}")
-            return False, f"Ошибка загрузки данных в БД: {str(e)}"
-
-    def clear_internal_data(self):
-        """Очистка внутренней базы данных"""
-        try:
-            if self.internal_engine:
-                # Пересоздаем внутреннюю БД
-                self.internal_engine.dispose()
-                self.setup_internal_db()
-                self.current_table_name = None
-                return True, "Внутренняя база данных очищена"
-            return False, "Внутренняя база данных не инициализирована"
-        except Exception as e:
-            return False, f"Ошибка очистки БД: {str(e)}"
-
-    def get_table_names(self):
-        """Получение списка таблиц в активной базе данных"""
-        try:
-            if self.connection_type.startswith("external") and self.external_engine:
-                with self.external_engine.connect() as conn:
-                    if self.connection_type == "external_mysql":
-                        result = conn.execute(text("SHOW TABLES"))
-                        return [row[0] for row in result]
-                    elif self.connection_type == "external_sqlserver":
-                        result = conn.execute(
-                            text(
-                                "SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_TYPE = 'BASE TABLE'"
-                            )
-                        )
-                        return [row[0] for row in result]
-                    else:  # SQLite
-                        result = conn.execute(
-                            text("SELECT name FROM sqlite_master WHERE type='table'")
-                        )
-                        return [row[0] for row in result]
-            elif self.internal_engine:
-                with self.internal_engine.connect() as conn:
-                    result = conn.execute(
-                        text("SELECT name FROM sqlite_master WHERE type='table'")
-                    )
-                    return [row[0] for row in result]
-            return []
-        except Exception as e:
-            print(f"Ошибка получения списка таблиц: {e}")
-            return []
-
-    def execute_query(self, query):
-        """Выполнение SQL запроса"""
-        try:
-            # Определяем, какую базу использовать
-            if self.connection_type.startswith("external") and self.external_engine:
-                engine = self.external_engine
-            elif self.internal_engine:
-                engine = self.internal_engine
-            else:
-                return False, "Нет доступной базы данных"
-
-            with engine.connect() as conn:
-                result = pd.read_sql(text(query), conn)
-            return True, result
-        except Exception as e:
-            return False, f"Ошибка выполнения запроса: {str(e)}"
-
-    def export_data_to_external_db(self, data, table_name, if_exists="replace"):
-        """Экспорт данных во внешнюю базу данных"""
-        try:
-            if (
-                not self.connection_type.startswith("external")
-                or not self.external_engine
-            ):
-                return False, "Нет подключения к внешней базе данных"
-
-            data.to_sql(
-                table_name, self.external_engine, if_exists=if_exists, index=False
-            )
-            return True, f"Данные экспортированы в таблицу '{table_name}'"
-        except Exception as e:
-            return False, f"Ошибка экспорта данных: {str(e)}"
-
-
-class PlotCanvas(FigureCanvas):
-    """Виджет для отображения графиков"""
-
-    def __init__(self, parent=None, width=5, height=4, dpi=100):
-        self.fig = Figure(figsize=(width, height), dpi=dpi)
-        super().__init__(self.fig)
-        self.setParent(parent)
-
-    def plot_histogram(self, data, column, bins=30):
-        """Построение гистограммы"""
-        self.fig.clear()
-        ax = self.fig.add_subplot(111)
-        ax.hist(data[column].dropna(), bins=bins, alpha=0.7, edgecolor="black")
-        ax.set_title(f"Гистограмма: {column}")
-        ax.set_xlabel(column)
-        ax.set_ylabel("Частота")
-        ax.grid(True, alpha=0.3)
-        self.draw()
-
-    def plot_line(self, data, x_col, y_col):
-        """Построение линейного графика"""
-        self.fig.clear()
-        ax = self.fig.add_subplot(111)
-        ax.plot(data[x_col], data[y_col], marker="o", linestyle="-", markersize=4)
-        ax.set_title(f"{y_col} от {x_col}")
-        ax.set_xlabel(x_col)
-        ax.set_ylabel(y_col)
-        ax.grid(True, alpha=0.3)
-        plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
-        self.fig.tight_layout()
-        self.draw()
-
-    def plot_scatter(self, data, x_col, y_col):
-        """Построение точечного графика"""
-        self.fig.clear()
-        ax = self.fig.add_subplot(111)
-        ax.scatter(data[x_col], data[y_col], alpha=0.6)
-        ax.set_title(f"{y_col} vs {x_col}")
-        ax.set_xlabel(x_col)
-        ax.set_ylabel(y_col)
-        ax.grid(True, alpha=0.3)
-        self.draw()
-
-    def plot_bar(self, data, x_col, y_col):
-        """Построение столбчатого графика"""
-        self.fig.clear()
-        ax = self.fig.add_subplot(111)
-        ax.bar(data[x_col], data[y_col])
-        ax.set_title(f"{y_col} по {x_col}")
-        ax.set_xlabel(x_col)
-        ax.set_ylabel(y_col)
-        ax.grid(True, alpha=0.3)
-        plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
-        self.fig.tight_layout()
-        self.draw()
+    def __init__(self, func, *args, **kwargs):
+        super().__init__(func, *args, **kwargs)
+        self.kwargs["column_callback"] = self.column_ready.emit
 
 
 class DatasetAnalyzer(QMainWindow):
@@ -343,9 +108,38 @@ class DatasetAnalyzer(QMainWindow):
     def __init__(self):
         super().__init__()
         self.db_connection = DatabaseConnection()
+        self.data_version = 0  # Номер загрузки данных, растет при каждой замене
         self.current_data = None
+        # Таблица БД, первая страница которой показана как current_data
+        self.current_data_source = None
+        self.workers = []  # Активные фоновые задачи
+        self.plot_generation = 0  # Номер последнего запрошенного графика
+        self.last_sql_result = None  # Последний результат SQL запроса для экспорта
+        self.tables_info_text = "Доступные таблицы: "
+        self.query_server = None  # Локальный HTTP сервис запросов
+        self.catalog_loading = False  # Идет фоновая загрузка каталога схемы
+        self.table_pager = None  # Постраничный просмотр таблицы БД
+        self.failed_export = None  # Данные и таблица прерванного экспорта
+        self.profile_key = None  # Данные, профиль которых отображается
+        self.profile_summary = ""
+        self.profile_rows = []
+        # Ключ данных -> профили колонок недавно показанных датасетов
+        self.profile_cache = OrderedDict()
+        # Число строк колонки, по которым подбирается ширина
+        self.column_width_sample_rows = COLUMN_WIDTH_SAMPLE_ROWS
         self.init_ui()
 
+    @property
+    def current_data(self):
+        return self._current_data
+
+    @current_data.setter
+    def current_data(self, data):
+        # Новые данные больше не связаны с просматриваемой таблицей БД
+        self._current_data = data
+        self.current_data_source = None
+        self.data_version += 1
+
     def init_ui(self):
         """Инициализация пользовательского интерфейса"""
         self.setWindowTitle("Универсальный анализатор датасетов")
@@ -357,7 +151,7 @@ class DatasetAnalyzer(QMainWindow):
                 border: 2px solid gray;
                 border-radius: 5px;
             }
-            QTableWidget {
+            QTableView {
                 background-color: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
                                       stop: 0 #E0E0E0, stop: 1 #FFFFFF);
                 border: 2px solid gray;
@@ -432,6 +226,12 @@ class DatasetAnalyzer(QMainWindow):
         self.setStatusBar(self.status_bar)
         self.status_bar.showMessage("Готов к работе")
 
+        # Ход длительных операций (экспорт порциями)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.setVisible(False)
+        self.status_bar.addPermanentWidget(self.progress_bar)
+
         # Центральный виджет
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -446,14 +246,13 @@ class DatasetAnalyzer(QMainWindow):
         # Вкладка загрузки данных
         self.create_data_tab()
 
-        # Вкладка SQL запросов
-        self.create_sql_tab()
-
-        # Вкладка графиков
-        self.create_plot_tab()
-
-        # Вкладка помощи
-        self.create_help_tab()
+        # Остальные вкладки строятся при первом открытии (см. build_tab):
+        # справка и matplotlib не задерживают появление окна
+        self.tab_builders = {}
+        self.add_lazy_tab("SQL", self.create_sql_tab)
+        self.add_lazy_tab("Графики", self.create_plot_tab)
+        self.add_lazy_tab("Справка", self.create_help_tab)
+        self.tabs.currentChanged.connect(self.build_tab)
 
         # Создание меню
         self.create_menu()
@@ -496,6 +295,36 @@ class DatasetAnalyzer(QMainWindow):
         btn_json.clicked.connect(self.load_json)
         file_layout.addWidget(btn_json)
 
+        if PYARROW_AVAILABLE:
+            btn_columnar = QPushButton(
+                QIcon(os.path.join("images", "opencsv.png")),
+                " Загрузить Parquet/Feather/Arrow",
+            )
+            btn_columnar.clicked.connect(self.load_columnar)
+            file_layout.addWidget(btn_columnar)
+
+        btn_save_file = QPushButton(
+            QIcon(os.path.join("images", "exportcsv.png")), " Сохранить данные в файл"
+        )
+        btn_save_file.clicked.connect(self.save_current_data_to_file)
+        file_layout.addWidget(btn_save_file)
+
+        btn_table_to_file = QPushButton(
+            QIcon(os.path.join("images", "exportcsv.png")), " Выгрузить таблицу в файл"
+        )
+        btn_table_to_file.setToolTip(
+            "Выгрузить таблицу внутренней БД целиком, порциями, без загрузки в память"
+        )
+        btn_table_to_file.clicked.connect(self.export_table_to_file)
+        file_layout.addWidget(btn_table_to_file)
+
+        # Режим загрузки: дописывать строки к таблице dataset вместо замены
+        self.load_append = QCheckBox("Дописывать к dataset (append)")
+        self.load_append.setToolTip(
+            "Добавить строки файла к таблице dataset; материализованные представления обновятся инкрементально"
+        )
+        file_layout.addWidget(self.load_append)
+
         # Кнопка очистки данных в группе файлов
         btn_clear = QPushButton(
             QIcon(os.path.join("images", "clear.png")), " Очистить внутренние данные"
@@ -525,6 +354,26 @@ class DatasetAnalyzer(QMainWindow):
         btn_sqlite.clicked.connect(self.connect_sqlite)
         db_layout.addWidget(btn_sqlite, 0, 3)
 
+        # Присоединение SQLite файлов к внутренней БД (ATTACH DATABASE)
+        db_layout.addWidget(QLabel("Схема:"), 1, 0)
+        self.attach_alias = QLineEdit("ext")
+        self.attach_alias.setToolTip(
+            "Псевдоним схемы: таблицы файла будут доступны как схема.таблица"
+        )
+        db_layout.addWidget(self.attach_alias, 1, 1)
+
+        btn_attach = QPushButton(
+            QIcon(os.path.join("images", "sqlite.png")), " Присоединить SQLite"
+        )
+        btn_attach.clicked.connect(self.attach_sqlite)
+        db_layout.addWidget(btn_attach, 1, 2)
+
+        btn_detach = QPushButton(
+            QIcon(os.path.join("images", "dataoff.png")), " Отсоединить"
+        )
+        btn_detach.clicked.connect(self.detach_sqlite)
+        db_layout.addWidget(btn_detach, 1, 3)
+
         # MySQL
         db_layout.addWidget(QLabel("MySQL Host:"), 2, 0)
         self.mysql_host = QLineEdit("localhost")
@@ -617,8 +466,64 @@ class DatasetAnalyzer(QMainWindow):
         btn_view_table.clicked.connect(self.view_selected_table)
         table_layout.addWidget(btn_view_table, 0, 3)
 
+        btn_copy_table = QPushButton(
+            QIcon(os.path.join("images", "dataon.png")), " Копировать во внутреннюю БД"
+        )
+        btn_copy_table.setToolTip(
+            "Скопировать выбранную таблицу целиком во внутреннюю БД потоком, без загрузки в память"
+        )
+        btn_copy_table.clicked.connect(self.copy_table_to_internal)
+        table_layout.addWidget(btn_copy_table, 0, 4)
+
+        # Число строк просматриваемой таблицы, уже прочитанных из БД
+        self.table_page_info = QLabel("")
+        table_layout.addWidget(self.table_page_info, 1, 1, 1, 3)
+
         layout.addWidget(table_group)
 
+        # Группа импорта таблиц из внешней БД во внутреннюю
+        import_group = QGroupBox("Импорт из внешней базы данных во внутреннюю")
+        import_layout = QGridLayout(import_group)
+
+        import_layout.addWidget(QLabel("Таблица или запрос:"), 0, 0)
+        self.import_source = QLineEdit()
+        self.import_source.setPlaceholderText("orders или SELECT ... FROM orders")
+        import_layout.addWidget(self.import_source, 0, 1)
+
+        import_layout.addWidget(QLabel("Колонки:"), 0, 2)
+        self.import_columns = QLineEdit()
+        self.import_columns.setPlaceholderText("все; или id, date, amount")
+        import_layout.addWidget(self.import_columns, 0, 3)
+
+        import_layout.addWidget(QLabel("Условие WHERE:"), 1, 0)
+        self.import_where = QLineEdit()
+        self.import_where.setPlaceholderText("amount > 100 AND region = 'EU'")
+        import_layout.addWidget(self.import_where, 1, 1)
+
+        import_layout.addWidget(QLabel("Инкрементальный ключ:"), 1, 2)
+        self.import_incremental = QLineEdit()
+        self.import_incremental.setPlaceholderText("id или updated_at (необязательно)")
+        import_layout.addWidget(self.import_incremental, 1, 3)
+
+        import_layout.addWidget(QLabel("Во внутреннюю таблицу:"), 2, 0)
+        self.import_target = QLineEdit()
+        self.import_target.setPlaceholderText("по умолчанию — имя исходной таблицы")
+        import_layout.addWidget(self.import_target, 2, 1)
+
+        self.btn_import = QPushButton(
+            QIcon(os.path.join("images", "sql.png")), " Импортировать"
+        )
+        self.btn_import.clicked.connect(self.import_remote_table)
+        import_layout.addWidget(self.btn_import, 2, 2)
+
+        self.btn_refresh_import = QPushButton(
+            QIcon(os.path.join("images", "reload.png")), " Обновить импорт"
+        )
+        self.btn_refresh_import.clicked.connect(self.refresh_remote_table)
+        import_layout.addWidget(self.btn_refresh_import, 2, 3)
+
+        layout.addWidget(import_group)
+
         # Группа экспорта данных в БД
         export_group = QGroupBox("Экспорт данных в базу данных")
         export_layout = QGridLayout(export_group)
@@ -629,9 +534,17 @@ class DatasetAnalyzer(QMainWindow):
 
         export_layout.addWidget(QLabel("Если таблица существует:"), 0, 2)
         self.export_if_exists = QComboBox()
-        self.export_if_exists.addItems(["replace", "append", "fail"])
+        self.export_if_exists.addItems(["replace", "append", "fail", "merge"])
+        self.export_if_exists.setToolTip(
+            "merge: новые строки добавляются, изменившиеся обновляются по ключевым колонкам"
+        )
         export_layout.addWidget(self.export_if_exists, 0, 3)
 
+        export_layout.addWidget(QLabel("Ключевые колонки (merge):"), 3, 0)
+        self.export_key_columns = QLineEdit()
+        self.export_key_columns.setPlaceholderText("id или customer_id, date")
+        export_layout.addWidget(self.export_key_columns, 3, 1, 1, 3)
+
         btn_export_current = QPushButton(
             QIcon(os.path.join("images", "export.png")), " Экспорт текущих данных"
         )
@@ -644,27 +557,80 @@ class DatasetAnalyzer(QMainWindow):
         btn_export_sql_result.clicked.connect(self.export_sql_result)
         export_layout.addWidget(btn_export_sql_result, 1, 2, 1, 2)
 
+        export_layout.addWidget(QLabel("Строк в порции:"), 2, 0)
+        self.export_chunk_size = QSpinBox()
+        self.export_chunk_size.setRange(100, 1000000)
+        self.export_chunk_size.setSingleStep(10000)
+        self.export_chunk_size.setValue(EXPORT_CHUNK_SIZE)
+        export_layout.addWidget(self.export_chunk_size, 2, 1)
+
+        self.btn_resume_export = QPushButton(
+            QIcon(os.path.join("images", "export.png")), " Продолжить экспорт"
+        )
+        self.btn_resume_export.clicked.connect(self.resume_export)
+        self.btn_resume_export.setEnabled(False)
+        export_layout.addWidget(self.btn_resume_export, 2, 2, 1, 2)
+
+        btn_copy_to_external = QPushButton(
+            QIcon(os.path.join("images", "export.png")),
+            " Копировать таблицу внутренней БД во внешнюю",
+        )
+        btn_copy_to_external.clicked.connect(self.copy_table_to_external)
+        export_layout.addWidget(btn_copy_to_external, 4, 0, 1, 4)
+
         layout.addWidget(export_group)
 
+        # Фильтры по колонкам отображаемых данных
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Фильтр:"))
+        self.filter_column = QComboBox()
+        filter_layout.addWidget(self.filter_column)
+        self.filter_text = QLineEdit()
+        self.filter_text.setPlaceholderText(
+            "подстрока или условие: > 100, <= 2024-01-01, = abc, != 0"
+        )
+        self.filter_text.returnPressed.connect(self.apply_data_filter)
+        filter_layout.addWidget(self.filter_text)
+        btn_apply_filter = QPushButton("Применить")
+        btn_apply_filter.clicked.connect(self.apply_data_filter)
+        filter_layout.addWidget(btn_apply_filter)
+        btn_clear_filters = QPushButton("Сбросить")
+        btn_clear_filters.clicked.connect(self.clear_data_filters)
+        filter_layout.addWidget(btn_clear_filters)
+        layout.addLayout(filter_layout)
+
+        self.filter_info = QLabel("")
+        layout.addWidget(self.filter_info)
+
         # Таблица для отображения данных
-        self.data_table = QTableWidget()
-        self.data_table.verticalHeader().setDefaultSectionSize(10)
+        self.data_table = self.create_table_view()
         layout.addWidget(self.data_table)
 
         # Информация о данных
         self.data_info = QTextEdit()
-        self.data_info.setMaximumHeight(100)
+        self.data_info.setMaximumHeight(200)
+        self.data_info.setReadOnly(True)
         layout.addWidget(self.data_info)
 
         self.tabs.addTab(data_widget, "Данные")
 
-    def create_sql_tab(self):
+    def add_lazy_tab(self, title, builder):
+        """Пустая вкладка, содержимое которой строит builder(страница)"""
+        page = QWidget()
+        self.tab_builders[self.tabs.addTab(page, title)] = builder
+
+    def build_tab(self, index):
+        """Построение содержимого вкладки при первом открытии"""
+        builder = self.tab_builders.pop(index, None)
+        if builder is not None:
+            builder(self.tabs.widget(index))
+
+    def create_sql_tab(self, sql_widget):
         """Создание вкладки для SQL запросов"""
-        sql_widget = QWidget()
         layout = QVBoxLayout(sql_widget)
 
         # Информация о доступных таблицах
-        self.tables_info = QLabel("Доступные таблицы: ")
+        self.tables_info = QLabel(self.tables_info_text)
         layout.addWidget(self.tables_info)
 
         # Поле для ввода SQL запроса
@@ -686,12 +652,44 @@ class DatasetAnalyzer(QMainWindow):
         btn_execute.clicked.connect(self.execute_sql)
         btn_layout.addWidget(btn_execute)
 
+        # Режим скрипта: несколько операторов в одной транзакции
+        self.sql_script_mode = QCheckBox("Режим скрипта")
+        self.sql_script_mode.setToolTip(
+            "Выполнить несколько операторов, разделенных ';', на одном соединении в одной транзакции"
+        )
+        btn_layout.addWidget(self.sql_script_mode)
+
         btn_export_csv = QPushButton(
-            QIcon(os.path.join("images", "export.png")), " Экспорт в CSV"
+            QIcon(os.path.join("images", "export.png")), " Экспорт в файл"
         )
-        btn_export_csv.clicked.connect(self.export_sql_result_to_csv)
+        btn_export_csv.clicked.connect(self.export_sql_result_to_file)
         btn_layout.addWidget(btn_export_csv)
 
+        btn_query_to_file = QPushButton(
+            QIcon(os.path.join("images", "export.png")), " Запрос в файл"
+        )
+        btn_query_to_file.setToolTip(
+            "Выполнить запрос и записать результат сразу в CSV файл, не загружая его в таблицу"
+        )
+        btn_query_to_file.clicked.connect(self.export_query_to_file)
+        btn_layout.addWidget(btn_query_to_file)
+
+        btn_batch = QPushButton(
+            QIcon(os.path.join("images", "exec.png")), " Пакетный запуск (.sql)"
+        )
+        btn_batch.setToolTip(
+            "Выполнить именованные запросы из .sql файла параллельно и сохранить результаты"
+        )
+        btn_batch.clicked.connect(self.run_batch_file)
+        btn_layout.addWidget(btn_batch)
+
+        self.batch_output_format = QComboBox()
+        self.batch_output_format.addItems(["csv", "parquet", "table"])
+        self.batch_output_format.setToolTip(
+            "Куда сохранять результаты пакета: CSV, Parquet или таблицы внутренней БД"
+        )
+        btn_layout.addWidget(self.batch_output_format)
+
         btn_clear_sql = QPushButton(
             QIcon(os.path.join("images", "clear.png")), " Очистить результат"
         )
@@ -701,19 +699,45 @@ class DatasetAnalyzer(QMainWindow):
 
         layout.addLayout(btn_layout)
 
+        # Материализованные представления во внутренней БД
+        view_layout = QHBoxLayout()
+        view_layout.addWidget(QLabel("Материализованное представление:"))
+        self.view_name = QLineEdit("mv_report")
+        view_layout.addWidget(self.view_name)
+
+        btn_create_view = QPushButton(
+            QIcon(os.path.join("images", "sqlite.png")), " Создать из запроса"
+        )
+        btn_create_view.clicked.connect(self.create_materialized_view)
+        view_layout.addWidget(btn_create_view)
+
+        btn_refresh_views = QPushButton(
+            QIcon(os.path.join("images", "reload.png")), " Обновить представления"
+        )
+        btn_refresh_views.clicked.connect(self.refresh_materialized_views)
+        view_layout.addWidget(btn_refresh_views)
+
+        btn_drop_view = QPushButton(
+            QIcon(os.path.join("images", "clear.png")), " Удалить"
+        )
+        btn_drop_view.clicked.connect(self.drop_materialized_view)
+        btn_drop_view.setStyleSheet("color: #8B0000; font-weight: bold;")
+        view_layout.addWidget(btn_drop_view)
+
+        layout.addLayout(view_layout)
+
         # Таблица результатов
-        self.sql_result_table = QTableWidget()
-        self.sql_result_table.verticalHeader().setDefaultSectionSize(10)
+        self.sql_result_table = self.create_table_view()
         layout.addWidget(self.sql_result_table)
 
-        self.tabs.addTab(sql_widget, "SQL")
-
-        # Сохраняем последний результат SQL запроса для экспорта
-        self.last_sql_result = None
+        # Журнал выполнения скрипта
+        self.sql_log = QTextEdit()
+        self.sql_log.setReadOnly(True)
+        self.sql_log.setMaximumHeight(100)
+        layout.addWidget(self.sql_log)
 
-    def create_plot_tab(self):
+    def create_plot_tab(self, plot_widget):
         """Создание вкладки для графиков"""
-        plot_widget = QWidget()
         layout = QHBoxLayout(plot_widget)
 
         # Левая панель управления
@@ -736,6 +760,17 @@ class DatasetAnalyzer(QMainWindow):
         self.y_column = QComboBox()
         control_layout.addWidget(self.y_column)
 
+        # Порог переключения точечного графика на карту плотности
+        control_layout.addWidget(QLabel("Карта плотности от (точек):"))
+        self.density_threshold = QSpinBox()
+        self.density_threshold.setRange(1000, 1000000000)
+        self.density_threshold.setSingleStep(100000)
+        self.density_threshold.setValue(SCATTER_DENSITY_THRESHOLD)
+        self.density_threshold.setToolTip(
+            "Точечный график с большим числом точек рисуется как карта плотности"
+        )
+        control_layout.addWidget(self.density_threshold)
+
         # Кнопка построения графика
         btn_plot = QPushButton(
             QIcon(os.path.join("images", "plot.png")), " Построить график"
@@ -753,17 +788,22 @@ class DatasetAnalyzer(QMainWindow):
 
         control_layout.addStretch()
 
-        # Canvas для графика
+        # Canvas для графика с панелью масштабирования и сдвига
+        plot_area = QWidget()
+        plot_layout = QVBoxLayout(plot_area)
+        from plot_canvas import PlotCanvas  # matplotlib загружается здесь
+
         self.plot_canvas = PlotCanvas(self, width=8, height=6)
+        plot_layout.addWidget(self.plot_canvas.create_toolbar(plot_area))
+        plot_layout.addWidget(self.plot_canvas)
 
         layout.addWidget(control_panel)
-        layout.addWidget(self.plot_canvas)
+        layout.addWidget(plot_area)
 
-        self.tabs.addTab(plot_widget, "Графики")
+        self.update_column_selectors()
 
-    def create_help_tab(self):
+    def create_help_tab(self, help_widget):
         """Создание вкладки помощи"""
-        help_widget = QWidget()
         layout = QVBoxLayout(help_widget)
 
         # Создаем область прокрутки
@@ -782,12 +822,17 @@ class DatasetAnalyzer(QMainWindow):
 
         layout.addWidget(scroll_area)
 
-        self.tabs.addTab(help_widget, "Справка")
-
     def create_menu(self):
         """Создание меню"""
         menubar = self.menuBar()
 
+        # Меню "Сервис"
+        service_menu = menubar.addMenu("Сервис")
+
+        # Действие "HTTP сервис запросов"
+        self.server_action = service_menu.addAction("Запустить HTTP сервис (localhost)")
+        self.server_action.triggered.connect(self.toggle_query_server)
+
         # Меню "Справка"
         help_menu = menubar.addMenu("Справка")
 
@@ -799,6 +844,35 @@ class DatasetAnalyzer(QMainWindow):
         quick_help_action = help_menu.addAction("Быстрая помощь")
         quick_help_action.triggered.connect(self.show_quick_help)
 
+    def toggle_query_server(self):
+        """Запуск или остановка локального HTTP сервиса запросов"""
+        if self.query_server is not None:
+            self.query_server.stop()
+            self.query_server = None
+            self.server_action.setText("Запустить HTTP сервис (localhost)")
+            self.show_status_message("HTTP сервис остановлен")
+            return
+
+        try:
+            self.query_server = QueryServer(self.db_connection)
+        except OSError as e:
+            self.show_error(f"Не удалось запустить HTTP сервис: {str(e)}")
+            return
+        self.query_server.start()
+        self.server_action.setText(f"Остановить HTTP сервис ({self.query_server.url})")
+        self.show_message(
+            f"HTTP сервис запущен: {self.query_server.url}\n"
+            "Пример: /query?sql=SELECT * FROM dataset&page=1&page_size=100"
+        )
+
+    def closeEvent(self, event):
+        """Остановка HTTP сервиса и фонового чтения страниц при закрытии окна"""
+        if self.query_server is not None:
+            self.query_server.stop()
+            self.query_server = None
+        self.close_table_pager()
+        super().closeEvent(event)
+
     def get_help_content(self):
         """Получение содержимого справки"""
         return """
@@ -829,6 +903,10 @@ class DatasetAnalyzer(QMainWindow):
                     <li><strong>Загрузить CSV</strong> - импорт данных из CSV файлов с автоматическим определением разделителей</li>
                     <li><strong>Загрузить Excel</strong> - поддержка форматов .xlsx и .xls</li>
                     <li><strong>Загрузить DBF</strong> - импорт данных из dBase файлов (требует библиотеку dbfread)</li>
+                    <li><strong>Загрузить Parquet/Feather/Arrow</strong> - быстрая загрузка колоночных форматов с сохранением типов колонок (требует библиотеку pyarrow)</li>
+                    <li><strong>Сохранить данные в файл</strong> - запись текущих данных в CSV, Parquet (сжатие snappy), Feather (сжатие lz4) или Arrow IPC</li>
+                    <li><strong>Выгрузить таблицу в файл</strong> - запись таблицы внутренней БД в файл порциями, без загрузки всей таблицы в память</li>
+                    <li><strong>Дописывать к dataset (append)</strong> - строки загружаемого файла добавляются к таблице dataset вместо ее замены</li>
                     <li><strong>Очистить внутренние данные</strong> - удаление всех загруженных данных из памяти</li>
                 </ul>
             </div>
@@ -840,6 +918,14 @@ class DatasetAnalyzer(QMainWindow):
                     <li>Подключение к локальным файлам базы данных SQLite (.db, .sqlite, .sqlite3)</li>
                     <li>Автоматическое сканирование структуры БД</li>
                 </ul>
+
+                <h4>Присоединение SQLite (ATTACH)</h4>
+                <ul>
+                    <li><strong>Присоединить SQLite</strong> - подключение файла SQLite к внутренней БД под псевдонимом схемы (поле "Схема")</li>
+                    <li>Таблицы файла доступны в запросах как <em>схема.таблица</em>, например: <code>SELECT * FROM dataset d JOIN ext.customers c ON d.id = c.id</code></li>
+                    <li>Соединение выполняется средствами SQLite без выгрузки данных в DataFrame</li>
+                    <li><strong>Отсоединить</strong> - отключение схемы, указанной в поле "Схема"</li>
+                </ul>
                 
                 <h4>MySQL</h4>
                 <ul>
@@ -860,26 +946,63 @@ class DatasetAnalyzer(QMainWindow):
             <div class="feature">
                 <ul>
                     <li><strong>Выбор таблицы</strong> - выпадающий список всех доступных таблиц</li>
-                    <li><strong>Обновить список</strong> - обновление списка таблиц после изменений в БД</li>
-                    <li><strong>Просмотреть таблицу</strong> - загрузка данных из выбранной таблицы (до 1000 записей)</li>
+                    <li><strong>Обновить список</strong> - повторное чтение каталога схемы после изменений в БД, сделанных другими программами</li>
+                    <li><strong>Каталог схемы</strong> - список таблиц, колонок и приблизительное число строк загружается один раз в фоне и хранится до загрузки, экспорта или переподключения</li>
+                    <li><strong>Копировать во внутреннюю БД</strong> - копирование всей таблицы потоком: строки читаются серверным курсором и записываются порциями, типы колонок переводятся между СУБД, первичный ключ сохраняется</li>
+                    <li><strong>Просмотреть таблицу</strong> - просмотр выбранной таблицы внутренней или внешней БД без загрузки в память: строки читаются страницами по 1000 записей по мере прокрутки, в памяти хранятся только последние просмотренные страницы. Страницы выбираются по первичному ключу (или rowid), поэтому дальние страницы читаются так же быстро, как первая, а следующая страница загружается заранее. Графики строятся по первой странице</li>
                 </ul>
             </div>
             
+            <h3>📥 Импорт из внешней базы данных во внутреннюю</h3>
+            <div class="feature">
+                <ul>
+                    <li><strong>Таблица или запрос</strong> - имя таблицы внешней БД или запрос SELECT</li>
+                    <li><strong>Колонки</strong> и <strong>Условие WHERE</strong> - выполняются на стороне внешней БД, по сети передаются только нужные строки и колонки</li>
+                    <li><strong>Инкрементальный ключ</strong> - монотонно растущая колонка (id, дата изменения); при обновлении догружаются только строки с большим значением</li>
+                    <li><strong>Импортировать</strong> - потоковая загрузка порциями во внутреннюю таблицу</li>
+                    <li><strong>Обновить импорт</strong> - повторная загрузка (только новых строк, если задан ключ)</li>
+                </ul>
+            </div>
+
             <h3>📤 Экспорт данных в базу данных</h3>
             <div class="feature">
                 <ul>
                     <li><strong>Экспорт текущих данных</strong> - сохранение загруженного файла в БД</li>
                     <li><strong>Экспорт результата SQL</strong> - сохранение результатов SQL запроса в новую таблицу</li>
+                    <li><strong>Копировать таблицу внутренней БД во внешнюю</strong> - потоковое копирование таблицы без промежуточного DataFrame (режимы replace, append, fail)</li>
+                    <li><strong>Строк в порции</strong> - данные записываются порциями, каждая в своей транзакции; ход экспорта показывается в статус баре</li>
+                    <li><strong>Продолжить экспорт</strong> - после ошибки уже записанные порции сохраняются, экспорт продолжается с первой незаписанной строки</li>
                     <li><strong>Настройки экспорта:</strong>
                         <ul>
                             <li><em>replace</em> - заменить существующую таблицу</li>
                             <li><em>append</em> - добавить данные к существующей таблице</li>
                             <li><em>fail</em> - прервать операцию, если таблица существует</li>
+                            <li><em>merge</em> - обновить таблицу по ключевым колонкам: данные загружаются в промежуточную таблицу, затем одной транзакцией новые строки добавляются, а изменившиеся обновляются (INSERT ... ON CONFLICT, ON DUPLICATE KEY UPDATE или MERGE)</li>
                         </ul>
                     </li>
                 </ul>
             </div>
             
+            <h3>📊 Профиль данных</h3>
+            <div class="feature">
+                <ul>
+                    <li>Под таблицей показывается профиль каждой колонки: тип, число пропусков, минимум, максимум, среднее, число различных значений, частые значения и гистограмма</li>
+                    <li>Профиль рассчитывается в фоне и появляется по мере готовности колонок; для таблиц БД он считается агрегатными запросами на стороне БД без загрузки данных</li>
+                    <li>Число различных значений для больших колонок оценивается приближенно (помечено знаком ~, ошибка около 3%)</li>
+                    <li>Профили недавно показанных данных сохраняются и при повторном показе не пересчитываются</li>
+                </ul>
+            </div>
+
+            <h3>🔃 Сортировка и фильтры</h3>
+            <div class="feature">
+                <ul>
+                    <li><strong>Сортировка</strong> - щелчок по заголовку колонки сортирует таблицу данных или результат SQL без повторного запроса; повторный щелчок меняет направление. Предыдущие колонки сортировки остаются вторичными ключами (сортировка устойчивая), пустые значения всегда в конце</li>
+                    <li><strong>Фильтр</strong> - выберите колонку и введите подстроку (без учета регистра) или условие со знаком: <code>&gt; 100</code>, <code>&lt;= 2024-01-01</code>, <code>= abc</code>, <code>!= 0</code>. Фильтры разных колонок объединяются через И; пустое условие снимает фильтр колонки</li>
+                    <li><strong>Сбросить</strong> - снятие всех фильтров с сохранением сортировки</li>
+                    <li>Данные не копируются: меняется только порядок показа строк, номера строк в заголовке остаются исходными. Графики и экспорт используют исходные данные</li>
+                </ul>
+            </div>
+
             <h2>🔍 Вкладка "SQL"</h2>
             
             <h3>📝 Выполнение SQL запросов</h3>
@@ -887,11 +1010,33 @@ class DatasetAnalyzer(QMainWindow):
                 <ul>
                     <li><strong>Поле ввода запроса</strong> - многострочный редактор с подсветкой синтаксиса</li>
                     <li><strong>Выполнить запрос</strong> - исполнение SQL команд</li>
-                    <li><strong>Экспорт в CSV</strong> - сохранение результатов в CSV файл</li>
+                    <li><strong>Режим скрипта</strong> - выполнение нескольких операторов, разделенных ';', на одном соединении в одной транзакции с отчетом о времени и числе затронутых строк по каждому оператору</li>
+                    <li><strong>Экспорт в файл</strong> - сохранение результатов в CSV, Parquet, Feather или Arrow IPC (формат по расширению)</li>
+                    <li><strong>Запрос в файл</strong> - выполнение запроса с записью строк сразу в CSV файл порциями, без загрузки результата в память; сжатие выбирается расширением .csv.gz или .csv.zst (нужен zstandard)</li>
                     <li><strong>Очистить результат</strong> - очистка таблицы результатов</li>
                 </ul>
             </div>
             
+            <h3>📦 Пакетный запуск</h3>
+            <div class="feature">
+                <ul>
+                    <li><strong>Пакетный запуск (.sql)</strong> - выполнение набора запросов из файла; независимые запросы выполняются одновременно на нескольких соединениях</li>
+                    <li>Имя запроса задается комментарием <code>-- name: имя</code>, зависимость — <code>-- depends: имя1, имя2</code></li>
+                    <li>Результаты сохраняются в CSV, Parquet (требуется pyarrow) или в таблицы внутренней БД</li>
+                    <li>В журнале выводится время каждого запроса, общее время и сравнение с последовательным выполнением</li>
+                </ul>
+            </div>
+
+            <h3>🧮 Материализованные представления</h3>
+            <div class="feature">
+                <ul>
+                    <li><strong>Создать из запроса</strong> - результат запроса из поля ввода сохраняется во внутренней БД как таблица с указанным именем</li>
+                    <li>Для запросов вида <code>SELECT группа, SUM(x), COUNT(*), MIN(x), MAX(x) FROM таблица [WHERE ...] GROUP BY группа</code> после дозагрузки файла в режиме <em>append</em> агрегаты пересчитываются только по новым строкам</li>
+                    <li>Представления обновляются автоматически после каждой загрузки исходной таблицы; если таблица заменена или изменена SQL запросом, представление пересчитывается полностью</li>
+                    <li><strong>Обновить представления</strong> - принудительная проверка и обновление всех представлений</li>
+                </ul>
+            </div>
+
             <h3>💡 Примеры SQL запросов</h3>
             <div class="code">
 -- Базовая выборка данных<br>
@@ -920,9 +1065,10 @@ WHERE status = 'active' AND price BETWEEN 100 AND 500;
             <div class="feature">
                 <ul>
                     <li><strong>Гистограмма</strong> - распределение значений в одной колонке</li>
-                    <li><strong>Линейный график</strong> - зависимость между двумя переменными во времени</li>
-                    <li><strong>Точечный график</strong> - корреляция между двумя переменными</li>
-                    <li><strong>Столбчатый график</strong> - сравнение категориальных данных</li>
+                    <li><strong>Линейный график</strong> - зависимость между двумя переменными во времени; для больших данных рисуется около двух точек на пиксель ширины, выбранных алгоритмом LTTB с сохранением пиков, а маркеры точек показываются, только когда видно не больше 500 точек</li>
+                    <li><strong>Точечный график</strong> - корреляция между двумя переменными; если точек больше порога <em>Карта плотности от</em>, вместо отдельных точек рисуется карта плотности (число точек в ячейках в несколько пикселей, логарифмическая шкала цвета), которая пересчитывается для видимой области при масштабировании и сдвиге</li>
+                    <li><strong>Столбчатый график</strong> - сравнение категориальных данных (среднее Y по значениям X)</li>
+                    <li>Для таблицы, открытой кнопкой <em>Просмотреть таблицу</em>, гистограмма и столбчатый график считаются агрегатными запросами в БД по всей таблице (интервалы гистограммы и средние по группам), передаются только результаты; для нечисловых колонок и остальных типов графиков используется первая страница</li>
                 </ul>
             </div>
             
@@ -931,8 +1077,10 @@ WHERE status = 'active' AND price BETWEEN 100 AND 500;
                 <ul>
                     <li><strong>X колонка</strong> - выбор данных для горизонтальной оси</li>
                     <li><strong>Y колонка</strong> - выбор данных для вертикальной оси (не требуется для гистограммы)</li>
-                    <li><strong>Построить график</strong> - создание визуализации</li>
+                    <li><strong>Построить график</strong> - создание визуализации; данные готовятся и график рисуется в фоновом потоке, окно при этом не блокируется, а новый запрос графика отменяет еще не показанный</li>
+                    <li>Если для того же типа графика и тех же данных меняется только числовая колонка Y, оси и объекты графика сохраняются: подставляются новые значения и пересчитываются пределы оси Y, а приближение по оси X не сбрасывается</li>
                     <li><strong>Очистить график</strong> - очистка области построения</li>
+                    <li><strong>Панель над графиком</strong> - масштабирование, сдвиг, возврат к исходному виду и сохранение изображения; после приближения линейный график заново выбирает точки из видимого диапазона, поэтому становятся видны детали</li>
                 </ul>
             </div>
             
@@ -948,13 +1096,39 @@ WHERE status = 'active' AND price BETWEEN 100 AND 500;
                 </ul>
             </div>
             
+            <h2>💻 Консольный режим</h2>
+
+            <div class="feature">
+                <p>Для ночных заданий и скриптов доступен запуск без графического интерфейса (PyQt6 и matplotlib не загружаются):</p>
+                <div class="code">
+python cli.py run --load data.csv --sql "SELECT * FROM dataset" --output result.csv<br>
+python cli.py run --load data.csv --sql-file job.sql --script --output result.parquet<br>
+python cli.py batch reports.sql --load data.csv --format csv --output-dir out
+                </div>
+                <p>Без --output результат выводится в stdout в формате CSV, служебные сообщения — в stderr.</p>
+            </div>
+
+            <h2>🌐 HTTP сервис запросов</h2>
+
+            <div class="feature">
+                <p>Меню <strong>Сервис → Запустить HTTP сервис</strong> открывает доступ к внутренней БД по адресу http://127.0.0.1:8765 (только с этого компьютера):</p>
+                <ul>
+                    <li><code>GET /tables</code> - список таблиц</li>
+                    <li><code>POST /load</code> с телом <code>{"path": "...", "table": "dataset"}</code> - загрузка файла</li>
+                    <li><code>GET /query?sql=SELECT ...&page=1&page_size=1000&format=ndjson</code> - запрос с постраничной выдачей (format: ndjson или arrow)</li>
+                    <li><code>GET /export?table=dataset&format=csv</code> - выгрузка таблицы целиком (csv, ndjson, arrow)</li>
+                </ul>
+                <p>Результаты передаются потоком порциями; разрешены только запросы SELECT. Тот же сервис запускается командой <code>python cli.py serve</code>.</p>
+            </div>
+
             <h2>🔧 Системные требования</h2>
             
             <div class="feature">
                 <h4>Обязательные зависимости:</h4>
                 <div class="code">
-pip install pandas PyQt6 matplotlib seaborn sqlalchemy pymysql
+pip install pandas PyQt6 matplotlib sqlalchemy pymysql
                 </div>
+                <p>Драйверы pymysql и pyodbc загружаются только при подключении к MySQL и SQL Server, а matplotlib и справка — при первом открытии своих вкладок, что ускоряет запуск программы.</p>
                 
                 <h4>Дополнительные зависимости:</h4>
                 <div class="code">
@@ -967,7 +1141,7 @@ pip install pyodbc   # Для подключения к SQL Server
             
             <div class="warning">
                 <ul>
-                    <li>Для больших файлов отображается только первые 1000 строк</li>
+                    <li>Таблицы показывают все строки данных: значения читаются только для видимых ячеек при прокрутке</li>
                     <li>При работе с SQL Server может потребоваться установка ODBC Driver 17</li>
                     <li>Всегда делайте резервные копии важных данных перед экспортом</li>
                 </ul>
@@ -1094,10 +1268,10 @@ pip install pyodbc   # Для подключения к SQL Server
         )
         if file_path:
             try:
-                self.current_data = pd.read_csv(file_path)
+                self.current_data = read_data_file(file_path, "csv")
                 # Загружаем данные во внутреннюю БД
                 success, message = self.db_connection.load_data_to_internal_db(
-                    self.current_data, "dataset"
+                    self.current_data, "dataset", self.get_load_mode()
                 )
                 if success:
                     self.display_data(self.current_data)
@@ -1121,10 +1295,10 @@ pip install pyodbc   # Для подключения к SQL Server
         )
         if file_path:
             try:
-                self.current_data = pd.read_excel(file_path)
+                self.current_data = read_data_file(file_path, "excel")
                 # Загружаем данные во внутреннюю БД
                 success, message = self.db_connection.load_data_to_internal_db(
-                    self.current_data, "dataset"
+                    self.current_data, "dataset", self.get_load_mode()
                 )
                 if success:
                     self.display_data(self.current_data)
@@ -1152,11 +1326,10 @@ pip install pyodbc   # Для подключения к SQL Server
         )
         if file_path:
             try:
-                dbf = DBF(file_path)
-                self.current_data = pd.DataFrame(iter(dbf))
+                self.current_data = read_data_file(file_path, "dbf")
                 # Загружаем данные во внутреннюю БД
                 success, message = self.db_connection.load_data_to_internal_db(
-                    self.current_data, "dataset"
+                    self.current_data, "dataset", self.get_load_mode()
                 )
                 if success:
                     self.display_data(self.current_data)
@@ -1173,6 +1346,98 @@ pip install pyodbc   # Для подключения к SQL Server
             except Exception as e:
                 self.show_error(f"Ошибка загрузки DBF: {str(e)}")
     
+    def load_columnar(self):
+        """Загрузка Parquet, Feather или Arrow IPC файла"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Выберите файл",
+            "",
+            "Columnar Files (*.parquet *.feather *.arrow)",
+        )
+        if file_path:
+            try:
+                self.current_data = read_data_file(file_path)
+                # Загружаем данные во внутреннюю БД
+                success, message = self.db_connection.load_data_to_internal_db(
+                    self.current_data, "dataset", self.get_load_mode()
+                )
+                if success:
+                    self.display_data(self.current_data)
+                    self.update_column_selectors()
+                    self.update_tables_info()
+                    self.show_message(
+                        f"Файл загружен: {len(self.current_data)} строк. {message}"
+                    )
+                    self.show_status_message(
+                        f"Файл загружен: {len(self.current_data)} строк"
+                    )
+                else:
+                    self.show_error(message)
+            except Exception as e:
+                self.show_error(f"Ошибка загрузки файла: {str(e)}")
+
+    def get_save_file_path(self, title):
+        """Выбор файла для сохранения данных; формат определяется расширением"""
+        filters = "CSV Files (*.csv)"
+        if PYARROW_AVAILABLE:
+            filters += (
+                ";;Parquet Files (*.parquet);;Feather Files (*.feather)"
+                ";;Arrow IPC Files (*.arrow)"
+            )
+        file_path, _ = QFileDialog.getSaveFileName(self, title, "", filters)
+        return file_path
+
+    def save_data_to_file(self, data, file_path):
+        """Запись DataFrame в файл по расширению"""
+        try:
+            write_data_file(data, file_path)
+            self.show_message(f"Данные экспортированы в файл: {file_path}")
+            self.show_status_message(f"Экспорт в файл выполнен: {len(data)} строк")
+        except Exception as e:
+            self.show_error(f"Ошибка экспорта в файл: {str(e)}")
+
+    def save_current_data_to_file(self):
+        """Сохранение текущих данных в CSV, Parquet, Feather или Arrow"""
+        if self.current_data is None:
+            self.show_error("Нет данных для экспорта")
+            return
+        file_path = self.get_save_file_path("Сохранить данные")
+        if file_path:
+            self.save_data_to_file(self.current_data, file_path)
+
+    def export_table_to_file(self):
+        """Выгрузка таблицы внутренней БД в файл в фоновом потоке"""
+        if self.db_connection.connection_type.startswith("external"):
+            self.show_error("Выгрузка таблиц в файл доступна для внутренней БД")
+            return
+        tables = self.db_connection.get_table_names()
+        if not tables:
+            self.show_error("Во внутренней БД нет таблиц")
+            return
+        table_name, ok = QInputDialog.getItem(
+            self, "Выгрузка таблицы", "Таблица:", tables, 0, False
+        )
+        if not ok:
+            return
+        file_path = self.get_save_file_path(f"Выгрузить таблицу {table_name}")
+        if not file_path:
+            return
+
+        worker = TaskWorker(
+            self.db_connection.export_table_to_file, table_name, file_path
+        )
+        self.start_worker(worker, self.on_table_export_finished)
+        self.show_status_message(f"Выгрузка таблицы '{table_name}' в файл...")
+
+    def on_table_export_finished(self, result):
+        """Итог выгрузки таблицы в файл"""
+        success, message = result
+        if success:
+            self.show_message(message)
+            self.show_status_message(message)
+        else:
+            self.show_error(message)
+
     def load_json(self):
         """Загрузка JSON файла"""
         file_path, _ = QFileDialog.getOpenFileName(
@@ -1182,52 +1447,7 @@ pip install pyodbc   # Для подключения к SQL Server
             print(f"Начинаем загрузку JSON файла: {file_path}")
             try:
                 # Пробуем различные способы загрузки JSON
-                try:
-                    # Сначала пробуем загрузить как массив объектов
-                    print("Пробуем загрузить JSON с помощью pd.read_json()")
-                    self.current_data = pd.read_json(file_path)
-                    print(
-                        f"Успешно загружено с pd.read_json(): {self.current_data.shape}"
-                    )
-                except ValueError as e:
-                    print(f"pd.read_json() не сработал: {e}")
-                    # Если не получилось, пробуем загрузить как обычный JSON и нормализовать
-                    import json
-
-                    print("Пробуем загрузить как обычный JSON файл")
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        json_data = json.load(f)
-
-                    print(f"JSON загружен, тип данных: {type(json_data)}")
-
-                    # Проверяем структуру данных
-                    if isinstance(json_data, dict):
-                        print("JSON является словарем, нормализуем")
-                        # Если это словарь, пробуем нормализовать
-                        self.current_data = pd.json_normalize(json_data)
-                        print(f"После нормализации словаря: {self.current_data.shape}")
-                    elif isinstance(json_data, list):
-                        if len(json_data) > 0 and isinstance(json_data[0], dict):
-                            print("JSON является списком словарей, нормализуем")
-                            # Если это список словарей, нормализуем каждый элемент
-                            self.current_data = pd.json_normalize(json_data)
-                            print(
-                                f"После нормализации списка словарей: {self.current_data.shape}"
-                            )
-                        else:
-                            print("JSON является простым списком")
-                            # Если это простой список, создаем DataFrame с одной колонкой
-                            self.current_data = pd.DataFrame({"values": json_data})
-                            print(
-                                f"После создания DataFrame из списка: {self.current_data.shape}"
-                            )
-                    else:
-                        print("JSON является простым значением")
-                        # Если это простое значение, создаем DataFrame
-                        self.current_data = pd.DataFrame({"value": [json_data]})
-                        print(
-                            f"После создания DataFrame из значения: {self.current_data.shape}"
-                        )
+                self.current_data = read_json_file(file_path)
 
                 # Проверяем, что данные загружены успешно
                 if self.current_data.empty:
@@ -1250,7 +1470,7 @@ pip install pyodbc   # Для подключения к SQL Server
                 # Загружаем данные во внутреннюю БД
                 print("Начинаем загрузку в БД...")
                 success, message = self.db_connection.load_data_to_internal_db(
-                    self.current_data, "dataset"
+                    self.current_data, "dataset", self.get_load_mode()
                 )
                 if success:
                     print("Данные успешно загружены в БД")
@@ -1278,8 +1498,8 @@ pip install pyodbc   # Для подключения к SQL Server
         success, message = self.db_connection.clear_internal_data()
         if success:
             self.current_data = None
-            self.data_table.setRowCount(0)
-            self.data_table.setColumnCount(0)
+            self.get_dataframe_model(self.data_table).set_dataframe(None)
+            self.update_filter_bar()
             self.data_info.clear()
             self.update_column_selectors()
             self.update_tables_info()
@@ -1345,20 +1565,10 @@ pip install pyodbc   # Для подключения к SQL Server
             self.show_error("Введите имя таблицы для экспорта")
             return
 
-        if_exists = self.export_if_exists.currentText()
-
-        success, message = self.db_connection.export_data_to_external_db(
-            self.current_data, table_name, if_exists
+        self.start_export(
+            self.current_data, table_name, self.export_if_exists.currentText()
         )
 
-        if success:
-            self.show_message(message)
-            self.show_status_message(f"Данные экспортированы в таблицу '{table_name}'")
-            # Обновляем список таблиц
-            self.refresh_table_list()
-        else:
-            self.show_error(message)
-
     def export_sql_result(self):
         """Экспорт результата SQL запроса в БД"""
         if self.last_sql_result is None:
@@ -1374,43 +1584,141 @@ pip install pyodbc   # Для подключения к SQL Server
             self.show_error("Введите имя таблицы для экспорта")
             return
 
-        if_exists = self.export_if_exists.currentText()
+        self.start_export(
+            self.last_sql_result, table_name, self.export_if_exists.currentText()
+        )
 
-        success, message = self.db_connection.export_data_to_external_db(
-            self.last_sql_result, table_name, if_exists
+    def start_export(self, data, table_name, if_exists, resume=False):
+        """Экспорт данных во внешнюю БД порциями в фоновом потоке"""
+        self.failed_export = None
+        self.btn_resume_export.setEnabled(False)
+        key_columns = [
+            column.strip() for column in self.export_key_columns.text().split(",")
+        ]
+        worker = TaskWorker(
+            self.db_connection.export_data_to_external_db,
+            data,
+            table_name,
+            if_exists,
+            chunksize=self.export_chunk_size.value(),
+            resume=resume,
+            key_columns=key_columns,
+        )
+        self.start_worker(
+            worker,
+            lambda result: self.on_export_finished(result, data, table_name, if_exists),
         )
+        self.show_status_message(f"Экспорт в таблицу '{table_name}': {len(data)} строк")
 
+    def on_export_finished(self, result, data, table_name, if_exists):
+        """Итог экспорта; прерванный экспорт можно продолжить"""
+        success, message = result
         if success:
             self.show_message(message)
-            self.show_status_message(
-                f"Результат SQL запроса экспортирован в таблицу '{table_name}'"
-            )
+            self.show_status_message(f"Данные экспортированы в таблицу '{table_name}'")
             # Обновляем список таблиц
             self.refresh_table_list()
+            return
+
+        # В режиме merge прерваться может загрузка промежуточной таблицы
+        checkpoints = self.db_connection.export_checkpoints
+        if table_name in checkpoints or (
+            if_exists == "merge" and staging_table_name(table_name) in checkpoints
+        ):
+            self.failed_export = (data, table_name, if_exists)
+            self.btn_resume_export.setEnabled(True)
+        self.show_error(message)
+
+    def copy_table_to_internal(self):
+        """Потоковое копирование выбранной таблицы внешней БД во внутреннюю"""
+        table_name = self.table_selector.currentText()
+        if not table_name:
+            self.show_error("Выберите таблицу для копирования")
+            return
+        worker = TaskWorker(self.db_connection.copy_table, table_name)
+        self.start_worker(worker, self.on_copy_table_finished)
+        self.show_status_message(f"Копирование таблицы '{table_name}'...")
+
+    def copy_table_to_external(self):
+        """Потоковое копирование таблицы внутренней БД во внешнюю"""
+        if not self.db_connection.connection_type.startswith("external"):
+            self.show_error("Подключитесь к внешней базе данных для копирования")
+            return
+        catalog = self.db_connection.get_schema_catalog(scope="internal")
+        tables = list(catalog["tables"]) if catalog else []
+        if not tables:
+            self.show_error("Во внутренней БД нет таблиц")
+            return
+        table_name, ok = QInputDialog.getItem(
+            self, "Копирование таблицы", "Таблица внутренней БД:", tables, 0, False
+        )
+        if not ok:
+            return
+        worker = TaskWorker(
+            self.db_connection.copy_table,
+            table_name,
+            to_internal=False,
+            if_exists=self.export_if_exists.currentText(),
+        )
+        self.start_worker(worker, self.on_copy_table_finished)
+        self.show_status_message(f"Копирование таблицы '{table_name}'...")
+
+    def on_copy_table_finished(self, result):
+        """Итог копирования таблицы между базами"""
+        success, message = result
+        if success:
+            self.update_tables_info()
+            self.show_message(message)
+            self.show_status_message(message)
         else:
             self.show_error(message)
 
-    def export_sql_result_to_csv(self):
-        """Экспорт результата SQL запроса в CSV файл"""
+    def resume_export(self):
+        """Продолжение прерванного экспорта с первой незаписанной порции"""
+        if self.failed_export is None:
+            self.show_error("Нет прерванного экспорта")
+            return
+        data, table_name, if_exists = self.failed_export
+        self.start_export(data, table_name, if_exists, resume=True)
+
+    def export_sql_result_to_file(self):
+        """Экспорт результата SQL запроса в CSV, Parquet, Feather или Arrow"""
         if self.last_sql_result is None:
             self.show_error("Нет результата SQL запроса для экспорта")
             return
 
+        file_path = self.get_save_file_path("Сохранить результат запроса")
+        if file_path:
+            self.save_data_to_file(self.last_sql_result, file_path)
+
+    def export_query_to_file(self):
+        """Выполнение запроса с потоковой записью результата в CSV файл"""
+        query = self.sql_input.toPlainText().strip()
+        if not query:
+            self.show_error("Введите SQL запрос")
+            return
+
         file_path, _ = QFileDialog.getSaveFileName(
-            self, "Сохранить как CSV", "", "CSV Files (*.csv)"
+            self,
+            "Сохранить результат запроса",
+            "",
+            "CSV Files (*.csv);;CSV gzip (*.csv.gz);;CSV zstd (*.csv.zst)",
         )
+        if not file_path:
+            return
 
-        if file_path:
-            try:
-                self.last_sql_result.to_csv(
-                    file_path, index=False, encoding="utf-8-sig"
-                )
-                self.show_message(f"Данные экспортированы в файл: {file_path}")
-                self.show_status_message(
-                    f"Экспорт в CSV выполнен: {len(self.last_sql_result)} строк"
-                )
-            except Exception as e:
-                self.show_error(f"Ошибка экспорта в CSV: {str(e)}")
+        worker = TaskWorker(self.db_connection.export_query_to_csv, query, file_path)
+        self.start_worker(worker, self.on_query_to_file_finished)
+        self.show_status_message("Выгрузка результата запроса в файл...")
+
+    def on_query_to_file_finished(self, result):
+        """Итог потоковой выгрузки запроса в файл"""
+        success, message = result
+        if success:
+            self.sql_log.setText(message)
+            self.show_status_message(message)
+        else:
+            self.show_error(message)
 
     def disconnect_external_db(self):
         """Отключение от внешней БД"""
@@ -1424,12 +1732,65 @@ pip install pyodbc   # Для подключения к SQL Server
             self.show_error(message)
 
     def update_tables_info(self):
-        """Обновление информации о доступных таблицах"""
-        tables = self.db_connection.get_table_names()
+        """Обновление информации о доступных таблицах
+
+        Данные берутся из кэша каталога схемы; если каталог устарел,
+        он загружается в фоновом потоке и отображается по готовности.
+        """
+        catalog = self.db_connection.get_cached_schema_catalog()
+        if catalog is None:
+            self.load_schema_catalog()
+            return
+
+        tables = []
+        for name, info in catalog["tables"].items():
+            if info["row_count"] is None:
+                tables.append(name)
+            else:
+                tables.append(f"{name} (~{info['row_count']} строк)")
         if tables:
-            self.tables_info.setText(f"Доступные таблицы: {', '.join(tables)}")
+            self.set_tables_info(f"Доступные таблицы: {', '.join(tables)}")
         else:
-            self.tables_info.setText("Доступные таблицы: нет данных")
+            self.set_tables_info("Доступные таблицы: нет данных")
+
+        if hasattr(self, "table_selector") and self.table_selector.isEnabled():
+            current = self.table_selector.currentText()
+            self.table_selector.clear()
+            self.table_selector.addItems(list(catalog["tables"]))
+            self.table_selector.setCurrentText(current)
+
+    def set_tables_info(self, text):
+        """Текст о доступных таблицах (вкладка SQL может быть еще не построена)"""
+        self.tables_info_text = text
+        if hasattr(self, "tables_info"):
+            self.tables_info.setText(text)
+
+    def load_schema_catalog(self):
+        """Фоновая загрузка каталога схемы активной БД"""
+        if self.catalog_loading:
+            return
+        self.catalog_loading = True
+        self.set_tables_info("Доступные таблицы: загрузка...")
+        worker = TaskWorker(self.db_connection.refresh_schema_catalog)
+        self.start_worker(worker, self.on_schema_catalog_loaded)
+
+    def on_schema_catalog_loaded(self, result):
+        """Отображение загруженного каталога схемы"""
+        self.catalog_loading = False
+        success, catalog = result
+        if not success:
+            self.set_tables_info("Доступные таблицы: нет данных")
+            self.show_status_message(catalog)
+            return
+        if self.db_connection.get_cached_schema_catalog() is None:
+            # Каталог изменился во время загрузки — загружаем заново
+            self.load_schema_catalog()
+            return
+        self.update_tables_info()
+        self.show_status_message(
+            f"Найдено таблиц: {len(catalog['tables'])} "
+            f"(каталог загружен за {catalog['load_time']:.2f} с)"
+        )
 
     def update_db_status(self):
         """Обновление статуса подключения к БД"""
@@ -1442,25 +1803,19 @@ pip install pyodbc   # Для подключения к SQL Server
                 # Активируем селектор таблиц
                 if hasattr(self, "table_selector"):
                     self.table_selector.setEnabled(True)
-                    self.refresh_table_list()
+                    self.update_tables_info()
             else:
                 self.db_status.setText("Статус: Внутренняя БД")
                 self.db_status.setStyleSheet("color: green; font-weight: bold;")
-                # Деактивируем селектор таблиц
+                # Таблицы внутренней БД тоже можно просматривать
                 if hasattr(self, "table_selector"):
-                    self.table_selector.setEnabled(False)
-                    self.table_selector.clear()
+                    self.table_selector.setEnabled(True)
+                    self.update_tables_info()
 
     def refresh_table_list(self):
-        """Обновление списка таблиц в селекторе"""
-        if hasattr(self, "table_selector"):
-            self.table_selector.clear()
-            tables = self.db_connection.get_table_names()
-            if tables:
-                self.table_selector.addItems(tables)
-                self.show_status_message(f"Найдено таблиц: {len(tables)}")
-            else:
-                self.show_status_message("Таблицы не найдены")
+        """Перечитывание каталога схемы и обновление списка таблиц"""
+        self.db_connection.invalidate_schema_catalog()
+        self.update_tables_info()
 
     def view_selected_table(self):
         """Просмотр выбранной таблицы из БД"""
@@ -1470,22 +1825,73 @@ pip install pyodbc   # Для подключения к SQL Server
 
         table_name = self.table_selector.currentText()
 
-        # Выполняем запрос для получения данных таблицы
-        query = f"SELECT * FROM {table_name} LIMIT 1000"  # Ограничиваем для производительности
+        success, pager = self.db_connection.open_table_pager(table_name)
+        if not success:
+            self.show_error(f"Ошибка загрузки таблицы: {pager}")
+            return
 
-        success, result = self.db_connection.execute_query(query)
-        if success:
-            self.current_data = result
-            self.display_data(result)
-            self.update_column_selectors()
-            self.show_status_message(
-                f"Загружена таблица '{table_name}': {len(result)} строк"
-            )
+        # Строки читаются страницами по мере прокрутки, в памяти хранится
+        # только окно последних просмотренных страниц
+        model = SqlQueryModel(pager, parent=self.data_table)
+        success, data = model.fetch_first_page()
+        if not success:
+            pager.close()
+            self.show_error(f"Ошибка загрузки таблицы: {data}")
+            return
+        self.close_table_pager()
+        self.table_pager = pager
+        # Сортировка и фильтры работают только с данными в памяти
+        self.data_table.setSortingEnabled(False)
+        self.data_table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.data_table.setModel(model)
+        self.update_filter_bar()
+        model.rowsInserted.connect(self.update_table_rows_info)
+        model.end_reached.connect(self.update_table_rows_info)
+        self.adjust_column_widths(self.data_table)
+
+        # Для выбора колонок и графиков по отдельным точкам используется
+        # первая страница; гистограмма и столбчатый график считаются в БД
+        self.current_data = data
+        self.current_data_source = table_name
+        self.update_column_selectors()
+        total = f"~{pager.total_rows}" if pager.total_rows is not None else "неизвестно"
+        summary = (
+            f"Таблица БД: {table_name}, строк: {total}, {data.shape[1]} колонок. "
+            "Строки загружаются при прокрутке; гистограмма и столбчатый график "
+            "считаются по всей таблице в БД, остальные графики — по первой странице"
+        )
+        # Профиль считается агрегатными запросами на стороне БД
+        scope = self.db_connection.get_catalog_scope()
+        self.show_data_profile(
+            ("table", scope, table_name, self.db_connection.catalog_generation[scope]),
+            summary,
+            self.db_connection.profile_table,
+            table_name,
+        )
+        self.update_table_rows_info()
+        self.show_status_message(f"Таблица '{table_name}' открыта")
 
-            # Переключаемся на вкладку данных
-            self.tabs.setCurrentIndex(0)
-        else:
-            self.show_error(f"Ошибка загрузки таблицы: {result}")
+        # Переключаемся на вкладку данных
+        self.tabs.setCurrentIndex(0)
+
+    def update_table_rows_info(self):
+        """Число строк просматриваемой таблицы, прочитанных из БД"""
+        model = self.data_table.model()
+        if not isinstance(model, SqlQueryModel):
+            self.table_page_info.setText("")
+            return
+        text = f"Загружено строк: {model.row_count}"
+        if model.at_end:
+            text += " (вся таблица)"
+        elif self.table_pager.total_rows:
+            text += f" из ~{self.table_pager.total_rows}"
+        self.table_page_info.setText(text)
+
+    def close_table_pager(self):
+        """Остановка фонового чтения страниц просматриваемой таблицы"""
+        if self.table_pager is not None:
+            self.table_pager.close()
+            self.table_pager = None
 
     def connect_sqlite(self):
         """Подключение к SQLite"""
@@ -1501,6 +1907,101 @@ pip install pyodbc   # Для подключения к SQL Server
             else:
                 self.show_error(message)
 
+    def get_load_mode(self):
+        """Режим записи загружаемого файла в таблицу dataset"""
+        return "append" if self.load_append.isChecked() else "replace"
+
+    def set_import_enabled(self, enabled):
+        """Блокировка кнопок импорта, пока идет фоновый импорт"""
+        self.btn_import.setEnabled(enabled)
+        self.btn_refresh_import.setEnabled(enabled)
+
+    def start_import(self, func, *args, notify=False, **kwargs):
+        """Импорт из внешней БД в фоновом потоке"""
+        self.set_import_enabled(False)
+        worker = TaskWorker(func, *args, **kwargs)
+        self.start_worker(worker, lambda result: self.on_import_finished(result, notify))
+
+    def on_import_finished(self, result, notify):
+        """Итог импорта или обновления таблицы из внешней БД"""
+        self.set_import_enabled(True)
+        success, message = result
+        if success:
+            self.update_tables_info()
+            if notify:
+                self.show_message(message)
+            self.show_status_message(message)
+        else:
+            self.show_error(message)
+
+    def import_remote_table(self):
+        """Импорт таблицы из внешней БД во внутреннюю"""
+        if not self.db_connection.connection_type.startswith("external"):
+            self.show_error("Подключитесь к внешней базе данных для импорта")
+            return
+
+        source = self.import_source.text().strip()
+        if not source:
+            self.show_error("Укажите таблицу или запрос для импорта")
+            return
+
+        columns = self.import_columns.text().split(",")
+        self.start_import(
+            self.db_connection.import_remote_table,
+            source,
+            target_table=self.import_target.text().strip() or None,
+            columns=columns,
+            where=self.import_where.text(),
+            incremental_column=self.import_incremental.text().strip() or None,
+            notify=True,
+        )
+        self.show_status_message(f"Импорт из внешней БД: {source}")
+
+    def refresh_remote_table(self):
+        """Обновление импортированной таблицы (инкрементально, если задан ключ)"""
+        source = self.import_source.text().strip()
+        target_table = self.import_target.text().strip()
+        if not target_table:
+            target_table = next(
+                (
+                    name
+                    for name, spec in self.db_connection.remote_imports.items()
+                    if spec["source"] == source.rstrip(";")
+                ),
+                "",
+            )
+        if not target_table:
+            self.show_error("Укажите внутреннюю таблицу, импортированную ранее")
+            return
+
+        self.start_import(self.db_connection.refresh_remote_table, target_table)
+        self.show_status_message(f"Обновление таблицы '{target_table}'...")
+
+    def attach_sqlite(self):
+        """Присоединение SQLite файла к внутренней БД"""
+        alias = self.attach_alias.text().strip()
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Выберите SQLite файл", "", "SQLite Files (*.db *.sqlite *.sqlite3)"
+        )
+        if file_path:
+            success, message = self.db_connection.attach_sqlite(file_path, alias)
+            if success:
+                self.update_tables_info()
+                self.show_message(message)
+                self.show_status_message(f"Присоединена схема '{alias}'")
+            else:
+                self.show_error(message)
+
+    def detach_sqlite(self):
+        """Отсоединение SQLite файла от внутренней БД"""
+        alias = self.attach_alias.text().strip()
+        success, message = self.db_connection.detach_sqlite(alias)
+        if success:
+            self.update_tables_info()
+            self.show_status_message(message)
+        else:
+            self.show_error(message)
+
     def connect_mysql(self):
         """Подключение к MySQL"""
         host = self.mysql_host.text()
@@ -1531,6 +2032,10 @@ pip install pyodbc   # Для подключения к SQL Server
             self.show_error("Введите SQL запрос")
             return
 
+        if self.sql_script_mode.isChecked():
+            self.execute_sql_script(query)
+            return
+
         success, result = self.db_connection.execute_query(query)
         if success:
             # Сохраняем результат для возможного экспорта
@@ -1548,55 +2053,321 @@ pip install pyodbc   # Для подключения к SQL Server
             self.show_error(result)
             self.show_status_message("Ошибка выполнения SQL запроса")
 
+    def execute_sql_script(self, script):
+        """Выполнение SQL скрипта в одной транзакции"""
+        success, result = self.db_connection.execute_script(script)
+        if not success:
+            self.sql_log.setText(result)
+            self.show_error(result)
+            self.show_status_message("Ошибка выполнения SQL скрипта")
+            return
+
+        report = result["statements"]
+        self.sql_log.setText(
+            format_script_report(report)
+            + f"\nВсего: {len(report)} операторов за {result['total_time']:.3f} с"
+        )
+
+        data = result["data"]
+        if data is not None:
+            self.last_sql_result = data
+            self.current_data = data
+            self.update_column_selectors()
+            self.display_data_in_table(data, self.sql_result_table)
+
+        self.update_tables_info()
+        self.show_status_message(
+            f"SQL скрипт выполнен: {len(report)} операторов за {result['total_time']:.3f} с"
+        )
+
+    def start_worker(self, worker, on_result):
+        """Запуск фоновой задачи с выводом хода выполнения в статус бар"""
+        worker.progress.connect(self.show_worker_progress)
+        worker.result_ready.connect(on_result)
+        worker.finished.connect(lambda: self.workers.remove(worker))
+        worker.finished.connect(lambda: self.progress_bar.setVisible(False))
+        self.workers.append(worker)
+        worker.start()
+
+    def show_worker_progress(self, message):
+        """Сообщение фоновой задачи: текст или кортеж (готово, всего, текст)"""
+        if isinstance(message, tuple):
+            done, total, message = message
+            self.progress_bar.setRange(0, total)
+            self.progress_bar.setValue(done)
+            self.progress_bar.setVisible(True)
+        self.show_status_message(str(message))
+
+    def run_batch_file(self):
+        """Пакетный запуск запросов из .sql файла"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Выберите .sql файл", "", "SQL Files (*.sql)"
+        )
+        if not file_path:
+            return
+
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                queries = parse_batch_queries(f.read())
+        except Exception as e:
+            self.show_error(f"Ошибка чтения файла: {str(e)}")
+            return
+        if not queries:
+            self.show_error("Файл не содержит SQL запросов")
+            return
+
+        output_format = self.batch_output_format.currentText()
+        output_dir = None
+        if output_format != "table":
+            output_dir = QFileDialog.getExistingDirectory(
+                self, "Папка для результатов", os.path.dirname(file_path)
+            )
+            if not output_dir:
+                return
+
+        worker = TaskWorker(
+            self.db_connection.run_batch,
+            queries,
+            output_format=output_format,
+            output_dir=output_dir,
+        )
+        self.start_worker(worker, self.on_batch_finished)
+        self.show_status_message(f"Пакетный запуск: {len(queries)} запросов")
+
+    def on_batch_finished(self, result):
+        """Отображение итогов пакетного запуска"""
+        success, summary = result
+        if isinstance(summary, str):
+            self.show_error(summary)
+            return
+
+        self.sql_log.setText(format_batch_summary(summary))
+        self.update_tables_info()
+        self.show_status_message(
+            f"Пакет выполнен за {summary['wall_time']:.2f} с "
+            f"(последовательно {summary['sequential_time']:.2f} с)"
+        )
+        if not success:
+            self.show_error("Часть запросов пакета завершилась с ошибкой, см. журнал")
+
+    def create_materialized_view(self):
+        """Создание материализованного представления из текста запроса"""
+        if self.db_connection.connection_type.startswith("external"):
+            self.show_error("Материализованные представления создаются во внутренней БД")
+            return
+
+        query = self.sql_input.toPlainText().strip()
+        name = self.view_name.text().strip()
+        if not query or not name:
+            self.show_error("Введите SQL запрос и имя представления")
+            return
+
+        success, message = self.db_connection.create_materialized_view(name, query)
+        if success:
+            incremental = self.db_connection.materialized_views[name]["aggregate"]
+            if incremental:
+                message += " (поддерживается инкрементальное обновление)"
+            self.update_tables_info()
+            self.sql_log.setText(message)
+            self.show_status_message(message)
+        else:
+            self.show_error(message)
+
+    def refresh_materialized_views(self):
+        """Обновление всех материализованных представлений"""
+        messages = self.db_connection.refresh_materialized_views()
+        if messages:
+            self.sql_log.setText("\n".join(messages))
+            self.show_status_message(f"Обновлено представлений: {len(messages)}")
+        else:
+            self.show_status_message("Материализованные представления не созданы")
+
+    def drop_materialized_view(self):
+        """Удаление материализованного представления"""
+        success, message = self.db_connection.drop_materialized_view(
+            self.view_name.text().strip()
+        )
+        if success:
+            self.update_tables_info()
+            self.show_status_message(message)
+        else:
+            self.show_error(message)
+
     def display_data(self, data):
         """Отображение данных в таблице"""
         self.display_data_in_table(data, self.data_table)
 
-        # Показ информации о данных
-        info = f"Размер: {data.shape[0]} строк, {data.shape[1]} колонок\n"
-        info += f"Колонки: {', '.join(data.columns.tolist())}\n"
-        info += f"Типы данных:\n{data.dtypes.to_string()}"
-        self.data_info.setText(info)
+        # Профиль колонок по номеру загрузки данных: id DataFrame может
+        # достаться новым данным после сборки мусора
+        summary = f"Размер: {data.shape[0]} строк, {data.shape[1]} колонок"
+        self.show_data_profile(("data", self.data_version), summary, profile_data, data)
+
+    def show_data_profile(self, key, summary, func, *args):
+        """Профиль колонок из кэша или расчет в фоне с показом по колонкам"""
+        self.profile_key = key
+        self.profile_summary = summary
+        cached = self.profile_cache.get(key)
+        if cached is not None:
+            self.profile_cache.move_to_end(key)
+            self.profile_rows = cached
+            self.render_data_profile(finished=True)
+            return
 
-    def display_data_in_table(self, data, table_widget):
-        """Отображение данных в указанной таблице"""
-        table_widget.setRowCount(
-            min(len(data), 1000)
-        )  # Ограничиваем до 1000 строк для производительности
-        table_widget.setColumnCount(len(data.columns))
-        table_widget.setHorizontalHeaderLabels(data.columns.tolist())
-
-        for i in range(min(len(data), 1000)):
-            for j, column in enumerate(data.columns):
-                item = QTableWidgetItem(str(data.iloc[i, j]))
-                table_widget.setItem(i, j, item)
-
-        # Автоматическая настройка ширины колонок
-        table_widget.resizeColumnsToContents()
-
-        # Дополнительная настройка: устанавливаем минимальную и максимальную ширину
-        header = table_widget.horizontalHeader()
-        for i in range(table_widget.columnCount()):
-            # Получаем текущую ширину после resizeColumnsToContents
-            current_width = table_widget.columnWidth(i)
+        self.profile_rows = []
+        self.render_data_profile(finished=False)
+        worker = ProfileWorker(func, *args)
+        worker.column_ready.connect(
+            lambda profile, key=key: self.on_profile_column(key, profile)
+        )
+        self.start_worker(
+            worker, lambda result, key=key: self.on_profile_finished(key, result)
+        )
+
+    def on_profile_column(self, key, profile):
+        """Добавление готовой колонки в отображаемый профиль"""
+        if key != self.profile_key:
+            return  # Профиль уже не отображаемых данных
+        self.profile_rows.append(profile)
+        self.render_data_profile(finished=False)
+
+    def on_profile_finished(self, key, result):
+        """Сохранение рассчитанного профиля в кэше"""
+        success, profiles = result
+        if not success:
+            if key == self.profile_key:
+                self.render_data_profile(finished=True, error=profiles)
+                self.show_status_message(f"Ошибка расчета профиля: {profiles}")
+            return
+        self.profile_cache[key] = profiles
+        while len(self.profile_cache) > PROFILE_CACHE_SIZE:
+            self.profile_cache.popitem(last=False)
+        if key == self.profile_key:
+            self.profile_rows = profiles
+            self.render_data_profile(finished=True)
+
+    def render_data_profile(self, finished, error=None):
+        """Вывод профиля колонок таблицей в поле информации о данных"""
+        cells = "".join(f"<th>{html.escape(header)}</th>" for header in PROFILE_HEADERS)
+        rows = [f"<tr>{cells}</tr>"]
+        for profile in self.profile_rows:
+            cells = "".join(
+                f"<td>{html.escape(value)}</td>" for value in format_profile_row(profile)
+            )
+            rows.append(f"<tr>{cells}</tr>")
+        status = "" if finished else "<p><i>Профиль рассчитывается...</i></p>"
+        if error:
+            status = f"<p><b>Ошибка расчета профиля:</b> {html.escape(error)}</p>"
+        self.data_info.setHtml(
+            f"<p>{html.escape(self.profile_summary)}</p>"
+            f"<table border='1' cellspacing='0' cellpadding='2'>{''.join(rows)}</table>"
+            f"{status}"
+        )
 
-            # Устанавливаем минимальную ширину (80 пикселей)
-            min_width = 80
-            # Устанавливаем максимальную ширину (300 пикселей для больших данных)
-            max_width = 300
+    def update_filter_bar(self):
+        """Список колонок фильтра и описание действующих фильтров"""
+        model = self.data_table.model()
+        enabled = isinstance(model, DataFrameModel)
+        self.filter_column.clear()
+        if enabled:
+            self.filter_column.addItems(model.columns)
+        for widget in (self.filter_column, self.filter_text):
+            widget.setEnabled(enabled)
+        self.filter_text.clear()
+        self.update_filter_info()
+
+    def update_filter_info(self):
+        """Число показанных строк и условия фильтров"""
+        model = self.data_table.model()
+        if not isinstance(model, DataFrameModel) or not model.filters:
+            self.filter_info.setText("")
+            return
+        conditions = "; ".join(
+            f"{model.columns[column]}: {text}" for column, text in model.filters.items()
+        )
+        self.filter_info.setText(
+            f"Показано строк: {model.row_count} из {model.total_rows} ({conditions})"
+        )
+
+    def apply_data_filter(self):
+        """Установка фильтра выбранной колонки (пустое условие снимает фильтр)"""
+        model = self.data_table.model()
+        column = self.filter_column.currentIndex()
+        if not isinstance(model, DataFrameModel) or column < 0:
+            return
+        success, message = model.set_filter(column, self.filter_text.text())
+        if not success:
+            self.show_error(message)
+            return
+        self.update_filter_info()
+
+    def clear_data_filters(self):
+        """Снятие всех фильтров таблицы данных"""
+        model = self.data_table.model()
+        if isinstance(model, DataFrameModel):
+            model.clear_filters()
+        self.filter_text.clear()
+        self.update_filter_info()
+
+    def create_table_view(self):
+        """Таблица для отображения DataFrame через модель DataFrameModel"""
+        table_view = QTableView()
+        table_view.setModel(DataFrameModel(parent=table_view))
+        # Щелчок по заголовку сортирует строки в модели без повторного запроса
+        table_view.setSortingEnabled(True)
+        vertical_header = table_view.verticalHeader()
+        vertical_header.setDefaultSectionSize(10)
+        # Одинаковая высота строк: Qt не измеряет каждую строку при прокрутке
+        vertical_header.setSectionResizeMode(vertical_header.ResizeMode.Fixed)
+        return table_view
+
+    def get_dataframe_model(self, table_widget):
+        """Модель DataFrame таблицы; заменяет модель просмотра таблицы БД"""
+        model = table_widget.model()
+        if isinstance(model, DataFrameModel):
+            return model
+        if table_widget is self.data_table:
+            self.close_table_pager()
+            self.table_page_info.setText("")
+        model = DataFrameModel(parent=table_widget)
+        table_widget.setModel(model)
+        table_widget.setSortingEnabled(True)
+        return model
 
-            # Применяем ограничения
-            if current_width < min_width:
-                table_widget.setColumnWidth(i, min_width)
-            elif current_width > max_width:
-                table_widget.setColumnWidth(i, max_width)
+    def display_data_in_table(self, data, table_widget):
+        """Отображение данных в указанной таблице
+
+        Модель читает только видимые ячейки, поэтому показываются все строки.
+        """
+        model = self.get_dataframe_model(table_widget)
+        # Новые данные показываются в исходном порядке строк
+        table_widget.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        model.set_dataframe(data)
+        self.adjust_column_widths(table_widget)
+        if table_widget is self.data_table:
+            self.update_filter_bar()
+
+    def adjust_column_widths(self, table_widget):
+        """Ширина колонок по выборке значений в пределах 80–300 пикселей
+
+        Вместо resizeColumnsToContents, измеряющего каждую ячейку, ширина
+        оценивается по COLUMN_WIDTH_SAMPLE_ROWS строкам каждой колонки.
+        """
+        header = table_widget.horizontalHeader()
+        widths = estimate_column_widths(
+            table_widget.model(),
+            table_widget.fontMetrics(),
+            header.fontMetrics(),
+            sample_rows=self.column_width_sample_rows,
+        )
+        for i, width in enumerate(widths):
+            header.resizeSection(i, width)
 
         # Настраиваем поведение заголовков колонок
         header.setSectionResizeMode(header.ResizeMode.Interactive)
 
     def update_column_selectors(self):
         """Обновление списков колонок для графиков"""
-        if self.current_data is not None:
+        if self.current_data is not None and hasattr(self, "x_column"):
             columns = self.current_data.columns.tolist()
 
             self.x_column.clear()
@@ -1619,32 +2390,186 @@ pip install pyodbc   # Для подключения к SQL Server
             self.show_error("Выберите колонку для оси X")
             return
 
-        try:
-            if plot_type == "Гистограмма":
-                self.plot_canvas.plot_histogram(self.current_data, x_col)
-            elif plot_type == "Линейный":
-                if not y_col:
-                    self.show_error("Выберите колонку для оси Y")
-                    return
-                self.plot_canvas.plot_line(self.current_data, x_col, y_col)
-            elif plot_type == "Точечный":
-                if not y_col:
-                    self.show_error("Выберите колонку для оси Y")
-                    return
-                self.plot_canvas.plot_scatter(self.current_data, x_col, y_col)
-            elif plot_type == "Столбчатый":
-                if not y_col:
-                    self.show_error("Выберите колонку для оси Y")
-                    return
-                # Для столбчатого графика группируем данные
-                grouped_data = (
-                    self.current_data.groupby(x_col)[y_col].mean().reset_index()
-                )
-                self.plot_canvas.plot_bar(grouped_data, x_col, y_col)
-                self.show_status_message(f"График построен: {plot_type}")
-        except Exception as e:
-            self.show_error(f"Ошибка построения графика: {str(e)}")
+        if plot_type != "Гистограмма" and not y_col:
+            self.show_error("Выберите колонку для оси Y")
+            return
+
+        # Незавершенные построения прошлых графиков отменяются
+        self.plot_generation += 1
+        generation = self.plot_generation
+        key = self.get_plot_key(plot_type, x_col, y_col)
+        if self.current_data_source is not None and plot_type in ("Гистограмма", "Столбчатый"):
+            self.create_plot_in_db(generation, plot_type, key, x_col, y_col)
+            return
+        if self.can_update_plot(key):
+            self.update_plot(generation, plot_type, x_col, y_col)
+            return
+
+        canvas = self.plot_canvas
+        if plot_type == "Гистограмма":
+            self.render_plot(
+                generation, plot_type, key, canvas.build_histogram, self.current_data, x_col
+            )
+        elif plot_type == "Линейный":
+            self.render_plot(
+                generation, plot_type, key, canvas.build_line, self.current_data, x_col, y_col
+            )
+        elif plot_type == "Точечный":
+            canvas.scatter_density_threshold = self.density_threshold.value()
+            self.render_plot(
+                generation,
+                plot_type,
+                key,
+                canvas.build_scatter,
+                self.current_data,
+                x_col,
+                y_col,
+                canvas.scatter_density_threshold,
+            )
+        elif plot_type == "Столбчатый":
+            # Для столбчатого графика данные группируются в фоновом потоке
+            self.render_plot(
+                generation,
+                plot_type,
+                key,
+                canvas.build_grouped_bar,
+                self.current_data,
+                x_col,
+                y_col,
+            )
+
+    def get_plot_key(self, plot_type, x_col, y_col):
+        """Ключ графика: тип, номер загрузки данных, колонка X и порог карты плотности
+
+        Графики с одинаковым ключом отличаются только колонкой Y. Для
+        нечисловой колонки Y ключ None: такой график строится заново.
+        """
+        y_dtype = self.current_data[y_col].dtype if y_col in self.current_data else None
+        if (
+            y_dtype is None
+            or not pd.api.types.is_numeric_dtype(y_dtype)
+            or pd.api.types.is_bool_dtype(y_dtype)
+        ):
+            return None
+        return (plot_type, self.data_version, x_col, self.density_threshold.value())
+
+    def can_update_plot(self, key):
+        """Можно ли заменить только данные Y на показанном графике"""
+        canvas = self.plot_canvas
+        return key is not None and key == canvas.plot_key and canvas.update_kind is not None
+
+    def update_plot(self, generation, plot_type, x_col, y_col):
+        """Замена колонки Y на показанном графике без перестроения осей"""
+        canvas = self.plot_canvas
+        worker = TaskWorker(
+            canvas.prepare_update,
+            canvas.update_kind,
+            self.current_data,
+            x_col,
+            y_col,
+            line_view=canvas.line_view() if canvas.update_kind == "line" else None,
+        )
+        self.start_worker(
+            worker,
+            lambda result: self.on_plot_update_ready(generation, plot_type, x_col, y_col, result),
+        )
+
+    def on_plot_update_ready(self, generation, plot_type, x_col, y_col, result):
+        """Подстановка новых значений Y или построение графика заново"""
+        if generation != self.plot_generation:
+            return  # Запрошен другой график
+        success, values = result
+        if success and self.plot_canvas.apply_update(values, x_col, y_col):
+            self.show_status_message(f"График обновлен: {plot_type}")
+            return
+        if not success:
+            self.show_status_message(f"Обновление графика недоступно, строим заново: {values}")
+        # Выбор колонок не менялся (иначе номер запроса был бы другим)
+        self.plot_canvas.plot_key = None
+        self.create_plot()
+
+    def render_plot(self, generation, plot_type, key, builder, *args):
+        """Построение и растрирование графика в фоновом потоке
+
+        Готовая фигура заменяет текущую в on_plot_rendered; построение
+        прерывается, если за это время запрошен другой график. key
+        запоминается для замены колонки Y без перестроения (см. get_plot_key).
+        """
+        canvas = self.plot_canvas
+        worker = TaskWorker(
+            canvas.render_offscreen,
+            canvas.new_offscreen_figure(),
+            builder,
+            *args,
+            cancelled=lambda: generation != self.plot_generation,
+        )
+        self.start_worker(
+            worker,
+            lambda result: self.on_plot_rendered(generation, plot_type, key, result),
+        )
+
+    def on_plot_rendered(self, generation, plot_type, key, result):
+        """Показ графика, построенного в фоновом потоке"""
+        if generation != self.plot_generation:
+            return  # Запрошен другой график
+        success, data = result
+        if not success:
+            self.show_error(f"Ошибка построения графика: {data}")
             self.show_status_message("Ошибка построения графика")
+            return
+        fig, state = data
+        self.plot_canvas.install_figure(fig, state)
+        self.plot_canvas.plot_key = key
+        self.show_status_message(f"График построен: {plot_type}")
+
+    def create_plot_in_db(self, generation, plot_type, key, x_col, y_col):
+        """Гистограмма или средние по группам агрегатным запросом к таблице БД"""
+        table_name = self.current_data_source
+        if plot_type == "Гистограмма":
+            worker = TaskWorker(self.db_connection.table_histogram, table_name, x_col)
+        else:
+            worker = TaskWorker(
+                self.db_connection.table_grouped_means, table_name, x_col, y_col
+            )
+        self.show_status_message(f"Расчет графика в БД: {table_name}")
+        self.start_worker(
+            worker,
+            lambda result: self.on_db_plot_ready(
+                generation, plot_type, key, x_col, y_col, result
+            ),
+        )
+
+    def on_db_plot_ready(self, generation, plot_type, key, x_col, y_col, result):
+        """Построение графика по агрегатам из БД или по первой странице"""
+        if generation != self.plot_generation:
+            return  # Запрошен другой график
+        canvas = self.plot_canvas
+        success, data = result
+        if not success:
+            # Например, нечисловая колонка: строим по загруженной странице
+            self.show_status_message(f"Агрегаты в БД недоступны: {data}")
+            if plot_type == "Гистограмма":
+                builder, args = canvas.build_histogram, (self.current_data, x_col)
+            else:
+                builder, args = canvas.build_grouped_bar, (self.current_data, x_col, y_col)
+            self.render_plot(
+                generation,
+                f"{plot_type} по первой странице (агрегаты в БД недоступны: {data})",
+                None,
+                builder,
+                *args,
+            )
+            return
+        if plot_type == "Гистограмма":
+            counts, edges = data
+            builder, args = canvas.build_histogram_counts, (counts, edges, x_col)
+        else:
+            heights = data[y_col].to_numpy(dtype=np.float64, na_value=np.nan)
+            if self.can_update_plot(key) and canvas.apply_update(heights, x_col, y_col):
+                self.show_status_message(f"График обновлен: {plot_type} по всей таблице")
+                return
+            builder, args = canvas.build_bar, (data, x_col, y_col)
+        self.render_plot(generation, f"{plot_type} по всей таблице", key, builder, *args)
 
     def show_message(self, message):
         """Показ сообщения"""
@@ -1661,14 +2586,15 @@ pip install pyodbc   # Для подключения к SQL Server
 
     def clear_sql_result(self):
         """Очистка результата SQL запроса"""
-        self.sql_result_table.setRowCount(0)
-        self.sql_result_table.setColumnCount(0)
+        self.sql_result_table.model().set_dataframe(None)
+        self.sql_log.clear()
         self.last_sql_result = None
         self.show_status_message("Результат SQL запроса очищен")
 
     def clear_plot(self):
         """Очистка канвы графика"""
-        self.plot_canvas.fig.clear()
+        self.plot_generation += 1  # Строящийся график не будет показан
+        self.plot_canvas.reset_figure()
         self.plot_canvas.draw()
         self.show_status_message("График очищен")
 
@@ -0,0 +1,316 @@
+"""Чтение и запись файлов данных без зависимостей от графического интерфейса"""
+
+import os
+import csv
+import gzip
+import json
+import time
+import importlib.util
+import pandas as pd
+
+try:
+    from dbfread import DBF
+
+    DBF_AVAILABLE = True
+except ImportError:
+    DBF_AVAILABLE = False
+
+# zstandard нужен только для сжатия .zst, проверяем наличие без импорта
+ZSTD_AVAILABLE = importlib.util.find_spec("zstandard") is not None
+
+# pyarrow нужен только для колоночных форматов, проверяем наличие без импорта
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+
+# Расширение файла -> формат
+FILE_FORMATS = {
+    ".csv": "csv",
+    ".xlsx": "excel",
+    ".xls": "excel",
+    ".dbf": "dbf",
+    ".json": "json",
+    ".parquet": "parquet",
+    ".feather": "feather",
+    ".arrow": "arrow",
+}
+
+# Колоночные форматы (требуют pyarrow)
+COLUMNAR_FORMATS = ("parquet", "feather", "arrow")
+
+# Сжатие по умолчанию; arrow пишется без сжатия для чтения отображением в память
+COLUMNAR_COMPRESSION = {"parquet": "snappy", "feather": "lz4", "arrow": None}
+
+# Строк в группе строк Parquet: крупные группы сжимаются и читаются быстрее
+PARQUET_ROW_GROUP_SIZE = 1000000
+
+
+def detect_file_format(file_path):
+    """Определение формата файла по расширению"""
+    extension = os.path.splitext(file_path)[1].lower()
+    file_format = FILE_FORMATS.get(extension)
+    if file_format is None:
+        raise ValueError(f"Неподдерживаемый формат файла: {extension or file_path}")
+    return file_format
+
+
+def read_json_file(file_path):
+    """Загрузка JSON файла: массив объектов, вложенный словарь или список значений"""
+    try:
+        # Сначала пробуем загрузить как массив объектов
+        print("Пробуем загрузить JSON с помощью pd.read_json()")
+        data = pd.read_json(file_path)
+        print(f"Успешно загружено с pd.read_json(): {data.shape}")
+        return data
+    except ValueError as e:
+        print(f"pd.read_json() не сработал: {e}")
+
+    # Если не получилось, пробуем загрузить как обычный JSON и нормализовать
+    print("Пробуем загрузить как обычный JSON файл")
+    with open(file_path, "r", encoding="utf-8") as f:
+        json_data = json.load(f)
+
+    print(f"JSON загружен, тип данных: {type(json_data)}")
+
+    # Проверяем структуру данных
+    if isinstance(json_data, dict):
+        print("JSON является словарем, нормализуем")
+        # Если это словарь, пробуем нормализовать
+        data = pd.json_normalize(json_data)
+        print(f"После нормализации словаря: {data.shape}")
+    elif isinstance(json_data, list):
+        if len(json_data) > 0 and isinstance(json_data[0], dict):
+            print("JSON является списком словарей, нормализуем")
+            # Если это список словарей, нормализуем каждый элемент
+            data = pd.json_normalize(json_data)
+            print(f"После нормализации списка словарей: {data.shape}")
+        else:
+            print("JSON является простым списком")
+            # Если это простой список, создаем DataFrame с одной колонкой
+            data = pd.DataFrame({"values": json_data})
+            print(f"После создания DataFrame из списка: {data.shape}")
+    else:
+        print("JSON является простым значением")
+        # Если это простое значение, создаем DataFrame
+        data = pd.DataFrame({"value": [json_data]})
+        print(f"После создания DataFrame из значения: {data.shape}")
+    return data
+
+
+def read_data_file(file_path, file_format=None):
+    """Чтение файла данных в DataFrame
+
+    Формат определяется по расширению, если не указан явно:
+    csv, excel, dbf (требует dbfread) или json.
+    """
+    file_format = file_format or detect_file_format(file_path)
+
+    if file_format == "csv":
+        return pd.read_csv(file_path)
+    if file_format == "excel":
+        return pd.read_excel(file_path)
+    if file_format == "dbf":
+        if not DBF_AVAILABLE:
+            raise ImportError("Библиотека dbfread не установлена")
+        return pd.DataFrame(iter(DBF(file_path)))
+    if file_format == "json":
+        return read_json_file(file_path)
+    if file_format in COLUMNAR_FORMATS:
+        return read_columnar_file(file_path, file_format)
+    raise ValueError(f"Неподдерживаемый формат файла: {file_format}")
+
+
+def read_columnar_file(file_path, file_format):
+    """Чтение Parquet, Feather или Arrow IPC файла"""
+    if not PYARROW_AVAILABLE:
+        raise ImportError(f"Для чтения {file_format} установите библиотеку pyarrow")
+    if file_format == "parquet":
+        return pd.read_parquet(file_path)
+    if file_format == "feather":
+        return pd.read_feather(file_path)
+
+    import pyarrow as pa
+
+    # Несжатый файл Arrow читается отображением в память, без копирования
+    with pa.memory_map(file_path) as source:
+        try:
+            table = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            # Формат потока, например ответ /export?format=arrow HTTP сервиса
+            source.seek(0)
+            table = pa.ipc.open_stream(source).read_all()
+    return table.to_pandas()
+
+
+def detect_compression(file_path):
+    """Сжатие по расширению файла: gzip (.gz), zstd (.zst) или None"""
+    lower = file_path.lower()
+    if lower.endswith(".gz"):
+        return "gzip"
+    if lower.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+def open_text_writer(file_path, compression=None, encoding="utf-8-sig"):
+    """Открытие текстового файла на запись с необязательным сжатием"""
+    if compression == "gzip":
+        # Уровень 6 заметно быстрее максимального при почти том же размере
+        return gzip.open(
+            file_path, "wt", compresslevel=6, encoding=encoding, newline=""
+        )
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ImportError("Для сжатия zstd установите библиотеку zstandard")
+        import zstandard
+
+        return zstandard.open(file_path, "wt", encoding=encoding, newline="")
+    if compression:
+        raise ValueError(f"Неподдерживаемое сжатие: {compression}")
+    return open(file_path, "w", encoding=encoding, newline="")
+
+
+def write_csv_batches(batches, file_path, compression=None, progress_callback=None):
+    """Запись порций (колонки, строки) в CSV файл по мере их получения
+
+    В памяти одновременно находится только одна порция строк.
+    Возвращает число записанных строк.
+    """
+    started = time.perf_counter()
+    rows_written = 0
+    with open_text_writer(file_path, compression) as f:
+        writer = csv.writer(f)
+        header_written = False
+        for columns, rows in batches:
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows(rows)
+            rows_written += len(rows)
+            if progress_callback:
+                elapsed = time.perf_counter() - started
+                rate = rows_written / elapsed if elapsed else 0
+                progress_callback(
+                    f"Записано строк: {rows_written} ({rate:.0f} строк/с)"
+                )
+    return rows_written
+
+
+def write_data_file(data, file_path, file_format=None, compression=None):
+    """Запись DataFrame в файл: csv, parquet, feather или arrow"""
+    file_format = file_format or detect_file_format(file_path)
+    if file_format == "csv":
+        data.to_csv(file_path, index=False, encoding="utf-8-sig")
+        return len(data)
+    if file_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"Запись в формат {file_format} не поддерживается")
+    return write_columnar_chunks([data], file_path, file_format, compression)
+
+
+def arrow_array(values, arrow_type):
+    """Массив Arrow заданного типа из значений одной порции
+
+    Значения приводятся к типу колонки безопасным cast (целые к дробным
+    и т. п.; дробная часть не отбрасывается молча). Значения, которые нельзя
+    привести к строковой колонке (например, разнотипные), записываются текстом.
+    """
+    import pyarrow as pa
+
+    try:
+        array = pa.array(values, from_pandas=True)
+        return array if array.type == arrow_type else array.cast(arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        if not pa.types.is_string(arrow_type):
+            raise
+        return pa.array(
+            [None if pd.isna(value) else str(value) for value in values],
+            type=arrow_type,
+        )
+
+
+def infer_arrow_schema(data, column_types=None):
+    """Схема Arrow по DataFrame
+
+    Типы из column_types (колонка -> тип Arrow) имеют приоритет над
+    определенными по данным; пустые колонки считаются строковыми.
+    """
+    import pyarrow as pa
+
+    column_types = column_types or {}
+    fields = []
+    for field in pa.Schema.from_pandas(data, preserve_index=False):
+        arrow_type = column_types.get(field.name) or field.type
+        if pa.types.is_null(arrow_type):
+            arrow_type = pa.string()
+        fields.append(pa.field(field.name, arrow_type))
+    return pa.schema(fields)
+
+
+def write_columnar_chunks(
+    chunks,
+    file_path,
+    file_format,
+    compression=None,
+    row_group_size=PARQUET_ROW_GROUP_SIZE,
+    progress_callback=None,
+    column_types=None,
+):
+    """Запись последовательности DataFrame в один колоночный файл
+
+    Схема строится по первой порции, но типы из column_types (например,
+    объявленные типы колонок таблицы БД) имеют приоритет. Каждая порция
+    приводится к схеме (arrow_array), поэтому колонка, пустая в первой
+    порции, не ломает запись следующих. Без порций по column_types
+    записывается пустой файл. В памяти одновременно находится только одна
+    порция. Возвращает число записанных строк.
+    """
+    if not PYARROW_AVAILABLE:
+        raise ImportError(f"Для записи {file_format} установите библиотеку pyarrow")
+    import pyarrow as pa
+
+    if compression is None:
+        compression = COLUMNAR_COMPRESSION[file_format]
+
+    writer = None
+    schema = None
+    rows_written = 0
+    try:
+        for chunk in chunks:
+            if schema is None:
+                schema = infer_arrow_schema(chunk, column_types)
+            if writer is None:
+                writer = open_columnar_writer(file_path, file_format, schema, compression)
+            table = pa.Table.from_arrays(
+                [arrow_array(chunk[field.name], field.type) for field in schema],
+                schema=schema,
+            )
+            if file_format == "parquet":
+                writer.write_table(table, row_group_size=row_group_size)
+            else:
+                writer.write_table(table)
+            rows_written += table.num_rows
+            if progress_callback:
+                progress_callback(f"Записано строк: {rows_written}")
+        if writer is None:
+            if not column_types:
+                raise ValueError("Нет данных для записи")
+            # Пустая таблица: файл только со схемой
+            schema = pa.schema(
+                [(name, arrow_type or pa.string()) for name, arrow_type in column_types.items()]
+            )
+            writer = open_columnar_writer(file_path, file_format, schema, compression)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows_written
+
+
+def open_columnar_writer(file_path, file_format, schema, compression):
+    """Писатель Parquet или Arrow IPC (Feather v2 — это Arrow IPC со сжатием)"""
+    import pyarrow as pa
+
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(file_path, schema, compression=compression)
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    return pa.ipc.new_file(file_path, schema, options=options)
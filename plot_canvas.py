@@ -0,0 +1,499 @@
+"""Виджет графиков на matplotlib
+
+Модуль импортируется при первом открытии вкладки "Графики": загрузка
+matplotlib и его Qt backend не задерживает запуск приложения.
+"""
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_qtagg import NavigationToolbar2QT as NavigationToolbar
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+from PyQt6.QtCore import QTimer
+from plot_data import (
+    DENSITY_CELL_PIXELS,
+    LINE_MARKER_LIMIT,
+    LINE_POINTS_PER_PIXEL,
+    SCATTER_DENSITY_THRESHOLD,
+    axis_values,
+    density_grid,
+    downsample_line,
+    line_view_indices,
+    xy_values,
+)
+
+
+class PlotCanvas(FigureCanvas):
+    """Виджет для отображения графиков
+
+    Каждый график строится функцией build_* в переданной фигуре. Функции
+    не обращаются к Qt, поэтому фигуру можно построить и растрировать
+    Agg в фоновом потоке (render_offscreen), а затем показать готовое
+    изображение (install_figure). Методы plot_* строят график сразу.
+
+    Если меняется только колонка Y, оси и объекты графика сохраняются:
+    prepare_update готовит новые значения в фоновом потоке, а apply_update
+    подставляет их в существующие линию, точки или столбцы.
+    """
+
+    def __init__(self, parent=None, width=5, height=4, dpi=100):
+        self.fig = Figure(figsize=(width, height), dpi=dpi)
+        super().__init__(self.fig)
+        self.setParent(parent)
+
+        # Полные данные линейного графика; на экран выводится их прореженная
+        # часть, пересчитываемая после масштабирования и сдвига
+        self.line = None
+        self.line_x = None
+        self.line_y = None
+        self.line_monotonic = False
+        # Точки точечного графика в режиме карты плотности
+        self.density_image = None
+        self.density_x = None
+        self.density_y = None
+        # Точки обычного точечного графика и столбцы столбчатого
+        self.points = None
+        self.bars = None
+        # Как подставить новые значения Y: "line", "points", "density",
+        # "bars" или None, если график строится только заново
+        self.update_kind = None
+        # Ключ графика, заданный окном: тип, данные и колонка X
+        self.plot_key = None
+        # С какого числа точек включается карта плотности
+        self.scatter_density_threshold = SCATTER_DENSITY_THRESHOLD
+        self.resample_timer = QTimer(self)
+        self.resample_timer.setSingleShot(True)
+        self.resample_timer.setInterval(100)
+        self.resample_timer.timeout.connect(self.update_visible_data)
+
+    def create_toolbar(self, parent):
+        """Панель масштабирования, сдвига и сохранения изображения"""
+        return NavigationToolbar(self, parent)
+
+    def reset_state(self):
+        """Сброс данных для пересчета видимой части графика"""
+        self.resample_timer.stop()
+        self.line = None
+        self.line_x = None
+        self.line_y = None
+        self.density_image = None
+        self.density_x = None
+        self.density_y = None
+        self.points = None
+        self.bars = None
+        self.update_kind = None
+        self.plot_key = None
+
+    def reset_figure(self):
+        """Очистка фигуры перед построением нового графика"""
+        self.reset_state()
+        self.fig.clear()
+
+    def apply_state(self, state):
+        """Сохранение данных графика и подписка на смену масштаба"""
+        for name, value in state.items():
+            setattr(self, name, value)
+        if self.line is not None:
+            self.line.axes.callbacks.connect(
+                "xlim_changed", lambda _: self.resample_timer.start()
+            )
+        if self.density_image is not None:
+            for event in ("xlim_changed", "ylim_changed"):
+                self.density_image.axes.callbacks.connect(
+                    event, lambda _: self.resample_timer.start()
+                )
+
+    def plot(self, builder, *args):
+        """Построение графика функцией builder сразу на экране"""
+        self.reset_figure()
+        self.apply_state(builder(self.fig, *args))
+        self.draw()
+
+    def new_offscreen_figure(self):
+        """Пустая фигура размера канвы с собственной Agg канвой
+
+        Создается в GUI потоке, потому что читает размер виджета.
+        """
+        ratio = self.device_pixel_ratio
+        fig = Figure(figsize=self.fig.get_size_inches(), dpi=self.fig.dpi / ratio)
+        FigureCanvasAgg(fig)
+        # Исходное разрешение запоминается канвой; масштаб экрана — сверху
+        fig.set_dpi(self.fig.dpi)
+        return fig
+
+    def render_offscreen(self, fig, builder, *args, cancelled=None, progress_callback=None):
+        """Построение и растрирование графика в фигуре вне экрана
+
+        Выполняется в фоновом потоке. cancelled() проверяется между этапами:
+        устаревший график не растрируется. Возвращает (успех, (фигура,
+        данные графика)); при отмене — (False, None).
+        """
+        if progress_callback:
+            progress_callback("Подготовка данных графика...")
+        state = builder(fig, *args)
+        if cancelled is not None and cancelled():
+            return False, None
+        if progress_callback:
+            progress_callback("Отрисовка графика...")
+        fig.canvas.draw()
+        if cancelled is not None and cancelled():
+            return False, None
+        return True, (fig, state)
+
+    def install_figure(self, fig, state):
+        """Показ фигуры, растрированной render_offscreen, без повторной отрисовки"""
+        size = self.fig.get_size_inches()
+        agg = fig.canvas
+        self.reset_state()
+        fig.set_canvas(self)
+        self.figure = self.fig = fig
+        self.apply_state(state)
+        if self.toolbar is not None:
+            self.replace_toolbar()
+
+        if (fig.get_size_inches() != size).any() or not hasattr(agg, "_lastKey"):
+            # Окно изменило размер во время построения (или Agg хранит
+            # отрисовку иначе): фигура перерисовывается на экране
+            fig.set_size_inches(size, forward=False)
+            self.draw_idle()
+            return
+        # Буфер Agg из фонового потока становится результатом последней
+        # отрисовки: paintEvent копирует его, не перерисовывая фигуру
+        self.renderer = agg.renderer
+        self._lastKey = agg._lastKey
+        self.update()
+
+    def replace_toolbar(self):
+        """Новая панель инструментов для новой фигуры
+
+        Панель подписывается на события канвы в конструкторе, а обработчики
+        событий хранятся в фигуре. После замены фигуры панель создается
+        заново на месте старой; история масштабов старой фигуры не нужна.
+        """
+        old = self.toolbar
+        parent = old.parentWidget()
+        toolbar = NavigationToolbar(self, parent)
+        parent.layout().replaceWidget(old, toolbar)
+        old.deleteLater()
+
+    def update_visible_data(self):
+        """Пересчет прореженной линии или карты плотности после смены масштаба"""
+        if self.line is not None:
+            self.resample_line()
+        elif self.density_image is not None:
+            self.rebin_density()
+
+    def set_axis_format(self, axis, kind, labels):
+        """Формат подписей оси для дат и категорий (номера строк на оси)"""
+        if kind == "datetime":
+            axis.axis_date()
+        elif kind == "category":
+            axis.set_major_formatter(
+                FuncFormatter(
+                    lambda value, _: labels[int(value)]
+                    if 0 <= value < len(labels) and value == int(value)
+                    else ""
+                )
+            )
+
+    def plot_histogram(self, data, column, bins=30):
+        """Построение гистограммы"""
+        self.plot(self.build_histogram, data, column, bins)
+
+    def build_histogram(self, fig, data, column, bins=30):
+        ax = fig.add_subplot(111)
+        ax.hist(data[column].dropna(), bins=bins, alpha=0.7, edgecolor="black")
+        self.decorate_histogram(ax, column)
+        return {}
+
+    def plot_histogram_counts(self, counts, edges, column):
+        """Построение гистограммы по готовым числам значений в интервалах"""
+        self.plot(self.build_histogram_counts, counts, edges, column)
+
+    def build_histogram_counts(self, fig, counts, edges, column):
+        ax = fig.add_subplot(111)
+        if len(counts):
+            ax.hist(edges[:-1], bins=edges, weights=counts, alpha=0.7, edgecolor="black")
+        self.decorate_histogram(ax, column)
+        return {}
+
+    def decorate_histogram(self, ax, column):
+        """Заголовок, подписи и сетка гистограммы"""
+        ax.set_title(f"Гистограмма: {column}")
+        ax.set_xlabel(column)
+        ax.set_ylabel("Частота")
+        ax.grid(True, alpha=0.3)
+
+    def plot_line(self, data, x_col, y_col):
+        """Построение линейного графика"""
+        self.plot(self.build_line, data, x_col, y_col)
+
+    def build_line(self, fig, data, x_col, y_col):
+        """Линейный график
+
+        Рисуется не больше LINE_POINTS_PER_PIXEL точек на пиксель ширины,
+        выбранных алгоритмом LTTB; при приближении точки выбираются заново
+        из видимого диапазона, поэтому появляются детали.
+        """
+        ax = fig.add_subplot(111)
+
+        x, y, kind, labels = xy_values(data[x_col], data[y_col])
+        indices = downsample_line(x, y, self.line_point_budget(ax))
+        (line,) = ax.plot(x[indices], y[indices], linestyle="-", markersize=4)
+        self.update_line_markers(line, len(x))
+        self.set_axis_format(ax.xaxis, kind, labels)
+
+        ax.set_title(f"{y_col} от {x_col}")
+        ax.set_xlabel(x_col)
+        ax.set_ylabel(y_col)
+        ax.grid(True, alpha=0.3)
+        ax.tick_params(axis="x", labelrotation=45)
+        fig.tight_layout()
+        return {
+            "line": line,
+            "line_x": x,
+            "line_y": y,
+            "line_monotonic": bool(np.all(np.diff(x) >= 0)),
+            "update_kind": "line",
+        }
+
+    def line_point_budget(self, ax):
+        """Число точек линии по ширине области графика в пикселях"""
+        return max(int(ax.bbox.width) * LINE_POINTS_PER_PIXEL, 3)
+
+    def update_line_markers(self, line, visible_points):
+        """Маркеры точек только для немногочисленных точек"""
+        line.set_marker("o" if visible_points <= LINE_MARKER_LIMIT else "None")
+
+    def resample_line(self):
+        """Повторное прореживание линии для видимого диапазона оси X"""
+        if self.line is None or self.line.axes not in self.fig.axes:
+            return
+        indices, visible_points = line_view_indices(
+            self.line_x, self.line_y, *self.line_view(), monotonic=self.line_monotonic
+        )
+        self.line.set_data(self.line_x[indices], self.line_y[indices])
+        self.update_line_markers(self.line, visible_points)
+        self.draw_idle()
+
+    def line_view(self):
+        """Видимый диапазон оси X и число точек линии: (low, high, threshold)"""
+        ax = self.line.axes
+        low, high = ax.get_xlim()
+        return low, high, self.line_point_budget(ax)
+
+    def plot_scatter(self, data, x_col, y_col):
+        """Построение точечного графика"""
+        self.plot(self.build_scatter, data, x_col, y_col, self.scatter_density_threshold)
+
+    def build_scatter(self, fig, data, x_col, y_col, density_threshold):
+        """Точечный график
+
+        Больше density_threshold точек рисуется картой плотности: точки
+        считаются по ячейкам сетки размером в несколько пикселей, и сетка
+        пересчитывается для видимой области после масштабирования.
+        """
+        ax = fig.add_subplot(111)
+        state = {}
+        if len(data) <= density_threshold:
+            points = ax.scatter(data[x_col], data[y_col], alpha=0.6)
+            state = {"points": points}
+            x_dtype = data[x_col].dtype
+            if pd.api.types.is_numeric_dtype(x_dtype) or pd.api.types.is_datetime64_any_dtype(
+                x_dtype
+            ):
+                # Координаты категорий назначает matplotlib, их не подставить
+                state["update_kind"] = "points"
+        else:
+            state = self.build_density(fig, ax, data[x_col], data[y_col])
+        ax.set_title(f"{y_col} vs {x_col}")
+        ax.set_xlabel(x_col)
+        ax.set_ylabel(y_col)
+        ax.grid(True, alpha=0.3)
+        return state
+
+    def build_density(self, fig, ax, x_series, y_series):
+        """Карта плотности точек (логарифмическая шкала цвета)"""
+        x, x_kind, x_labels = axis_values(x_series)
+        y, y_kind, y_labels = axis_values(y_series)
+        valid = np.isfinite(x) & np.isfinite(y)
+        if not valid.all():
+            x, y = x[valid], y[valid]
+        if len(x) == 0:
+            return {}
+
+        x_range = (x.min(), x.max())
+        y_range = (y.min(), y.max())
+        counts = density_grid(x, y, x_range, y_range, self.density_shape(ax))
+        image = ax.imshow(
+            np.ma.masked_equal(counts, 0),
+            origin="lower",
+            extent=(*x_range, *y_range),
+            aspect="auto",
+            interpolation="nearest",
+            cmap="viridis",
+            norm=LogNorm(vmin=1, vmax=max(counts.max(), 1)),
+        )
+        fig.colorbar(image, ax=ax, label="Число точек")
+        self.set_axis_format(ax.xaxis, x_kind, x_labels)
+        self.set_axis_format(ax.yaxis, y_kind, y_labels)
+        return {
+            "density_image": image,
+            "density_x": x,
+            "density_y": y,
+            "update_kind": "density",
+        }
+
+    def density_shape(self, ax):
+        """Размер сетки карты плотности по размеру области графика"""
+        return (
+            max(int(ax.bbox.width) // DENSITY_CELL_PIXELS, 1),
+            max(int(ax.bbox.height) // DENSITY_CELL_PIXELS, 1),
+        )
+
+    def rebin_density(self):
+        """Пересчет карты плотности для видимой области"""
+        if self.density_image.axes not in self.fig.axes:
+            return
+        ax = self.density_image.axes
+        x_range = tuple(sorted(ax.get_xlim()))
+        y_range = tuple(sorted(ax.get_ylim()))
+        counts = density_grid(
+            self.density_x, self.density_y, x_range, y_range, self.density_shape(ax)
+        )
+        self.density_image.set_data(np.ma.masked_equal(counts, 0))
+        self.density_image.set_extent((*x_range, *y_range))
+        self.density_image.set_norm(LogNorm(vmin=1, vmax=max(counts.max(), 1)))
+        self.draw_idle()
+
+    def plot_bar(self, data, x_col, y_col):
+        """Построение столбчатого графика"""
+        self.plot(self.build_bar, data, x_col, y_col)
+
+    def build_bar(self, fig, data, x_col, y_col):
+        ax = fig.add_subplot(111)
+        bars = ax.bar(data[x_col], data[y_col])
+        ax.set_title(f"{y_col} по {x_col}")
+        ax.set_xlabel(x_col)
+        ax.set_ylabel(y_col)
+        ax.grid(True, alpha=0.3)
+        ax.tick_params(axis="x", labelrotation=45)
+        fig.tight_layout()
+        return {"bars": bars, "update_kind": "bars"}
+
+    def build_grouped_bar(self, fig, data, x_col, y_col):
+        """Столбчатый график средних y по значениям x"""
+        grouped_data = data.groupby(x_col)[y_col].mean().reset_index()
+        return self.build_bar(fig, grouped_data, x_col, y_col)
+
+    def prepare_update(
+        self, update_kind, data, x_col, y_col, line_view=None, progress_callback=None
+    ):
+        """Значения для замены колонки Y на текущем графике
+
+        Выполняется в фоновом потоке и не обращается к фигуре; для линии
+        line_view — результат line_view(), по нему линия сразу прореживается.
+        Возвращает (успех, значения) для apply_update.
+        """
+        if progress_callback:
+            progress_callback("Подготовка данных графика...")
+        if update_kind == "bars":
+            means = data.groupby(x_col)[y_col].mean()
+            return True, means.to_numpy(dtype=np.float64, na_value=np.nan)
+        x, y, kind, labels = xy_values(data[x_col], data[y_col])
+        if update_kind != "line":
+            return True, (x, y)
+        monotonic = bool(np.all(np.diff(x) >= 0))
+        indices, visible_points = line_view_indices(x, y, *line_view, monotonic=monotonic)
+        return True, {
+            "x": x,
+            "y": y,
+            "kind": kind,
+            "labels": labels,
+            "monotonic": monotonic,
+            "indices": indices,
+            "visible_points": visible_points,
+        }
+
+    def apply_update(self, values, x_col, y_col):
+        """Подстановка новых значений Y в существующие объекты графика
+
+        Оси, сетка, подписи X и форматы сохраняются; пересчитываются только
+        данные и пределы оси Y. Возвращает False, если значения не подходят
+        к графику (например, изменилось число столбцов) и его нужно строить
+        заново.
+        """
+        if self.update_kind == "line":
+            ax = self.update_line(values)
+            ax.set_title(f"{y_col} от {x_col}")
+        elif self.update_kind == "points":
+            ax = self.update_points(*values)
+            ax.set_title(f"{y_col} vs {x_col}")
+        elif self.update_kind == "density":
+            ax = self.update_density(*values)
+            ax.set_title(f"{y_col} vs {x_col}")
+        elif self.update_kind == "bars":
+            ax = self.update_bars(values)
+            ax.set_title(f"{y_col} по {x_col}")
+        else:
+            ax = None
+        if ax is None:
+            return False
+        ax.set_ylabel(y_col)
+        self.draw_idle()
+        return True
+
+    def update_line(self, values):
+        """Новые точки линии; видимый диапазон X сохраняется"""
+        ax = self.line.axes
+        self.line_x = x = values["x"]
+        self.line_y = y = values["y"]
+        self.line_monotonic = values["monotonic"]
+        if values["kind"] == "category":
+            # Без строк с пропусками Y номера точек соответствуют другим подписям
+            self.set_axis_format(ax.xaxis, "category", values["labels"])
+        indices = values["indices"]
+        self.line.set_data(x[indices], y[indices])
+        self.update_line_markers(self.line, values["visible_points"])
+        ax.relim()
+        ax.set_autoscaley_on(True)
+        ax.autoscale_view(scalex=False)
+        return ax
+
+    def update_points(self, x, y):
+        """Новые координаты точек точечного графика"""
+        ax = self.points.axes
+        offsets = np.column_stack([x, y])
+        self.points.set_offsets(offsets)
+        ax.ignore_existing_data_limits = True
+        ax.update_datalim(offsets)
+        ax.set_autoscaley_on(True)
+        ax.autoscale_view(scalex=False)
+        return ax
+
+    def update_density(self, x, y):
+        """Карта плотности для новых значений Y во всем их диапазоне"""
+        if len(x) == 0:
+            return None
+        ax = self.density_image.axes
+        self.density_x = x
+        self.density_y = y
+        ax.set_ylim(y.min(), y.max())
+        self.rebin_density()
+        self.resample_timer.stop()  # Сетка уже пересчитана для новых пределов
+        return ax
+
+    def update_bars(self, heights):
+        """Новые высоты столбцов при тех же значениях X"""
+        if len(heights) == 0 or len(heights) != len(self.bars.patches):
+            return None
+        ax = self.bars.patches[0].axes
+        for patch, height in zip(self.bars.patches, heights):
+            patch.set_height(height)
+        ax.relim()
+        ax.set_autoscaley_on(True)
+        ax.autoscale_view(scalex=False)
+        return ax
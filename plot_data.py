@@ -0,0 +1,168 @@
+"""Подготовка данных для графиков: числовые оси, прореживание линий и
+карты плотности точек
+
+Функции не зависят от matplotlib и Qt и работают с массивами NumPy.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Сколько точек линии оставлять на пиксель ширины графика
+LINE_POINTS_PER_PIXEL = 2
+# До какого числа точек линия рисуется с маркерами
+LINE_MARKER_LIMIT = 500
+# Способ прореживания линии: "lttb" или "minmax"
+LINE_DOWNSAMPLE_METHOD = "lttb"
+# С какого числа точек точечный график рисуется картой плотности
+SCATTER_DENSITY_THRESHOLD = 200000
+# Размер ячейки карты плотности в пикселях
+DENSITY_CELL_PIXELS = 3
+
+
+def axis_values(series):
+    """Значения оси в виде float64 и вид оси
+
+    Возвращает (значения, вид, подписи): вид "numeric", "datetime" (значения
+    в днях matplotlib, как у matplotlib.dates.date2num) или "category" (номер
+    строки, подписи — исходные значения).
+    """
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        if getattr(series.dt, "tz", None) is not None:
+            series = series.dt.tz_localize(None)
+        nanoseconds = series.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        values = nanoseconds.astype(np.float64) / 86400e9
+        values[series.isna().to_numpy()] = np.nan
+        return values, "datetime", None
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan), "numeric", None
+    labels = series.astype(str).to_numpy()
+    return np.arange(len(series), dtype=np.float64), "category", labels
+
+
+def xy_values(x_series, y_series):
+    """Пары значений X и Y без пропусков
+
+    Возвращает (x, y, вид оси X, подписи X) как axis_values; Y приводится
+    к числам, нечисловые значения считаются пропусками.
+    """
+    x, kind, labels = axis_values(x_series)
+    y = pd.to_numeric(y_series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = np.isfinite(x) & np.isfinite(y)
+    if not valid.all():
+        x, y = x[valid], y[valid]
+        if labels is not None:
+            labels = labels[valid]
+    return x, y, kind, labels
+
+
+def bucket_edges(n, buckets):
+    """Границы равных по числу точек корзин для точек 1..n-2
+
+    Первая и последняя точки всегда сохраняются отдельно.
+    """
+    return np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+
+
+def lttb_indices(x, y, threshold):
+    """Индексы точек по алгоритму Largest-Triangle-Three-Buckets
+
+    Точки делятся на threshold - 2 корзины с равным числом точек; из каждой
+    выбирается точка, образующая наибольший треугольник с точкой, выбранной
+    в предыдущей корзине, и средней точкой следующей корзины. Форма линии,
+    включая пики, сохраняется при сокращении до нескольких тысяч точек.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = bucket_edges(n, threshold - 2)
+    counts = np.diff(np.append(edges, n))
+    # Средние точки корзин (последний элемент — последняя точка линии)
+    mean_x = np.add.reduceat(x, edges) / counts
+    mean_y = np.add.reduceat(y, edges) / counts
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    selected = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        ax, ay = x[selected], y[selected]
+        cx, cy = mean_x[bucket + 1], mean_y[bucket + 1]
+        area = np.abs((ax - cx) * (y[start:end] - ay) - (ax - x[start:end]) * (cy - ay))
+        selected = start + int(np.argmax(area))
+        indices[bucket + 1] = selected
+    return indices
+
+
+def minmax_indices(x, y, threshold):
+    """Индексы минимума и максимума y в каждой из threshold / 2 корзин
+
+    Быстрее LTTB и сохраняет все выбросы, но линия выглядит "зубчатой".
+    """
+    n = len(x)
+    buckets = threshold // 2
+    if threshold >= n or buckets < 1:
+        return np.arange(n)
+
+    edges = bucket_edges(n, buckets)
+    selected = [np.array([0])]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            segment = y[start:end]
+            selected.append(start + np.array([np.argmin(segment), np.argmax(segment)]))
+    selected.append(np.array([n - 1]))
+    # Порядок точек внутри корзины — по оси X
+    return np.unique(np.concatenate(selected))
+
+
+def downsample_line(x, y, threshold, method=LINE_DOWNSAMPLE_METHOD):
+    """Индексы не более threshold точек линии, сохраняющих ее форму"""
+    if method == "minmax":
+        return minmax_indices(x, y, threshold)
+    return lttb_indices(x, y, threshold)
+
+
+def visible_indices(x, low, high, monotonic):
+    """Индексы точек с x в [low, high] и по одной соседней с каждой стороны
+
+    Соседние точки нужны, чтобы линия доходила до краев области просмотра.
+    """
+    if monotonic:
+        start = max(int(np.searchsorted(x, low, side="left")) - 1, 0)
+        end = min(int(np.searchsorted(x, high, side="right")) + 1, len(x))
+        return np.arange(start, end)
+    return np.flatnonzero((x >= low) & (x <= high))
+
+
+def line_view_indices(x, y, low, high, threshold, monotonic):
+    """Индексы прореженных точек линии в диапазоне [low, high] оси X
+
+    Возвращает (индексы в x и y, число точек в диапазоне).
+    """
+    visible = visible_indices(x, low, high, monotonic)
+    indices = downsample_line(x[visible], y[visible], threshold)
+    return visible[indices], len(visible)
+
+
+def density_grid(x, y, x_range, y_range, shape):
+    """Число точек в ячейках сетки shape = (по X, по Y) внутри диапазонов
+
+    Номера ячеек вычисляются арифметически и считаются np.bincount —
+    в несколько раз быстрее np.histogram2d, которому нужен поиск границ.
+    Возвращает массив формы (по Y, по X), как ожидает imshow.
+    """
+    (x_low, x_high), (y_low, y_high) = x_range, y_range
+    columns, rows = shape
+    if x_high <= x_low or y_high <= y_low:
+        return np.zeros((rows, columns), dtype=np.int64)
+    inside = (x >= x_low) & (x <= x_high) & (y >= y_low) & (y <= y_high)
+    if not inside.all():
+        x, y = x[inside], y[inside]
+    column = ((x - x_low) * (columns / (x_high - x_low))).astype(np.int64)
+    row = ((y - y_low) * (rows / (y_high - y_low))).astype(np.int64)
+    # Значения на верхней границе попадают в последнюю ячейку
+    np.minimum(column, columns - 1, out=column)
+    np.minimum(row, rows - 1, out=row)
+    counts = np.bincount(row * columns + column, minlength=rows * columns)
+    return counts.reshape(rows, columns)
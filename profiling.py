@@ -0,0 +1,194 @@
+"""Профиль колонок датасета: пропуски, диапазон, среднее, оценка числа
+различных значений, частые значения и гистограмма
+
+Каждая колонка обрабатывается одним векторным проходом по ее массиву, так
+что профиль можно показывать по мере готовности колонок.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Число наименьших хешей в KMV-оценке числа различных значений
+DISTINCT_SKETCH_SIZE = 1024
+# Размер порции строк при построении оценки
+DISTINCT_CHUNK_SIZE = 1000000
+# Сколько самых частых значений показывать
+TOP_VALUES_COUNT = 3
+# Число интервалов гистограммы
+HISTOGRAM_BINS = 16
+# Символы столбиков гистограммы от низкого к высокому
+SPARKLINE_CHARS = "▁▂▃▄▅▆▇█"
+
+# Заголовки таблицы профиля (см. format_profile_row)
+PROFILE_HEADERS = [
+    "Колонка",
+    "Тип",
+    "Пропуски",
+    "Мин",
+    "Макс",
+    "Среднее",
+    "Различных",
+    "Частые значения",
+    "Гистограмма",
+]
+
+
+class DistinctSketch:
+    """Оценка числа различных значений по k наименьшим хешам (KMV)
+
+    Хранит не более k наименьших различных 64-битных хешей. Пока их меньше
+    k, число различных значений известно точно; иначе оценка равна
+    (k - 1) / (k-й наименьший хеш / 2^64) с ошибкой около 1/sqrt(k).
+    Оценки порций объединяются, поэтому колонка читается порциями.
+    """
+
+    def __init__(self, size=DISTINCT_SKETCH_SIZE):
+        self.size = size
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def update(self, values):
+        """Добавление порции значений (pandas Series без пропусков)"""
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        if len(hashes) > self.size:
+            hashes = pd.unique(hashes)
+        if len(hashes) > self.size:
+            hashes = np.partition(hashes, self.size - 1)[: self.size]
+        merged = np.union1d(self.hashes, hashes)
+        self.hashes = merged[: self.size]
+
+    @property
+    def exact(self):
+        return len(self.hashes) < self.size
+
+    def estimate(self):
+        """Число различных значений (точное, если их меньше k)"""
+        if self.exact:
+            return len(self.hashes)
+        fraction = float(self.hashes[-1]) / 2.0**64
+        return int(round((self.size - 1) / fraction))
+
+
+def sparkline(counts):
+    """Гистограмма строкой из столбиков разной высоты"""
+    counts = np.asarray(counts, dtype=np.float64)
+    if len(counts) == 0 or counts.max() <= 0:
+        return ""
+    levels = np.ceil(counts / counts.max() * (len(SPARKLINE_CHARS) - 1)).astype(int)
+    return "".join(SPARKLINE_CHARS[level] for level in levels)
+
+
+def histogram_counts(values, bins=HISTOGRAM_BINS):
+    """Число значений в равных интервалах между минимумом и максимумом"""
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return []
+    counts, _ = np.histogram(values, bins=bins)
+    return counts.tolist()
+
+
+def profile_column(series):
+    """Профиль одной колонки DataFrame"""
+    dtype = series.dtype
+    is_bool = pd.api.types.is_bool_dtype(dtype)
+    is_numeric = pd.api.types.is_numeric_dtype(dtype) and not is_bool
+    is_datetime = pd.api.types.is_datetime64_any_dtype(dtype)
+
+    missing = series.isna().to_numpy(dtype=bool)
+    values = series[~missing] if missing.any() else series
+    profile = {
+        "name": str(series.name),
+        "dtype": str(dtype),
+        "count": len(series),
+        "nulls": int(missing.sum()),
+        "min": None,
+        "max": None,
+        "mean": None,
+        "distinct": 0,
+        "distinct_exact": True,
+        "top": [],
+        "histogram": [],
+    }
+    if len(values) == 0:
+        return profile
+
+    if is_numeric or is_datetime:
+        if is_datetime:
+            numbers = values.array.asi8.astype(np.float64)
+        else:
+            numbers = values.to_numpy(dtype=np.float64)
+        profile["min"] = values.min()
+        profile["max"] = values.max()
+        profile["mean"] = values.mean() if is_datetime else numbers.mean()
+        profile["histogram"] = histogram_counts(numbers)
+    else:
+        try:
+            profile["min"] = values.min()
+            profile["max"] = values.max()
+        except TypeError:
+            # Колонка со значениями несравнимых типов
+            pass
+
+    sketch = DistinctSketch()
+    for start in range(0, len(values), DISTINCT_CHUNK_SIZE):
+        sketch.update(values.iloc[start : start + DISTINCT_CHUNK_SIZE])
+    profile["distinct"] = sketch.estimate()
+    profile["distinct_exact"] = sketch.exact
+
+    if sketch.exact or not (is_numeric or is_datetime):
+        # Для почти уникальных чисел и дат частые значения неинформативны
+        top = values.value_counts(sort=True).head(TOP_VALUES_COUNT)
+        profile["top"] = list(zip(top.index.tolist(), top.tolist()))
+    return profile
+
+
+def profile_data(data, column_callback=None, progress_callback=None):
+    """Профиль всех колонок DataFrame
+
+    column_callback(profile) вызывается для каждой готовой колонки, что
+    позволяет показывать профиль по мере расчета. Возвращает
+    (успех, список профилей).
+    """
+    profiles = []
+    total = data.shape[1]
+    for position in range(total):
+        series = data.iloc[:, position]
+        if progress_callback:
+            progress_callback((position, total, f"Профиль: колонка {series.name}"))
+        profile = profile_column(series)
+        profiles.append(profile)
+        if column_callback:
+            column_callback(profile)
+    if progress_callback:
+        progress_callback((total, total, f"Профиль готов: {total} колонок"))
+    return True, profiles
+
+
+def format_profile_value(value):
+    """Короткое текстовое представление значения профиля"""
+    if value is None:
+        return ""
+    if isinstance(value, (float, np.floating)):
+        return f"{value:.6g}"
+    text = str(value)
+    return text if len(text) <= 30 else text[:27] + "..."
+
+
+def format_profile_row(profile):
+    """Ячейки строки таблицы профиля для одной колонки"""
+    distinct = str(profile["distinct"])
+    if not profile["distinct_exact"]:
+        distinct = "~" + distinct
+    top = ", ".join(
+        f"{format_profile_value(value)} ({count})" for value, count in profile["top"]
+    )
+    return [
+        profile["name"],
+        profile["dtype"],
+        str(profile["nulls"]),
+        format_profile_value(profile["min"]),
+        format_profile_value(profile["max"]),
+        format_profile_value(profile["mean"]),
+        distinct,
+        top,
+        sparkline(profile["histogram"]),
+    ]
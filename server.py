@@ -0,0 +1,344 @@
+"""Локальный HTTP сервис запросов к внутренней базе данных
+
+Позволяет нескольким пользователям работать с уже загруженными датасетами
+без повторной загрузки файлов. Сервер слушает только loopback адрес
+(127.0.0.1, ::1 или localhost): /load читает любые файлы, доступные
+процессу, поэтому сервис не должен быть доступен с других компьютеров.
+
+    GET  /tables                               список таблиц
+    POST /load    {"path", "table", "if_exists"} загрузка файла во внутреннюю БД
+    GET  /query?sql=...&page=1&page_size=1000&format=ndjson|arrow
+    POST /query   {"sql", "page", "page_size", "format"}
+    GET  /export?table=...&format=csv|ndjson|arrow
+
+Результаты передаются порциями (chunked transfer encoding) в формате NDJSON
+или Arrow IPC stream, не собирая весь ответ в памяти. Каждый запрос
+обслуживается в своем потоке на соединении из пула внутренней БД.
+"""
+
+import csv
+import io
+import ipaddress
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from database import (
+    PYARROW_AVAILABLE,
+    is_select_query,
+    quote_table_name,
+    split_sql_statements,
+)
+from fileio import arrow_array, read_data_file
+
+# Размер порции строк, читаемых из курсора и отправляемых клиенту
+STREAM_BATCH_SIZE = 5000
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+class ChunkedWriter(io.RawIOBase):
+    """Файлоподобный объект, отправляющий записанные байты HTTP чанками"""
+
+    def __init__(self, wfile):
+        super().__init__()
+        self.wfile = wfile
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if data:
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii"))
+            self.wfile.write(bytes(data))
+            self.wfile.write(b"\r\n")
+        return len(data)
+
+    def finish(self):
+        """Завершающий пустой чанк"""
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """Обработчик HTTP запросов к внутренней БД"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        print(f"HTTP {self.address_string()} {format % args}")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        self.route(url.path, params)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_json(400, {"error": "Тело запроса должно быть JSON объектом"})
+            return
+        self.route(url.path, params)
+
+    def route(self, path, params):
+        """Выбор обработчика по пути"""
+        handlers = {
+            "/tables": self.handle_tables,
+            "/load": self.handle_load,
+            "/query": self.handle_query,
+            "/export": self.handle_export,
+        }
+        handler = handlers.get(path)
+        if handler is None:
+            self.send_json(404, {"error": f"Неизвестный путь: {path}"})
+            return
+        try:
+            handler(params)
+        except Exception as e:
+            self.send_json(500, {"error": str(e)})
+
+    @property
+    def db_connection(self):
+        return self.server.db_connection
+
+    def send_json(self, status, payload):
+        """Отправка небольшого JSON ответа целиком"""
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_tables(self, params):
+        self.send_json(200, {"tables": self.db_connection.get_table_names(scope="internal")})
+
+    def handle_load(self, params):
+        file_path = params.get("path")
+        if not file_path:
+            self.send_json(400, {"error": "Не указан путь к файлу (path)"})
+            return
+        table_name = params.get("table", "dataset")
+        data = read_data_file(file_path)
+        success, message = self.db_connection.load_data_to_internal_db(
+            data, table_name, params.get("if_exists", "replace")
+        )
+        self.send_json(200 if success else 400, {"message": message, "rows": len(data)})
+
+    def handle_query(self, params):
+        sql = (params.get("sql") or "").strip().rstrip(";")
+        if not sql:
+            self.send_json(400, {"error": "Не указан запрос (sql)"})
+            return
+        if len(split_sql_statements(sql)) != 1 or not is_select_query(sql):
+            self.send_json(400, {"error": "Разрешен только один запрос SELECT"})
+            return
+
+        query_params = {}
+        headers = {}
+        if "page" in params or "page_size" in params:
+            page = max(int(params.get("page", 1)), 1)
+            page_size = max(int(params.get("page_size", 1000)), 1)
+            sql = f"SELECT * FROM ({sql}) LIMIT :limit OFFSET :offset"
+            query_params = {"limit": page_size, "offset": (page - 1) * page_size}
+            headers = {"X-Page": str(page), "X-Page-Size": str(page_size)}
+
+        self.stream_result(sql, query_params, params.get("format", "ndjson"), headers)
+
+    def handle_export(self, params):
+        table_name = params.get("table")
+        # Запросы сервиса выполняются во внутренней БД, а не в активной внешней
+        if table_name not in self.db_connection.get_table_names(scope="internal"):
+            self.send_json(404, {"error": f"Таблица не найдена: {table_name}"})
+            return
+        engine = self.db_connection.internal_engine
+        sql = f"SELECT * FROM {quote_table_name(engine.dialect, table_name)}"
+        output_format = params.get("format", "csv")
+        column_types = None
+        if output_format == "arrow" and PYARROW_AVAILABLE:
+            # Схема потока по объявленным типам, а не по первой порции
+            with engine.connect() as conn:
+                column_types = self.db_connection.table_arrow_types(conn, table_name)
+        self.stream_result(sql, {}, output_format, {}, column_types)
+
+    def stream_result(self, sql, query_params, output_format, headers, column_types=None):
+        """Потоковая отправка результата запроса в выбранном формате
+
+        column_types (колонка -> тип Arrow) задает схему потока Arrow
+        для колонок с известным типом.
+        """
+        if output_format not in CONTENT_TYPES:
+            self.send_json(400, {"error": f"Неподдерживаемый формат: {output_format}"})
+            return
+        if output_format == "arrow" and not PYARROW_AVAILABLE:
+            self.send_json(400, {"error": "Для формата Arrow установите pyarrow"})
+            return
+
+        batches = self.db_connection.stream_query(
+            sql,
+            query_params,
+            batch_size=STREAM_BATCH_SIZE,
+            engine=self.db_connection.internal_engine,
+            read_only=True,
+        )
+        # Первая порция читается до отправки заголовков, чтобы ошибки
+        # в запросе вернулись клиенту обычным ответом с кодом 400
+        try:
+            first = next(batches)
+        except Exception as e:
+            self.send_json(400, {"error": str(e).splitlines()[0]})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[output_format])
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        writer = ChunkedWriter(self.wfile)
+        try:
+            if output_format == "arrow":
+                write_arrow_stream(writer, first, batches, column_types)
+            elif output_format == "csv":
+                write_csv_stream(writer, first, batches)
+            else:
+                write_ndjson_stream(writer, first, batches)
+        except Exception as e:
+            # Заголовки уже отправлены: сообщаем об ошибке последней строкой
+            error = json.dumps({"error": str(e)}, ensure_ascii=False)
+            writer.write((error + "\n").encode("utf-8"))
+        finally:
+            batches.close()
+        writer.finish()
+
+
+def iterate_batches(first, batches):
+    """Порции результата, включая уже прочитанную первую"""
+    yield first
+    yield from batches
+
+
+def write_ndjson_stream(writer, first, batches):
+    """Запись результата в формате NDJSON: одна JSON строка на запись"""
+    for columns, rows in iterate_batches(first, batches):
+        lines = [
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str)
+            for row in rows
+        ]
+        if lines:
+            writer.write(("\n".join(lines) + "\n").encode("utf-8"))
+
+
+def write_csv_stream(writer, first, batches):
+    """Запись результата в формате CSV порциями"""
+    buffer = io.StringIO()
+    csv_writer = csv.writer(buffer)
+    csv_writer.writerow(first[0])
+    for _, rows in iterate_batches(first, batches):
+        csv_writer.writerows(rows)
+        writer.write(buffer.getvalue().encode("utf-8"))
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def infer_arrow_type(values):
+    """Тип Arrow по значениям первой порции
+
+    Пустые колонки и колонки со значениями разных типов (в SQLite тип
+    значения не зависит от колонки) передаются текстом.
+    """
+    import pyarrow as pa
+
+    try:
+        arrow_type = pa.array(values).type
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.string()
+    return pa.string() if pa.types.is_null(arrow_type) else arrow_type
+
+
+def write_arrow_stream(writer, first, batches, column_types=None):
+    """Запись результата в формате Arrow IPC stream по одной порции на batch
+
+    Схема строится до начала потока: по column_types, а для колонок
+    с неизвестным типом — по первой порции. Следующие порции приводятся
+    к ней (arrow_array), поэтому значения в колонке, пустой в первой
+    порции, не обрывают уже начатый поток.
+    """
+    import pyarrow as pa
+
+    columns = first[0]
+    column_types = column_types or {}
+    stream = None
+    schema = None
+    for _, rows in iterate_batches(first, batches):
+        arrays = list(zip(*rows)) if rows else [[] for _ in columns]
+        if schema is None:
+            schema = pa.schema(
+                [
+                    (name, column_types.get(name) or infer_arrow_type(values))
+                    for name, values in zip(columns, arrays)
+                ]
+            )
+            stream = pa.ipc.new_stream(writer, schema)
+        record_batch = pa.RecordBatch.from_arrays(
+            [arrow_array(values, field.type) for values, field in zip(arrays, schema)],
+            schema=schema,
+        )
+        stream.write_batch(record_batch)
+    if stream is not None:
+        stream.close()
+
+
+def is_loopback_host(host):
+    """Адрес, доступный только с этого компьютера"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class QueryServer(ThreadingHTTPServer):
+    """HTTP сервер, обслуживающий запросы к DatabaseConnection в потоках"""
+
+    daemon_threads = True
+
+    def __init__(self, db_connection, host="127.0.0.1", port=8765):
+        if not is_loopback_host(host):
+            raise ValueError(
+                f"HTTP сервис слушает только loopback адрес (127.0.0.1, ::1, localhost): {host}"
+            )
+        if ":" in host:
+            self.address_family = socket.AF_INET6
+        super().__init__((host, port), QueryRequestHandler)
+        self.db_connection = db_connection
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        if ":" in host:
+            host = f"[{host}]"
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Запуск сервера в фоновом потоке"""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Остановка сервера и освобождение порта"""
+        self.shutdown()
+        self.server_close()
+        if self.thread is not None:
+            self.thread.join()
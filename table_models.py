@@ -0,0 +1,405 @@
+"""Модели Qt для отображения табличных данных в QTableView"""
+
+import re
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+# Сколько страниц таблицы БД держать в памяти одновременно
+MAX_CACHED_PAGES = 20
+
+# Сколько строк каждой колонки просматривать при подборе ширины
+COLUMN_WIDTH_SAMPLE_ROWS = 200
+# Сколько самых длинных значений из выборки измерять шрифтом
+COLUMN_WIDTH_MEASURED_VALUES = 3
+# Отступы ячейки и заголовка по горизонтали, пикселей
+COLUMN_WIDTH_PADDING = 16
+
+# Условие фильтра со знаком сравнения: "> 10", "<= 2024-01-01", "!= abc"
+FILTER_CONDITION_RE = re.compile(r"^\s*(>=|<=|!=|=|>|<)\s*(.*?)\s*$")
+
+
+class DataFrameModel(QAbstractTableModel):
+    """Модель таблицы поверх колонок DataFrame
+
+    Значения читаются из массивов колонок только для ячеек, которые
+    QTableView отрисовывает на экране, поэтому время отображения не зависит
+    от числа строк и доступны все строки результата.
+
+    Сортировка и фильтры не копируют данные: модель хранит массив номеров
+    исходных строк в порядке отображения (order). Каждая сортировка —
+    устойчивая сортировка уже упорядоченной перестановки по новой колонке,
+    поэтому прежние колонки сортировки остаются вторичными ключами.
+    Фильтры — булевы маски колонок, которые кэшируются и объединяются.
+    """
+
+    def __init__(self, data=None, parent=None):
+        super().__init__(parent)
+        self.columns = []
+        self.arrays = []
+        self.total_rows = 0
+        self.row_count = 0
+        self.order = None  # Номера исходных строк; None — исходный порядок
+        self.sort_keys = []  # Пары (колонка, по возрастанию), главная первой
+        self.sorted_rows = None  # Перестановка всех строк по sort_keys
+        self.filters = {}  # Колонка -> текст условия
+        self.filter_masks = {}  # Колонка -> маска строк, прошедших условие
+        if data is not None:
+            self.set_dataframe(data)
+
+    def set_dataframe(self, data):
+        """Замена отображаемых данных (None — пустая таблица)"""
+        self.beginResetModel()
+        if data is None:
+            self.columns = []
+            self.arrays = []
+            self.total_rows = 0
+        else:
+            self.columns = [str(column) for column in data.columns]
+            # Доступ к массиву колонки по индексу быстрее, чем data.iloc[i, j];
+            # .array сохраняет Timestamp и NA в том же виде, что и iloc
+            self.arrays = [data.iloc[:, j].array for j in range(data.shape[1])]
+            self.total_rows = len(data)
+        self.row_count = self.total_rows
+        self.order = None
+        self.sort_keys = []
+        self.sorted_rows = None
+        self.filters = {}
+        self.filter_masks = {}
+        self.endResetModel()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Сортировка по колонке; прежние колонки сортировки становятся вторичными"""
+        if column < 0 or column >= len(self.columns):
+            return
+        ascending = order == Qt.SortOrder.AscendingOrder
+        self.sorted_rows = stable_sort(
+            sort_key(self.arrays[column], ascending), self.sorted_rows
+        )
+        keys = [key for key in self.sort_keys if key[0] != column]
+        self.sort_keys = [(column, ascending)] + keys
+        self.apply_view()
+
+    def set_filter(self, column, text):
+        """Установка условия фильтра для колонки (пустой текст снимает фильтр)
+
+        Возвращает (успех, сообщение об ошибке в условии).
+        """
+        text = text.strip()
+        if not text:
+            self.filters.pop(column, None)
+            self.filter_masks.pop(column, None)
+        elif self.filters.get(column) != text:
+            try:
+                mask = filter_mask(self.arrays[column], text)
+            except (TypeError, ValueError) as e:
+                return False, f"Неверное условие для '{self.columns[column]}': {str(e)}"
+            self.filters[column] = text
+            self.filter_masks[column] = mask
+        self.apply_view()
+        return True, ""
+
+    def clear_filters(self):
+        """Снятие всех фильтров с сохранением сортировки"""
+        self.filters = {}
+        self.filter_masks = {}
+        self.apply_view()
+
+    def apply_view(self):
+        """Пересчет порядка строк по текущим фильтрам и сортировке"""
+        self.layoutAboutToBeChanged.emit()
+        if self.filter_masks:
+            mask = np.logical_and.reduce(list(self.filter_masks.values()))
+            if self.sorted_rows is None:
+                self.order = np.flatnonzero(mask)
+            else:
+                # Отбор из отсортированной перестановки сохраняет порядок
+                self.order = self.sorted_rows[mask[self.sorted_rows]]
+        else:
+            self.order = self.sorted_rows
+        self.row_count = self.total_rows if self.order is None else len(self.order)
+        self.layoutChanged.emit()
+
+    def source_row(self, row):
+        """Номер исходной строки DataFrame для строки таблицы"""
+        return row if self.order is None else self.order[row]
+
+    def sample_column(self, column, sample_rows):
+        """Строковые значения колонки в равномерно распределенных строках"""
+        rows = sample_row_indices(self.total_rows, sample_rows)
+        array = self.arrays[column]
+        return [str(array[row]) for row in rows]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        return str(self.arrays[index.column()][self.source_row(index.row())])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.columns[section] if section < len(self.columns) else None
+        # Номер строки исходных данных, а не позиция после сортировки
+        return str(self.source_row(section) + 1)
+
+
+class SqlQueryModel(QAbstractTableModel):
+    """Модель таблицы БД, читающая строки страницами по мере прокрутки
+
+    Работает поверх TablePager: строки добавляются в модель через
+    canFetchMore/fetchMore, когда QTableView докручивает до конца.
+    В памяти хранится не более max_cached_pages страниц (вытесняются
+    давно не показанные); вытесненная страница перечитывается по ключу,
+    поэтому объем памяти не зависит от размера таблицы.
+    """
+
+    end_reached = pyqtSignal()  # Прочитана последняя строка таблицы
+
+    def __init__(self, pager, max_cached_pages=MAX_CACHED_PAGES, parent=None):
+        super().__init__(parent)
+        self.pager = pager
+        self.max_cached_pages = max_cached_pages
+        self.pages = OrderedDict()  # Индекс страницы -> массивы колонок
+        self.columns = []
+        self.row_count = 0
+        self.pages_fetched = 0
+        self.at_end = False
+        self.first_page = None
+
+    def fetch_first_page(self):
+        """Чтение первой страницы; возвращает (успех, DataFrame или сообщение)"""
+        success, data = self.pager.first_page()
+        if not success:
+            return False, data
+        self.beginResetModel()
+        self.columns = [str(column) for column in data.columns]
+        self.first_page = data
+        self.store_page(0, data)
+        self.row_count = len(data)
+        self.pages_fetched = 1
+        self.at_end = not self.pager.has_next
+        self.endResetModel()
+        return True, data
+
+    def store_page(self, index, data):
+        """Сохранение страницы в кэше с вытеснением самой давней"""
+        self.pages[index] = [data.iloc[:, j].array for j in range(data.shape[1])]
+        self.pages.move_to_end(index)
+        while len(self.pages) > self.max_cached_pages:
+            self.pages.popitem(last=False)
+
+    def get_page(self, index):
+        """Массивы колонок страницы из кэша или из БД"""
+        arrays = self.pages.get(index)
+        if arrays is not None:
+            self.pages.move_to_end(index)
+            return arrays
+        success, data = self.pager.go_to_page(index)
+        if not success:
+            return None
+        self.store_page(index, data)
+        return self.pages[index]
+
+    def sample_column(self, column, sample_rows):
+        """Строковые значения колонки из уже прочитанной первой страницы"""
+        if self.first_page is None:
+            return []
+        array = self.first_page.iloc[:, column].array
+        rows = sample_row_indices(len(array), sample_rows)
+        return [str(array[row]) for row in rows]
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.pages_fetched > 0 and not self.at_end
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.at_end:
+            return
+        index = self.pages_fetched
+        success, data = self.pager.go_to_page(index)
+        if not success or data.empty:
+            self.at_end = True
+            self.end_reached.emit()
+            return
+        self.beginInsertRows(QModelIndex(), self.row_count, self.row_count + len(data) - 1)
+        self.store_page(index, data)
+        self.row_count += len(data)
+        self.pages_fetched += 1
+        self.at_end = not self.pager.has_next
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        page_index, offset = divmod(index.row(), self.pager.page_size)
+        arrays = self.get_page(page_index)
+        if arrays is None:
+            return None
+        return str(arrays[index.column()][offset])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.columns[section] if section < len(self.columns) else None
+        return str(section + 1)
+
+
+def sample_row_indices(row_count, sample_rows):
+    """Индексы не более sample_rows строк, равномерно покрывающих таблицу"""
+    if row_count <= sample_rows:
+        return np.arange(row_count)
+    return np.unique(np.linspace(0, row_count - 1, sample_rows).astype(np.int64))
+
+
+def estimate_column_widths(
+    model,
+    font_metrics,
+    header_metrics,
+    sample_rows=COLUMN_WIDTH_SAMPLE_ROWS,
+    min_width=80,
+    max_width=300,
+):
+    """Оценка ширины колонок по выборке строк вместо resizeColumnsToContents
+
+    Из каждой колонки берется не более sample_rows значений; длины строк
+    считаются векторно, и шрифтом измеряются только самые длинные из них
+    и заголовок. Результат ограничивается пределами min_width–max_width.
+    """
+    widths = []
+    for column in range(model.columnCount()):
+        header = str(model.headerData(column, Qt.Orientation.Horizontal) or "")
+        width = header_metrics.horizontalAdvance(header)
+        values = model.sample_column(column, sample_rows)
+        if values:
+            lengths = np.char.str_len(np.array(values, dtype=str))
+            longest = np.argsort(lengths)[-COLUMN_WIDTH_MEASURED_VALUES:]
+            width = max(
+                width, *(font_metrics.horizontalAdvance(values[i]) for i in longest)
+            )
+        widths.append(min(max(width + COLUMN_WIDTH_PADDING, min_width), max_width))
+    return widths
+
+
+def is_numeric_array(array):
+    """Числовая или логическая колонка, сравниваемая как числа"""
+    return pd.api.types.is_numeric_dtype(array.dtype)
+
+
+def sort_key(array, ascending):
+    """Ключ сортировки колонки (пропуски всегда в конце)
+
+    Дробные числа сортируются как float64 (NaN numpy ставит в конец), целые
+    и даты — как int64, остальные типы заменяются кодами упорядоченных
+    уникальных значений. Ключи с небольшим диапазоном сжимаются до uint16:
+    для них numpy выполняет устойчивую сортировку поразрядно.
+    """
+    if pd.api.types.is_float_dtype(array.dtype):
+        values = np.asarray(array.to_numpy(dtype="float64", na_value=np.nan))
+        return values if ascending else -values
+
+    datetime_like = hasattr(array, "asi8")
+    if datetime_like or (
+        pd.api.types.is_integer_dtype(array.dtype) and not array.isna().any()
+    ):
+        codes = np.array(array.asi8 if datetime_like else array, dtype=np.int64)
+        if not ascending:
+            codes = -codes
+        missing = np.asarray(array.isna())
+        if missing.any():
+            codes[missing] = np.iinfo(np.int64).max
+        elif len(codes) and codes.max() - codes.min() <= np.iinfo(np.uint16).max:
+            return (codes - codes.min()).astype(np.uint16)
+        return codes
+
+    codes, uniques = pd.factorize(array, sort=True)
+    missing = codes < 0
+    if not ascending:
+        codes = len(uniques) - 1 - codes
+    codes[missing] = len(uniques)
+    if len(uniques) <= np.iinfo(np.uint16).max:
+        return codes.astype(np.uint16)
+    return codes
+
+
+def stable_argsort(key):
+    """Устойчивая перестановка, сортирующая ключ
+
+    Сортировка слиянием в numpy для больших массивов медленная, поэтому
+    ключ сортируется быстрой сортировкой, а строки внутри каждой серии
+    равных значений затем упорядочиваются по номеру: сортируется число
+    "номер серии * длина + номер строки", все значения которого различны.
+    """
+    if key.dtype.kind == "f":
+        missing = np.isnan(key)
+        if missing.any():
+            # NaN замедляют быструю сортировку; они всегда идут в конце
+            valid = np.flatnonzero(~missing)
+            return np.concatenate(
+                [valid[stable_argsort(key[valid])], np.flatnonzero(missing)]
+            )
+    if key.dtype.itemsize <= 2:
+        return np.argsort(key, kind="stable")
+
+    order = np.argsort(key)
+    ordered = key[order]
+    changes = ordered[1:] != ordered[:-1]
+    if changes.all():
+        return order
+    runs = np.concatenate([[0], np.cumsum(changes)])
+    return np.sort(runs * len(key) + order) % len(key)
+
+
+def stable_sort(key, rows=None):
+    """Устойчивая сортировка перестановки rows (None — исходный порядок) по ключу"""
+    if rows is None:
+        return stable_argsort(key)
+    return rows[stable_argsort(key[rows])]
+
+
+def filter_mask(array, text):
+    """Булева маска строк колонки, удовлетворяющих условию фильтра
+
+    Условие со знаком (=, !=, >, >=, <, <=) сравнивает значения: числа для
+    числовых колонок, даты для колонок дат, иначе строки. Условие без знака
+    ищет подстроку без учета регистра.
+    """
+    values = pd.Series(array, copy=False)
+    # Пропуски не удовлетворяют ни одному условию; маска берется до
+    # приведения к строкам, где они превращаются в "nan" и "None"
+    present = values.notna().to_numpy(dtype=bool)
+    match = FILTER_CONDITION_RE.match(text)
+    if match is None:
+        found = values.astype(str).str.contains(text, case=False, regex=False)
+        return found.fillna(False).to_numpy(dtype=bool) & present
+
+    operator, operand = match.groups()
+    if is_numeric_array(array):
+        operand = float(operand)
+    elif pd.api.types.is_datetime64_any_dtype(array.dtype):
+        operand = pd.Timestamp(operand)
+    else:
+        values = values.astype(str)
+    comparisons = {
+        "=": values.__eq__,
+        "!=": values.__ne__,
+        ">": values.__gt__,
+        ">=": values.__ge__,
+        "<": values.__lt__,
+        "<=": values.__le__,
+    }
+    result = comparisons[operator](operand)
+    return result.fillna(False).to_numpy(dtype=bool) & present